@@ -0,0 +1,100 @@
+"""
+Замер времени запуска: импорт ядра без Tk, импорт приложения и первый кадр.
+
+    python bench_startup.py [--segments N] [--runs K]
+
+Каждый замер выполняется в отдельном процессе интерпретатора (холодный импорт). Если медиана
+превышает бюджет, скрипт завершается с кодом 1 — так его можно запускать перед коммитом или в CI.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from statistics import median
+
+# Бюджеты (мс)
+CORE_IMPORT_BUDGET_MS = 150.0
+APP_IMPORT_BUDGET_MS = 600.0
+FIRST_FRAME_BUDGET_MS = 250.0
+
+# Импорт всех модулей ядра; Tk подменяется заглушкой, чтобы любой UI-импорт в core падал
+CORE_PROBE = """
+import json, sys, time
+sys.modules["tkinter"] = None
+start = time.perf_counter()
+import core.arc, core.block, core.dash_tessellation, core.density, core.line_style, core.polyline
+import core.profiling, core.raster_tiles, core.render_descriptor, core.render_pipeline, core.scene
+import core.segment, core.selection_summary, core.slot_list, core.style_library, core.style_manager
+import core.view_transforms, core.wave_geometry
+print(json.dumps({"core_import_ms": (time.perf_counter() - start) * 1000.0}))
+"""
+
+# Импорт приложения, создание окна и первый кадр (с N отрезками, если заданы)
+APP_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import tkinter as tk
+from cad_app import SceneCADApp
+imported = time.perf_counter()
+root = tk.Tk()
+app = SceneCADApp(root)
+if {segments}:
+    n = {segments}
+    side = int(n ** 0.5) + 1
+    app.scene.add_segments(((i % side, i // side, i % side + 0.8, i // side + 0.5) for i in range(n)),
+                           app.style_manager.current_style_name)
+    app.zoom_extents()
+root.update()
+frame_start = time.perf_counter()
+app.view.draw_all()
+root.update_idletasks()
+done = time.perf_counter()
+root.destroy()
+print(json.dumps({{"app_import_ms": (imported - start) * 1000.0,
+                  "startup_ms": (frame_start - start) * 1000.0,
+                  "first_frame_ms": (done - frame_start) * 1000.0}}))
+"""
+
+
+# Каталог проекта: замеры импортируют core и cad_app относительно него, откуда бы ни запускался скрипт
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_probe(code):
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "замер завершился с ошибкой")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер времени запуска MiniCAD")
+    parser.add_argument("--segments", type=int, default=0, help="число отрезков для первого кадра")
+    parser.add_argument("--runs", type=int, default=5, help="число запусков для медианы")
+    args = parser.parse_args()
+
+    samples = {}
+    for _ in range(args.runs):
+        for probe in (CORE_PROBE, APP_PROBE.format(segments=args.segments)):
+            for key, value in run_probe(probe).items():
+                samples.setdefault(key, []).append(value)
+
+    budgets = {"core_import_ms": CORE_IMPORT_BUDGET_MS, "app_import_ms": APP_IMPORT_BUDGET_MS,
+               "first_frame_ms": FIRST_FRAME_BUDGET_MS}
+    failed = False
+    for key, values in samples.items():
+        value = median(values)
+        budget = budgets.get(key)
+        status = ""
+        if budget is not None:
+            over = value > budget
+            failed = failed or over
+            status = f"  (бюджет {budget:.0f} мс{', ПРЕВЫШЕН' if over else ''})"
+        print(f"{key:>16}: {value:8.1f} мс{status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,21 @@
 import tkinter as tk
-from tkinter import colorchooser, messagebox
-from math import degrees, radians, cos, sin
+from tkinter import colorchooser, filedialog, messagebox, simpledialog
+import heapq
+from math import degrees, radians, cos, sin, atan2, hypot, pi
 
 # Импорты из разделенных файлов
 from core.scene import Scene
-from core.segment import distance_point_to_segment
+from core.segment import Segment, distance_point_to_segment
+from core.block import BlockReference
 from core.view_transforms import ViewTransform
+from core.selection_summary import SelectionSummary
 from core.style_manager import StyleManager
 from cad_view import CADView
 from cad_ui import CADUI
 
+# Число объектов на странице подробностей выделения
+SELECTION_PAGE_SIZE = 50
+
 
 class SceneCADApp(CADUI):
     def __init__(self, root):
@@ -29,18 +35,27 @@ class SceneCADApp(CADUI):
         self.angle_unit = tk.StringVar(value="degrees")
         self.tool = tk.StringVar(value="segment")
         self.snap_enabled = tk.BooleanVar(value=False)
+        self.world_dashes_enabled = tk.BooleanVar(value=False)
+        self.density_map_enabled = tk.BooleanVar(value=True)
+        self.perf_overlay_enabled = tk.BooleanVar(value=False)
+        self.raster_tiles_enabled = tk.BooleanVar(value=False)
         self.segment_color = self.style_manager.get_style(self.style_manager.current_style_name).color
         self.selected_segments = set()
         self.selection_style_var = tk.StringVar(value="")
 
         self.temp_point = None
+        self.polyline_points = []
+        self.arc_points = []  # Набранные точки окружности/дуги: центр, затем начало дуги
+        self.block_insert = None  # (имя блока, поворот в радианах, масштаб) для инструмента "block"
         self.drag_start = None
         self.last_mouse_world = (0, 0)
+        self.render_progress = ""  # Индикатор прогрессивной отрисовки для строки состояния
+        self._compact_job = None  # Отложенное уплотнение хранилища сцены после удалений
 
         # Ссылки на виджеты (будут заполнены в CADUI.__init__)
         self.canvas = None
         self.status_bar = None
-        self.info_text = None
+        self.info_list = None
         self.tool_buttons = {}
         self.current_style_var = None
         self.style_combobox = None
@@ -51,45 +66,60 @@ class SceneCADApp(CADUI):
         # 3. Инициализация View и Transform
         self.trans = ViewTransform(self.canvas, self.scene)
         self.view = CADView(self.canvas, self.trans, self.scene, self.style_manager,
-                            selection_provider=lambda: self.selected_segments)
+                            selection_provider=lambda: self.selected_segments,
+                            focus_provider=lambda: self.last_mouse_world)
+        self.view.progress_callback = self.on_render_progress
+        self.view.frame_callback = lambda record: self.update_status_bar()
+        self.profiler = self.view.profiler
 
         # 4. Биндинг событий
         self._bind_events()
+        self.info_list.set_providers(self.scene.object_count, self._format_info_row,
+                                     self._info_row_key, self._info_row_index)
         self.view.draw_all()
         self.update_status_bar()
         self.update_selection_ui()
+        self.update_statistics_panel()
 
     # --- Методы UI и управления состоянием ---
 
     def _bind_events(self):
-        self.canvas.bind("<Configure>", lambda e: self.view.draw_all())
-        self.canvas.bind("<Button-1>", self.on_mouse_down)
-        self.canvas.bind("<B1-Motion>", self.on_mouse_drag)
-        self.canvas.bind("<Motion>", self.on_mouse_move)
-
-        self.canvas.bind("<Button-3>", self.show_context_menu)
-
-        self.canvas.bind("<Button-2>", self.start_pan)
-        self.canvas.bind("<B2-Motion>", self.pan_drag)
-        self.canvas.bind("<ButtonRelease-2>", self.end_pan)
-
-        self.canvas.bind("<MouseWheel>", self.on_wheel)
-        self.canvas.bind("<Button-4>", lambda e: self.on_wheel(e, 120))
-        self.canvas.bind("<Button-5>", lambda e: self.on_wheel(e, -120))
-
-        # Хоткеи
-        self.root.bind("<Control-0>", lambda e: self.zoom_extents())
-        self.root.bind("<Escape>", self.cancel_operation)
-        self.root.bind("<Key-s>", lambda e: self.set_tool("segment"))
-        self.root.bind("<Key-p>", lambda e: self.set_tool("pan"))
-        self.root.bind("<Key-d>", lambda e: self.set_tool("delete"))
-        self.root.bind("<Key-v>", lambda e: self.set_tool("select"))
-        self.root.bind("<Key-g>", lambda e: self.toggle_snap())
-        self.root.bind("<Control-w>", lambda e: self.clear_scene())
-        self.root.bind("<Key-l>", lambda e: self.rotate_view(15))
-        self.root.bind("<Key-r>", lambda e: self.rotate_view(-15))
-        self.root.bind("<Shift-L>", lambda e: self.rotate_view(90))
-        self.root.bind("<Shift-R>", lambda e: self.rotate_view(-90))
+        timed = self.profiler.wrap  # Замер длительности обработчиков ввода
+        self.canvas.bind("<Configure>", timed("configure", lambda e: self.view.draw_all()))
+        self.canvas.bind("<Button-1>", timed("mouse_down", self.on_mouse_down))
+        self.canvas.bind("<Double-Button-1>", timed("double_click", lambda e: self.finish_polyline()))
+        self.canvas.bind("<B1-Motion>", timed("mouse_drag", self.on_mouse_drag))
+        self.canvas.bind("<Motion>", timed("mouse_move", self.on_mouse_move))
+
+        self.canvas.bind("<Button-3>", timed("context_menu", self.show_context_menu))
+
+        self.canvas.bind("<Button-2>", timed("start_pan", self.start_pan))
+        self.canvas.bind("<B2-Motion>", timed("pan_drag", self.pan_drag))
+        self.canvas.bind("<ButtonRelease-2>", timed("end_pan", self.end_pan))
+
+        self.canvas.bind("<MouseWheel>", timed("wheel", self.on_wheel))
+        self.canvas.bind("<Button-4>", timed("wheel", lambda e: self.on_wheel(e, 120)))
+        self.canvas.bind("<Button-5>", timed("wheel", lambda e: self.on_wheel(e, -120)))
+
+        # Хоткеи (в замерах обработчиков — по имени клавиши)
+        self.root.bind("<Control-0>", timed("<Control-0>", lambda e: self.zoom_extents()))
+        self.root.bind("<F3>", timed("<F3>", lambda e: self.toggle_perf_overlay(not self.perf_overlay_enabled.get())))
+        self.root.bind("<Escape>", timed("<Escape>", self.cancel_operation))
+        self.root.bind("<Return>", timed("<Return>", lambda e: self.finish_polyline()))
+        self.root.bind("<Key-s>", timed("<Key-s>", lambda e: self.set_tool("segment")))
+        self.root.bind("<Key-o>", timed("<Key-o>", lambda e: self.set_tool("polyline")))
+        self.root.bind("<Key-c>", timed("<Key-c>", lambda e: self.set_tool("circle")))
+        self.root.bind("<Key-a>", timed("<Key-a>", lambda e: self.set_tool("arc")))
+        self.root.bind("<Key-p>", timed("<Key-p>", lambda e: self.set_tool("pan")))
+        self.root.bind("<Key-d>", timed("<Key-d>", lambda e: self.set_tool("delete")))
+        self.root.bind("<Key-v>", timed("<Key-v>", lambda e: self.set_tool("select")))
+        self.root.bind("<Key-g>", timed("<Key-g>", lambda e: self.toggle_snap()))
+        self.root.bind("<Control-w>", timed("<Control-w>", lambda e: self.clear_scene()))
+        self.root.bind("<Delete>", timed("<Delete>", lambda e: self.delete_selection()))
+        self.root.bind("<Key-l>", timed("<Key-l>", lambda e: self.rotate_view(15)))
+        self.root.bind("<Key-r>", timed("<Key-r>", lambda e: self.rotate_view(-15)))
+        self.root.bind("<Shift-L>", timed("<Shift-L>", lambda e: self.rotate_view(90)))
+        self.root.bind("<Shift-R>", timed("<Shift-R>", lambda e: self.rotate_view(-90)))
 
     def show_context_menu(self, e):
         menu = tk.Menu(self.root, tearoff=0, bg="#2b2b2b", fg="white")
@@ -221,7 +251,6 @@ class SceneCADApp(CADUI):
                     y2 = y1 + length * sin(angle)
 
                 self.scene.add_segment(x1, y1, x2, y2, current_style)
-                self.view.draw_all()
                 self.update_info()
                 self.zoom_extents()
                 dialog.destroy()
@@ -232,6 +261,128 @@ class SceneCADApp(CADUI):
         self._create_styled_button(dialog, text="Добавить", command=on_confirm, bg="#4477aa").pack(pady=15)
         dialog.bind('<Return>', lambda e: on_confirm())
 
+    # --- Блоки ---
+
+    def _selected_block_sources(self):
+        """Выделенные объекты, из которых можно собрать блок (отрезки и полилинии)."""
+        return [obj for obj in self._ordered_selected_objects() if obj.style_name]
+
+    @staticmethod
+    def _objects_base_point(objects):
+        """Базовая точка блока — левый нижний угол габаритов объектов."""
+        bounds = [obj.bounds() for obj in objects]
+        return min(b[0] for b in bounds), min(b[1] for b in bounds)
+
+    def create_block_from_selection(self):
+        """Создает блок из выделенных объектов и заменяет их одной вставкой."""
+        objects = self._selected_block_sources()
+        if not objects:
+            messagebox.showinfo("Блоки", "Выделите отрезки или полилинии для создания блока.")
+            return
+        name = simpledialog.askstring("Новый блок", "Имя блока:", parent=self.root)
+        if not name or not name.strip():
+            return
+        name = name.strip()
+        base = self._objects_base_point(objects)
+        try:
+            self.scene.define_block(name, objects, base)
+        except ValueError as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
+
+        self.scene.remove_objects(objects)
+        self._schedule_compaction()
+        reference = self.scene.insert_block(name, base[0], base[1])
+        self.selected_segments = {reference}
+        self.block_insert = (name, 0.0, 1.0)
+        self.view.draw_all()
+        self.update_info()
+        self.update_selection_ui()
+
+    def redefine_block_from_selection(self):
+        """Заменяет содержимое существующего блока выделенными объектами; все вставки обновляются."""
+        objects = self._selected_block_sources()
+        if not objects or not self.scene.blocks:
+            messagebox.showinfo("Блоки", "Выделите отрезки или полилинии и убедитесь, что блоки существуют.")
+            return
+        initial = self.block_insert[0] if self.block_insert else next(iter(self.scene.blocks))
+        name = simpledialog.askstring("Переопределить блок", "Имя блока:", initialvalue=initial, parent=self.root)
+        if not name or name.strip() not in self.scene.blocks:
+            if name:
+                messagebox.showerror("Ошибка", f"Блок '{name}' не найден.")
+            return
+
+        self.scene.redefine_block(name.strip(), objects, self._objects_base_point(objects))
+        self.scene.remove_objects(objects)
+        self._schedule_compaction()
+        self.selected_segments.difference_update(objects)
+        self.view.draw_all()
+        self.update_info()
+        self.update_selection_ui()
+
+    def _array_source(self):
+        """
+        Источник массива: единственная выделенная вставка блока используется как есть,
+        иначе из выделенных отрезков/полилиний создается новый блок.
+        Возвращает (имя блока, x, y, поворот, масштаб, исходные объекты, создан ли блок) или None.
+        """
+        selection = list(self.selected_segments)
+        if len(selection) == 1 and type(selection[0]) is BlockReference:
+            ref = selection[0]
+            return ref.block.name, ref.x, ref.y, ref.rotation, ref.scale, selection, False
+
+        objects = self._selected_block_sources()
+        if not objects:
+            return None
+        index = 1
+        while f"Массив-{index}" in self.scene.blocks:
+            index += 1
+        name = f"Массив-{index}"
+        base = self._objects_base_point(objects)
+        self.scene.define_block(name, objects, base)
+        return name, base[0], base[1], 0.0, 1.0, objects, True
+
+    def selection_base_point(self):
+        """Базовая точка текущего выделения (для значений по умолчанию в диалогах)."""
+        objects = list(self.selected_segments)
+        return self._objects_base_point(objects) if objects else (0.0, 0.0)
+
+    def create_array_from_selection(self, mode, rows=1, cols=1, row_spacing=0.0, col_spacing=0.0,
+                                    count=1, angle_deg=360.0, center=(0.0, 0.0)):
+        """Заменяет выделение массивом вставок блока (прямоугольным или круговым)."""
+        source = self._array_source()
+        if not source:
+            messagebox.showinfo("Массив", "Выделите объекты или одну вставку блока.")
+            return None
+        name, x, y, rotation, scale, objects, created = source
+
+        try:
+            if mode == "polar":
+                array_ref = self.scene.add_polar_array(name, x, y, count, radians(angle_deg), center,
+                                                       rotation, scale)
+            else:
+                array_ref = self.scene.add_rectangular_array(name, x, y, rows, cols, row_spacing, col_spacing,
+                                                             rotation, scale)
+        except ValueError:
+            # Параметры массива отклонены — только что созданный блок не должен остаться на сцене
+            if created:
+                del self.scene.blocks[name]
+            raise
+        self.scene.remove_objects(objects)
+        self._schedule_compaction()
+        self.selected_segments = {array_ref}
+        self.view.draw_all()
+        self.update_info()
+        self.update_selection_ui()
+        return array_ref
+
+    def start_block_insert(self, name, rotation_deg=0.0, scale=1.0):
+        """Включает инструмент вставки блока с заданными параметрами."""
+        if name not in self.scene.blocks:
+            return
+        self.set_tool("block")
+        self.block_insert = (name, radians(rotation_deg), scale)
+
     # --- Методы View/Zoom ---
 
     def _get_reliable_center(self):
@@ -275,9 +426,10 @@ class SceneCADApp(CADUI):
         color_code = colorchooser.askcolor(title="Выберите цвет для текущего стиля")[1]
         if color_code:
             style_name = self.style_manager.current_style_name
+            old_descriptor = self.style_manager.get_render_descriptor(style_name)
             self.style_manager.update_style(style_name, color=color_code)
             self.segment_color = color_code
-            self.view.draw_all()
+            self.view.restyle_style(style_name, old_descriptor)
 
     def choose_bg_color(self):
         color_code = colorchooser.askcolor(title="Выберите цвет фона")[1]
@@ -285,9 +437,46 @@ class SceneCADApp(CADUI):
             self.view.set_bg_color(color_code)
             self.view.draw_all()
 
+    def toggle_world_dashes(self):
+        """Переключает штриховку в мировых единицах (длины штрихов по ГОСТ 2.303)."""
+        self.view.world_space_dashes = self.world_dashes_enabled.get()
+        self.view.draw_all()
+
+    def toggle_perf_overlay(self, visible=None):
+        """Показывает/скрывает оверлей производительности (F3)."""
+        if visible is not None:
+            self.perf_overlay_enabled.set(visible)
+        self.view.set_overlay_visible(self.perf_overlay_enabled.get())
+
+    def export_frame_profile(self):
+        """Сохраняет замеры кадров в CSV."""
+        if not self.profiler.frames:
+            messagebox.showinfo("Профилирование", "Замеров кадров пока нет.")
+            return
+        path = filedialog.asksaveasfilename(title="Экспорт замеров кадров", defaultextension=".csv",
+                                            filetypes=[("CSV", "*.csv"), ("Все файлы", "*.*")])
+        if not path:
+            return
+        try:
+            self.profiler.export_csv(path)
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить файл:\n{e}")
+
+    def toggle_raster_tiles(self):
+        """Переключает растровые тайлы при панорамировании."""
+        self.view.raster_mode = self.raster_tiles_enabled.get()
+        self.view.draw_all()
+
+    def toggle_density_map(self):
+        """Переключает автоматический переход к карте плотности при сильном отдалении."""
+        self.view.density_map_enabled = self.density_map_enabled.get()
+        self.view.draw_all()
+
     def set_tool(self, t):
         self.tool.set(t)
         self.temp_point = None
+        self.polyline_points = []
+        self.arc_points = []
         self.view.clear_preview()
         self.update_tool_buttons()
         self.update_status_bar()
@@ -303,10 +492,85 @@ class SceneCADApp(CADUI):
                      fg="white" if n == self.tool.get() else "#cccccc")
 
     def update_info(self):
-        self.info_text.config(state=tk.NORMAL)
-        self.info_text.delete(1.0, tk.END)
-        self.info_text.insert(tk.END, self.scene.describe(self.angle_unit.get() == "degrees"))
-        self.info_text.config(state=tk.DISABLED)
+        """Обновляет инспектор объектов: заголовок по агрегатам сцены и только видимые строки."""
+        count = self.scene.object_count()
+        if count:
+            self.info_list.set_header(f"Всего объектов: {count}   Длина: {self.scene.total_length():.2f}")
+        else:
+            self.info_list.set_header("Нет объектов на сцене.")
+        self.info_list.refresh()
+        self.update_statistics_panel()
+
+    def _object_at_index(self, index):
+        """Объект сцены по сквозному индексу: сначала отрезки, затем составные объекты."""
+        segments = self.scene.segments
+        if index < len(segments):
+            return segments[index]
+        index -= len(segments)
+        entities = self.scene.entities
+        return entities[index] if index < len(entities) else None
+
+    def _info_row_key(self, index):
+        """Ключ строки инспектора — id объекта, по нему выделение переживает удаления."""
+        obj = self._object_at_index(index)
+        return None if obj is None else obj.segment_id
+
+    def _info_row_index(self, segment_id):
+        """Текущий сквозной индекс объекта по id или None, если объекта больше нет."""
+        obj = self.scene.get_object(segment_id)
+        if obj is None:
+            return None
+        segments = self.scene.segments
+        if isinstance(obj, Segment):
+            return segments.index(obj)
+        return len(segments) + self.scene.entities.index(obj)
+
+    def _format_info_row(self, index):
+        """Строка инспектора для одного объекта (форматируется только для видимых строк)."""
+        obj = self._object_at_index(index)
+        if obj is None:
+            return ""
+        return f"{index + 1}. " + obj.describe(self.angle_unit.get() == "degrees").replace("\n", " · ")
+
+    def select_object_at(self, index):
+        """Выделяет объект, выбранный в инспекторе."""
+        obj = self._object_at_index(index)
+        if obj is None:
+            return
+        previous = set(self.selected_segments)
+        self.selected_segments = {obj}
+        self.update_selection_ui()
+        self.view.update_selection(previous, self.selected_segments)
+
+    def select_objects_of_style(self, style_name):
+        """Выделяет все объекты стиля по индексу сцены (без обхода остальных объектов)."""
+        previous = set(self.selected_segments)
+        self.selected_segments = set(self.scene.objects_with_style(style_name))
+        self.update_selection_ui()
+        self.view.update_selection(previous, self.selected_segments)
+        return len(self.selected_segments)
+
+    def update_statistics_panel(self):
+        """Обновляет панель статистики по агрегатам сцены (без обхода отрезков)."""
+        if not hasattr(self, "stats_text"):
+            return
+        stats = self.scene.get_style_statistics()
+        extents = self.scene.get_extents()
+
+        # Счетчики по стилям — число отрезков (включая отрезки в блоках), а не объектов сцены
+        lines = [f"Объектов: {self.scene.object_count()}   "
+                 f"Длина: {self.scene.total_length():.2f}"]
+        if extents:
+            min_x, min_y, max_x, max_y = extents
+            lines.append(f"Габариты: {max_x - min_x:.2f} × {max_y - min_y:.2f}")
+        for name in sorted(stats):
+            count, total = stats[name]
+            lines.append(f"{name}: {count} шт., {total:.2f}")
+
+        self.stats_text.config(state=tk.NORMAL)
+        self.stats_text.delete(1.0, tk.END)
+        self.stats_text.insert(tk.END, "\n".join(lines))
+        self.stats_text.config(state=tk.DISABLED)
 
     def clear_scene(self, e=None):
         if messagebox.askyesno("Подтверждение", "Очистить все объекты на сцене? (Ctrl+W)"):
@@ -316,8 +580,30 @@ class SceneCADApp(CADUI):
             self.update_info()
             self.update_selection_ui()
 
+    def delete_selection(self):
+        """Удаляет выделенные объекты (Delete); стоимость пропорциональна размеру выделения."""
+        if not self.selected_segments:
+            return
+        self.scene.remove_objects(self.selected_segments)
+        self._schedule_compaction()
+        self.selected_segments = set()
+        self.view.draw_all()
+        self.update_info()
+        self.update_selection_ui()
+
+    def _schedule_compaction(self):
+        """Планирует уплотнение хранилища сцены на время простоя, если накопилось много пустых слотов."""
+        if self._compact_job is None and self.scene.needs_compaction():
+            self._compact_job = self.root.after_idle(self._compact_scene)
+
+    def _compact_scene(self):
+        self._compact_job = None
+        self.scene.compact()
+
     def cancel_operation(self, e=None):
         self.temp_point = None
+        self.polyline_points = []
+        self.arc_points = []
         self.view.clear_preview()
         self.set_tool("segment")
 
@@ -325,15 +611,26 @@ class SceneCADApp(CADUI):
         wx, wy = self.last_mouse_world
         scale_pct = int((self.trans.scale / self.trans.BASE_SCALE) * 100)
         angle_deg = degrees(self.trans.rotation_angle) % 360
-        tools = {'segment': 'Отрезок', 'pan': 'Панорама', 'delete': 'Удаление', 'select': 'Выбор'}
+        tools = {'segment': 'Отрезок', 'polyline': 'Полилиния', 'circle': 'Окружность', 'arc': 'Дуга', 'pan': 'Панорама', 'delete': 'Удаление',
+                 'select': 'Выбор', 'block': 'Вставка блока'}
         active_tool = tools.get(self.tool.get(), self.tool.get())
 
         status_text = (f"Курсор (X, Y): {wx:.2f}, {wy:.2f}    |    "
                        f"Масштаб: {scale_pct}%    |    "
                        f"Поворот Вида: {angle_deg:.1f}°    |    "
                        f"Активный Инструмент: {active_tool}")
+        record = self.profiler.last()
+        if record is not None:
+            status_text += f"    |    Кадр: {record.frame_ms:.1f} мс ({self.profiler.fps():.0f} FPS)"
+        if self.render_progress:
+            status_text += f"    |    {self.render_progress}"
         self.status_bar.config(text=status_text)
 
+    def on_render_progress(self, done, total):
+        """Индикатор прогрессивной отрисовки в строке состояния."""
+        self.render_progress = f"Отрисовка: {done * 100 // total}%" if 0 < done < total else ""
+        self.update_status_bar()
+
     # --- Методы Обработки Мыши ---
 
     def get_world_coords(self, e):
@@ -358,17 +655,29 @@ class SceneCADApp(CADUI):
                 self.view.draw_all()
                 self.update_info()
 
+        elif self.tool.get() == "polyline":
+            if not self.polyline_points or self.polyline_points[-1] != (wx, wy):
+                self.polyline_points.append((wx, wy))
+
+        elif self.tool.get() in ("circle", "arc"):
+            self._add_arc_point(wx, wy)
+
+        elif self.tool.get() == "block":
+            if self.block_insert:
+                name, rotation, scale = self.block_insert
+                self.scene.insert_block(name, wx, wy, rotation, scale)
+                self.view.draw_all()
+                self.update_info()
+
         elif self.tool.get() == "delete":
-            tolerance = 8 / self.trans.scale
-            for i in range(len(self.scene.segments) - 1, -1, -1):
-                s = self.scene.segments[i]
-                if distance_point_to_segment(wx, wy, s.x1, s.y1, s.x2, s.y2) < tolerance:
-                    removed = self.scene.segments.pop(i)
-                    self.selected_segments.discard(removed)
-                    self.view.draw_all()
-                    self.update_info()
-                    self.update_selection_ui()
-                    break
+            obj = self._find_segment_at(wx, wy)
+            if obj:
+                self.scene.remove_object(obj)
+                self._schedule_compaction()
+                self.selected_segments.discard(obj)
+                self.view.draw_all()
+                self.update_info()
+                self.update_selection_ui()
 
         elif self.tool.get() == "pan":
             self.drag_start = (e.x, e.y)
@@ -385,6 +694,64 @@ class SceneCADApp(CADUI):
 
         if self.tool.get() == "segment" and self.temp_point:
             self.view.draw_preview(self.temp_point, (wx, wy), self.style_manager.current_style_name)
+        elif self.tool.get() == "polyline" and self.polyline_points:
+            self.view.draw_polyline_preview(self.polyline_points, (wx, wy),
+                                            self.style_manager.current_style_name)
+        elif self.tool.get() in ("circle", "arc") and self.arc_points:
+            self._preview_arc(wx, wy)
+
+    def _arc_from_points(self, wx, wy):
+        """(центр, радиус, начальный угол, раствор) по набранным точкам и текущей точке."""
+        cx, cy = self.arc_points[0]
+        if self.tool.get() == "circle" or len(self.arc_points) == 1:
+            return cx, cy, hypot(wx - cx, wy - cy), 0.0, 2 * pi
+        sx, sy = self.arc_points[1]
+        start = atan2(sy - cy, sx - cx)
+        sweep = (atan2(wy - cy, wx - cx) - start) % (2 * pi)  # против часовой стрелки от начала
+        return cx, cy, hypot(sx - cx, sy - cy), start, sweep or 2 * pi
+
+    def _add_arc_point(self, wx, wy):
+        """Окружность: центр и точка на окружности. Дуга: центр, начало и конец (против часовой)."""
+        if self.arc_points and self.arc_points[-1] == (wx, wy):
+            return
+        needed = 2 if self.tool.get() == "circle" else 3
+        if len(self.arc_points) + 1 < needed:
+            self.arc_points.append((wx, wy))
+            return
+        cx, cy, radius, start, sweep = self._arc_from_points(wx, wy)
+        self.arc_points = []
+        self.view.clear_preview()
+        if radius <= 0:
+            return
+        style = self.style_manager.current_style_name
+        if self.tool.get() == "circle":
+            self.scene.add_circle(cx, cy, radius, style)
+        else:
+            self.scene.add_arc(cx, cy, radius, start, sweep, style)
+        self.view.draw_all()
+        self.update_info()
+
+    def _preview_arc(self, wx, wy):
+        style = self.style_manager.current_style_name
+        if self.tool.get() == "arc" and len(self.arc_points) == 1:
+            # Пока задается радиус дуги — показываем луч от центра
+            self.view.draw_preview(self.arc_points[0], (wx, wy), style)
+            return
+        cx, cy, radius, start, sweep = self._arc_from_points(wx, wy)
+        self.view.draw_arc_preview(cx, cy, radius, start, sweep, style)
+
+    def finish_polyline(self):
+        """Завершает построение полилинии (двойной щелчок или Enter)."""
+        if self.tool.get() != "polyline":
+            return
+        points = self.polyline_points
+        self.polyline_points = []
+        self.view.clear_preview()
+        if len(points) < 2:
+            return
+        self.scene.add_polyline(points, self.style_manager.current_style_name)
+        self.view.draw_all()
+        self.update_info()
 
     def on_mouse_drag(self, e):
         if self.tool.get() == "pan":
@@ -393,6 +760,7 @@ class SceneCADApp(CADUI):
     # --- Методы выбора и свойств ---
 
     def _handle_selection_click(self, wx, wy, additive=False):
+        previous = set(self.selected_segments)
         seg = self._find_segment_at(wx, wy)
         if not seg and not additive:
             self.selected_segments.clear()
@@ -406,7 +774,7 @@ class SceneCADApp(CADUI):
                 self.selected_segments = {seg}
 
         self.update_selection_ui()
-        self.view.draw_all()
+        self.view.update_selection(previous, self.selected_segments)
 
     def _find_segment_at(self, wx, wy):
         tolerance = 8 / self.trans.scale
@@ -417,6 +785,14 @@ class SceneCADApp(CADUI):
             if dist < tolerance and dist < closest_dist:
                 closest = seg
                 closest_dist = dist
+        for entity in self.scene.entities:
+            x_lo, y_lo, x_hi, y_hi = entity.bounds()
+            if wx < x_lo - tolerance or wx > x_hi + tolerance or wy < y_lo - tolerance or wy > y_hi + tolerance:
+                continue
+            dist = entity.distance_to(wx, wy)
+            if dist < tolerance and dist < closest_dist:
+                closest = entity
+                closest_dist = dist
         return closest
 
     def update_selection_ui(self):
@@ -433,13 +809,24 @@ class SceneCADApp(CADUI):
             self.render_style_preview(self.selection_preview_canvas, None)
             self.selection_apply_btn.config(state="disabled")
             self._set_selection_details("Выделите один или несколько объектов, чтобы увидеть их свойства.")
+            if hasattr(self, "selection_page_label"):
+                self.selection_page_label.config(text="")
+                self.selection_prev_btn.config(state="disabled")
+                self.selection_next_btn.config(state="disabled")
             return
 
         self.selection_info_label.config(text=f"Выбрано объектов: {count}")
         self.selection_style_combobox.config(state="readonly")
         self.selection_apply_btn.config(state="normal")
 
-        styles = {seg.style_name for seg in self.selected_segments}
+        # Сводка считается одним проходом; подробности по объектам — постранично и лениво
+        summary = SelectionSummary(self.selected_segments)
+        self._selection_summary = summary
+        self._selection_order = None
+        self._selection_page = 0
+
+        # У вставок блоков собственного стиля нет — стили задаются определением блока
+        styles = set(summary.own_style_names())
         if len(styles) == 1:
             style_name = styles.pop()
             self.selection_style_var.set(style_name)
@@ -451,9 +838,9 @@ class SceneCADApp(CADUI):
             self.selection_style_var.set("")
             self.selection_style_combobox.set("")
             self.render_style_preview(self.selection_preview_canvas, None)
-            self.selection_style_state_label.config(text="Разные")
+            self.selection_style_state_label.config(text="Разные" if styles else "По блоку")
 
-        self._set_selection_details(self._build_selection_details())
+        self._show_selection_page()
 
     def apply_style_to_selection(self, style_name=None):
         if not self.selected_segments:
@@ -464,28 +851,61 @@ class SceneCADApp(CADUI):
         style = self.style_manager.get_style(style_name)
         if not style:
             return
-        for seg in self.selected_segments:
-            seg.style_name = style_name
+        self.scene.set_segments_style(self.selected_segments, style_name)
         self.selection_style_var.set(style_name)
         if hasattr(self, "selection_style_combobox"):
             self.selection_style_combobox.set(style_name)
         self.render_style_preview(self.selection_preview_canvas, style)
         self.selection_style_state_label.config(text=style_name)
-        self.view.draw_all()
+        self.view.restyle_objects(self.selected_segments)
         self.update_selection_ui()
+        self.update_statistics_panel()
 
     def _ordered_selected_objects(self):
         return sorted(self.selected_segments, key=lambda obj: getattr(obj, "segment_id", 0))
 
-    def _build_selection_details(self):
-        objects = self._ordered_selected_objects()
-        if not objects:
-            return ""
-        details = [self._format_object_info(obj) for obj in objects]
-        return "\n\n".join(details)
+    def _selection_page_objects(self, page):
+        """
+        Объекты страницы page в порядке id. Первая страница выбирается частичной сортировкой,
+        полный порядок строится, только когда пользователь листает дальше.
+        """
+        key = lambda obj: getattr(obj, "segment_id", 0)
+        if page == 0 and self._selection_order is None:
+            return heapq.nsmallest(SELECTION_PAGE_SIZE, self.selected_segments, key=key)
+        if self._selection_order is None:
+            self._selection_order = sorted(self.selected_segments, key=key)
+        start = page * SELECTION_PAGE_SIZE
+        return self._selection_order[start:start + SELECTION_PAGE_SIZE]
+
+    def _selection_page_count(self):
+        return max(1, -(-len(self.selected_segments) // SELECTION_PAGE_SIZE))
+
+    def _show_selection_page(self):
+        """Выводит сводку по выделению и текущую страницу подробностей."""
+        pages = self._selection_page_count()
+        self._selection_page = max(0, min(self._selection_page, pages - 1))
+        details = [self._format_object_info(obj) for obj in self._selection_page_objects(self._selection_page)]
+        text = "\n".join(self._selection_summary.lines())
+        if len(self.selected_segments) > SELECTION_PAGE_SIZE:
+            first = self._selection_page * SELECTION_PAGE_SIZE + 1
+            text += f"\n\n— Объекты {first}–{first + len(details) - 1} —"
+        text += "\n\n" + "\n\n".join(details)
+        self._set_selection_details(text)
+
+        if hasattr(self, "selection_page_label"):
+            self.selection_page_label.config(text=f"Стр. {self._selection_page + 1}/{pages}")
+            self.selection_prev_btn.config(state="normal" if self._selection_page > 0 else "disabled")
+            self.selection_next_btn.config(state="normal" if self._selection_page < pages - 1 else "disabled")
+
+    def change_selection_page(self, delta):
+        """Листает страницы подробностей выделения."""
+        if not self.selected_segments:
+            return
+        self._selection_page += delta
+        self._show_selection_page()
 
     def _format_object_info(self, obj):
-        if hasattr(obj, "segment_id"):
+        if isinstance(obj, Segment):
             length = obj.length()
             angle = obj.angle(True)
             return (f"Отрезок #{obj.segment_id}\n"
@@ -514,7 +934,7 @@ class SceneCADApp(CADUI):
         dx, dy = e.x - self.drag_start[0], e.y - self.drag_start[1]
         self.trans.pan(dx, dy)
         self.drag_start = (e.x, e.y)
-        self.view.draw_all()
+        self.view.draw_interactive()
 
     def end_pan(self, e):
         self.drag_start = None
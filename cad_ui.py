@@ -1,6 +1,20 @@
 import tkinter as tk
-from tkinter import colorchooser, messagebox, ttk
-from math import sin, pi
+from tkinter import filedialog, messagebox, simpledialog, ttk
+
+from core.render_descriptor import RenderKind
+from core.wave_geometry import wave_profile, ZIGZAG
+
+
+class _PreviewRecorder:
+    """Записывает команды рисования образца стиля для последующего воспроизведения на холсте."""
+
+    def __init__(self):
+        self.ops = []
+
+    def __getattr__(self, method):
+        if not method.startswith("create_"):
+            raise AttributeError(method)
+        return lambda *args, **options: self.ops.append((method, args, options))
 
 
 class CADUI:
@@ -9,6 +23,11 @@ class CADUI:
 
     def __init__(self, root, app_ref):
         self.app = app_ref
+        self._preview_cache = {}  # (имя стиля, ширина, высота) -> (ключ образца, команды рисования)
+        # Тяжелые диалоги строятся при первом открытии, затем только скрываются и показываются
+        self._style_dialog = None
+        self._latency_dialog = None
+        self._latency_refresh = None
         self._setup_ui(root)
         # Дополнительная инициализация
         self.app.style_combobox.set(self.app.style_manager.current_style_name)
@@ -28,10 +47,13 @@ class CADUI:
                          **kwargs)
 
     def render_style_preview(self, canvas, style):
-        """Рисует визуальный образец линии на указанном Canvas."""
+        """
+        Рисует визуальный образец линии на указанном Canvas. Команды рисования строятся один раз
+        для стиля, его ревизии и размера холста и затем только воспроизводятся; холст, на котором
+        уже показан тот же образец, не перерисовывается.
+        """
         if not canvas:
             return
-        canvas.delete("all")
         try:
             width = int(canvas.cget("width"))
         except Exception:
@@ -43,6 +65,24 @@ class CADUI:
         if width <= 0: width = 120
         if height <= 0: height = 22
 
+        revision = style.revision if style else None
+        key = (style, revision, width, height)
+        if getattr(canvas, "_preview_key", None) == key:
+            return
+        cache_key = (style.name if style else None, width, height)
+        cached = self._preview_cache.get(cache_key)
+        if cached is None or cached[0] != key:
+            recorder = _PreviewRecorder()
+            self._record_style_preview(recorder, style, width, height)
+            cached = (key, recorder.ops)
+            self._preview_cache[cache_key] = cached
+
+        canvas.delete("all")
+        for method, args, options in cached[1]:
+            getattr(canvas, method)(*args, **options)
+        canvas._preview_key = key
+
+    def _record_style_preview(self, canvas, style, width, height):
         margin = 10
         baseline = height // 2 + 5
 
@@ -68,13 +108,14 @@ class CADUI:
         MM_TO_PIXEL = 3.0
         line_width = max(1.5, style.thickness_mm * MM_TO_PIXEL)
         dash_pattern = style.get_tk_dash_pattern(1.0)
-        name_lower = style.name.lower()
+        descriptor = self.app.style_manager.get_render_descriptor(style.name)
+        kind = descriptor.kind if descriptor else RenderKind.SOLID
         preview_y = baseline - 6
 
-        if "волнистая" in name_lower:
+        if kind is RenderKind.WAVY:
             self._render_wavy_preview(canvas, margin + 8, preview_y, width - margin,
                                       preview_y, style.color, line_width)
-        elif "изломами" in name_lower:
+        elif kind is RenderKind.ZIGZAG:
             self._render_zigzag_preview(canvas, margin + 8, preview_y, width - margin,
                                         preview_y, style.color, line_width)
         else:
@@ -97,33 +138,14 @@ class CADUI:
 
     def _build_preview_wave_points(self, x1, x2, baseline, amplitude, wavelength, mode):
         length = max(x2 - x1, 1)
-        if mode == "wave":
-            periods = max(length / wavelength, 1)
-            steps = max(int(periods * 16), 8)
-            points = []
-            for i in range(steps + 1):
-                t = i / steps
-                dist = t * length
-                x = x1 + dist
-                phase = 2 * pi * dist / wavelength
-                y = baseline + sin(phase) * amplitude
-                points.extend([x, y])
-            return points
-        else:
-            spacing = max(wavelength, 12)
-            points = [x1, baseline]
-            i = 1
-            while True:
-                dist = i * spacing
-                if dist >= length:
-                    break
-                x = x1 + dist
-                points.extend([x, baseline])
-                offset = amplitude if i % 2 else -amplitude
-                points.extend([x, baseline + offset, x, baseline])
-                i += 1
-            points.extend([x2, baseline])
-            return points
+        if mode == ZIGZAG:
+            wavelength = max(wavelength, 12)
+        profile = wave_profile(length, wavelength, amplitude, mode)
+        points = list(profile)
+        for i in range(0, len(points), 2):
+            points[i] += x1
+            points[i + 1] += baseline
+        return points
 
     def _setup_ui(self, root):
         """Создает и размещает все виджеты (Меню, Панель, Статусбар, Холст, Инспектор)."""
@@ -139,6 +161,35 @@ class CADUI:
         view_menu.add_command(label="Уменьшить (-)", command=self.app.zoom_out)
         view_menu.add_command(label="Панорамирование (P)", command=lambda: self.app.set_tool("pan"))
         view_menu.add_command(label="Сбросить вид", command=self.app.reset_view)
+        view_menu.add_separator()
+        view_menu.add_checkbutton(label="Штрихи в мировых единицах (ГОСТ)",
+                                  variable=self.app.world_dashes_enabled,
+                                  command=self.app.toggle_world_dashes)
+        view_menu.add_checkbutton(label="Карта плотности при сильном отдалении",
+                                  variable=self.app.density_map_enabled,
+                                  command=self.app.toggle_density_map)
+        view_menu.add_checkbutton(label="Растровые тайлы при панорамировании",
+                                  variable=self.app.raster_tiles_enabled,
+                                  command=self.app.toggle_raster_tiles)
+        view_menu.add_separator()
+        view_menu.add_checkbutton(label="Оверлей производительности (F3)",
+                                  variable=self.app.perf_overlay_enabled,
+                                  command=self.app.toggle_perf_overlay)
+        view_menu.add_command(label="Экспорт замеров кадров (CSV)...", command=self.app.export_frame_profile)
+
+        diagnostics_menu = tk.Menu(menubar, tearoff=0, bg="#2b2b2b", fg="white")
+        menubar.add_cascade(label="Диагностика", menu=diagnostics_menu)
+        diagnostics_menu.add_command(label="Задержки ввода...", command=self.open_input_latency_dialog)
+        diagnostics_menu.add_command(label="Сбросить замеры", command=lambda: self.app.profiler.clear())
+
+        block_menu = tk.Menu(menubar, tearoff=0, bg="#2b2b2b", fg="white")
+        menubar.add_cascade(label="Блоки", menu=block_menu)
+        block_menu.add_command(label="Создать блок из выделенного...", command=self.app.create_block_from_selection)
+        block_menu.add_command(label="Переопределить блок из выделенного...",
+                               command=self.app.redefine_block_from_selection)
+        block_menu.add_separator()
+        block_menu.add_command(label="Вставить блок...", command=self.open_insert_block_dialog)
+        block_menu.add_command(label="Массив из выделенного...", command=self.open_array_dialog)
 
         # 2. Панель инструментов (Top Bar)
         top = tk.Frame(root, bg="#2b2b2b", height=40, bd=0, relief="flat")
@@ -223,6 +274,9 @@ class CADUI:
         # Инструменты
         self.app.tool_buttons = {}
         for tool_name, text, key in [("segment", "✏️ Отрезок [S]", "s"),
+                                     ("polyline", "〰 Полилиния [O]", "o"),
+                                     ("circle", "◯ Окружность [C]", "c"),
+                                     ("arc", "◠ Дуга [A]", "a"),
                                      ("select", "🖱 Выбор [V]", "v"),
                                      ("delete", "🗑 Удалить Объект [D]", "d")]:
             btn = self._create_styled_button(sidebar, text=text, command=lambda t=tool_name: self.app.set_tool(t),
@@ -321,21 +375,37 @@ class CADUI:
         self.app.selection_details_text = tk.Text(props_frame, height=8, bg="#1b1b1b", fg="#dcdcdc",
                                                   font=("Consolas", 9), bd=0, highlightthickness=0,
                                                   wrap=tk.NONE, state=tk.DISABLED)
-        self.app.selection_details_text.pack(fill=tk.X, pady=(0, 5))
+        self.app.selection_details_text.pack(fill=tk.X, pady=(0, 2))
+
+        pager = tk.Frame(props_frame, bg="#252526")
+        pager.pack(fill=tk.X, pady=(0, 5))
+        self.app.selection_prev_btn = self._create_styled_button(pager, text="◀",
+                                                                 command=lambda: self.app.change_selection_page(-1),
+                                                                 font_size=8)
+        self.app.selection_prev_btn.pack(side=tk.LEFT)
+        self.app.selection_page_label = tk.Label(pager, text="", bg="#252526", fg="#aaaaaa", font=("Segoe UI", 8))
+        self.app.selection_page_label.pack(side=tk.LEFT, expand=True)
+        self.app.selection_next_btn = self._create_styled_button(pager, text="▶",
+                                                                 command=lambda: self.app.change_selection_page(1),
+                                                                 font_size=8)
+        self.app.selection_next_btn.pack(side=tk.RIGHT)
+
+        tk.Label(info_frame, text="СТАТИСТИКА СЦЕНЫ", bg="#333333", fg="#cccccc", font=("Segoe UI", 9, "bold"),
+                 anchor="w", padx=10, pady=5).pack(fill=tk.X)
+
+        self.app.stats_text = tk.Text(info_frame, height=6, bg="#1b1b1b", fg="#dcdcdc",
+                                      font=("Consolas", 9), bd=0, highlightthickness=0,
+                                      wrap=tk.NONE, state=tk.DISABLED)
+        self.app.stats_text.pack(fill=tk.X, padx=10, pady=(4, 6))
 
         tk.Label(info_frame, text="ИНСПЕКТОР ОБЪЕКТОВ", bg="#333333", fg="#cccccc", font=("Segoe UI", 9, "bold"),
                  anchor="w", padx=10, pady=5).pack(fill=tk.X)
 
-        self.app.info_text = tk.Text(info_frame, bg="#1e1e1e", fg="#d4d4d4", font=("Consolas", 9),
-                                     bd=0, highlightthickness=0, wrap=tk.WORD, state=tk.DISABLED)
-        self.app.info_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(5, 0), pady=5)
+        # Строки инспектора форматируются только для видимой части списка
+        self.app.info_list = VirtualListView(info_frame, on_activate=self.app.select_object_at)
+        self.app.info_list.pack(fill=tk.BOTH, expand=True)
 
-        sb = tk.Scrollbar(info_frame, command=self.app.info_text.yview, bg="#252526", troughcolor="#1e1e1e",
-                          borderwidth=0)
-        sb.pack(side=tk.RIGHT, fill=tk.Y, pady=5)
-        self.app.info_text.config(yscrollcommand=sb.set)
-
-        return self.app.canvas, self.app.status_bar, self.app.info_text
+        return self.app.canvas, self.app.status_bar, self.app.info_list
 
     def _on_style_select(self, event):
         """Обрабатывает выбор стиля из ComboBox."""
@@ -348,11 +418,14 @@ class CADUI:
 
     def update_current_style_ui(self):
         """Обновляет выпадающий список стилей."""
+        # Индекс возвращает тот же кортеж, пока набор стилей не менялся — списки не переприсваиваются
         style_names = self.app.style_manager.get_style_names()
-        self.app.style_combobox['values'] = style_names
+        if style_names is not getattr(self, "_combobox_names", None):
+            self._combobox_names = style_names
+            self.app.style_combobox['values'] = style_names
+            if hasattr(self.app, "selection_style_combobox"):
+                self.app.selection_style_combobox['values'] = style_names
         self.app.current_style_var.set(self.app.style_manager.current_style_name)
-        if hasattr(self.app, "selection_style_combobox"):
-            self.app.selection_style_combobox['values'] = style_names
         if hasattr(self, "current_style_preview"):
             style = self.app.style_manager.get_style(self.app.style_manager.current_style_name)
             self.render_style_preview(self.current_style_preview, style)
@@ -370,9 +443,170 @@ class CADUI:
     def _apply_selection_style(self):
         self.app.apply_style_to_selection(self.app.selection_style_var.get())
 
+    def open_insert_block_dialog(self):
+        """Диалог выбора блока и параметров вставки (поворот, масштаб)."""
+        block_names = sorted(self.app.scene.blocks)
+        if not block_names:
+            messagebox.showinfo("Блоки", "Блоки не определены. Создайте блок из выделенных объектов.")
+            return
+
+        dialog = tk.Toplevel(self.app.root)
+        dialog.title("Вставить блок")
+        dialog.geometry("300x190")
+        dialog.configure(bg="#2b2b2b")
+        dialog.transient(self.app.root)
+        dialog.grab_set()
+
+        current = self.app.block_insert[0] if self.app.block_insert else block_names[0]
+        name_var = tk.StringVar(value=current if current in block_names else block_names[0])
+        rotation_var = tk.StringVar(value="0")
+        scale_var = tk.StringVar(value="1")
+
+        tk.Label(dialog, text="Блок:", bg="#2b2b2b", fg="#cccccc").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        ttk.Combobox(dialog, textvariable=name_var, values=block_names, state="readonly",
+                     width=18, style='TCombobox').grid(row=0, column=1, padx=5, pady=5, sticky="w")
+
+        tk.Label(dialog, text="Поворот (°):", bg="#2b2b2b", fg="#cccccc").grid(row=1, column=0, padx=5, pady=5,
+                                                                              sticky="w")
+        tk.Entry(dialog, textvariable=rotation_var, bg="#3a3a3a", fg="white", relief="flat").grid(row=1, column=1,
+                                                                                                  padx=5, pady=5)
+
+        tk.Label(dialog, text="Масштаб:", bg="#2b2b2b", fg="#cccccc").grid(row=2, column=0, padx=5, pady=5,
+                                                                           sticky="w")
+        tk.Entry(dialog, textvariable=scale_var, bg="#3a3a3a", fg="white", relief="flat").grid(row=2, column=1,
+                                                                                               padx=5, pady=5)
+
+        def on_confirm():
+            try:
+                rotation = float(rotation_var.get())
+                scale = float(scale_var.get())
+                if scale == 0:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Ошибка", "Введите корректные числа!", parent=dialog)
+                return
+            self.app.start_block_insert(name_var.get(), rotation, scale)
+            dialog.destroy()
+
+        self._create_styled_button(dialog, text="Вставлять щелчком", command=on_confirm,
+                                   bg="#4477aa").grid(row=3, column=0, columnspan=2, pady=10)
+
+    def open_array_dialog(self):
+        """Диалог параметров прямоугольного или кругового массива для текущего выделения."""
+        if not self.app.selected_segments:
+            messagebox.showinfo("Массив", "Сначала выделите объекты для массива.")
+            return
+
+        dialog = tk.Toplevel(self.app.root)
+        dialog.title("Массив")
+        dialog.geometry("330x330")
+        dialog.configure(bg="#2b2b2b")
+        dialog.transient(self.app.root)
+        dialog.grab_set()
+
+        base_x, base_y = self.app.selection_base_point()
+        mode_var = tk.StringVar(value="rect")
+        fields = {
+            "rows": tk.StringVar(value="2"), "cols": tk.StringVar(value="2"),
+            "row_spacing": tk.StringVar(value="10"), "col_spacing": tk.StringVar(value="10"),
+            "count": tk.StringVar(value="6"), "angle_deg": tk.StringVar(value="360"),
+            "center_x": tk.StringVar(value=f"{base_x:.2f}"), "center_y": tk.StringVar(value=f"{base_y:.2f}"),
+        }
+
+        mode_frame = tk.Frame(dialog, bg="#2b2b2b")
+        mode_frame.grid(row=0, column=0, columnspan=2, pady=(10, 5))
+        for value, text in (("rect", "Прямоугольный"), ("polar", "Круговой")):
+            tk.Radiobutton(mode_frame, text=text, variable=mode_var, value=value,
+                           bg="#2b2b2b", fg="#cccccc", selectcolor="#4477aa", activebackground="#2b2b2b",
+                           activeforeground="white", font=("Segoe UI", 9, "bold")).pack(side=tk.LEFT, padx=8)
+
+        rows = [("rows", "Рядов:"), ("cols", "Столбцов:"), ("row_spacing", "Шаг рядов:"),
+                ("col_spacing", "Шаг столбцов:"), ("count", "Элементов (круг.):"),
+                ("angle_deg", "Угол заполнения (°):"), ("center_x", "Центр X:"), ("center_y", "Центр Y:")]
+        for i, (key, text) in enumerate(rows, start=1):
+            tk.Label(dialog, text=text, bg="#2b2b2b", fg="#cccccc").grid(row=i, column=0, padx=5, pady=2, sticky="w")
+            tk.Entry(dialog, textvariable=fields[key], width=12, bg="#3a3a3a", fg="white",
+                     relief="flat").grid(row=i, column=1, padx=5, pady=2, sticky="w")
+
+        def on_confirm():
+            try:
+                values = {key: float(var.get()) for key, var in fields.items()}
+                if mode_var.get() == "polar":
+                    if values["count"] < 1:
+                        raise ValueError
+                    self.app.create_array_from_selection(
+                        "polar", count=int(values["count"]), angle_deg=values["angle_deg"],
+                        center=(values["center_x"], values["center_y"]))
+                else:
+                    if values["rows"] < 1 or values["cols"] < 1:
+                        raise ValueError
+                    self.app.create_array_from_selection(
+                        "rect", rows=int(values["rows"]), cols=int(values["cols"]),
+                        row_spacing=values["row_spacing"], col_spacing=values["col_spacing"])
+            except ValueError:
+                messagebox.showerror("Ошибка", "Введите корректные числа!", parent=dialog)
+                return
+            dialog.destroy()
+
+        self._create_styled_button(dialog, text="Создать массив", command=on_confirm,
+                                   bg="#4477aa").grid(row=len(rows) + 1, column=0, columnspan=2, pady=10)
+
+    def _show_existing_dialog(self, dialog, modal=False):
+        """Показывает ранее построенный скрытый диалог; False, если его еще нет."""
+        if dialog is None or not dialog.winfo_exists():
+            return False
+        dialog.deiconify()
+        dialog.lift()
+        if modal:
+            dialog.grab_set()
+        return True
+
+    def _keep_dialog(self, dialog):
+        """Закрытие диалога только скрывает его, чтобы при следующем открытии не строить заново."""
+        def hide():
+            dialog.grab_release()
+            dialog.withdraw()
+        dialog.protocol("WM_DELETE_WINDOW", hide)
+
+    def open_input_latency_dialog(self):
+        """Окно с гистограммами задержек обработчиков ввода и списком медленных событий."""
+        if self._show_existing_dialog(self._latency_dialog):
+            self._latency_refresh()
+            return
+        dialog = self._latency_dialog = tk.Toplevel(self.app.root)
+        dialog.title("Задержки ввода")
+        dialog.geometry("620x480")
+        dialog.configure(bg="#2b2b2b")
+        dialog.transient(self.app.root)
+
+        text = tk.Text(dialog, bg="#1e1e1e", fg="#d4d4d4", font=("Consolas", 9), relief="flat", wrap="none")
+        text.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
+
+        def refresh():
+            text.config(state=tk.NORMAL)
+            text.delete(1.0, tk.END)
+            text.insert(tk.END, self.app.profiler.latency_report())
+            text.config(state=tk.DISABLED)
+
+        def reset():
+            self.app.profiler.clear()
+            refresh()
+
+        btn_frame = tk.Frame(dialog, bg="#2b2b2b")
+        btn_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        self._create_styled_button(btn_frame, text="Обновить", command=refresh, font_size=8).pack(side=tk.LEFT, padx=5)
+        self._create_styled_button(btn_frame, text="Сбросить", command=reset, bg="#993333",
+                                   font_size=8).pack(side=tk.RIGHT, padx=5)
+        self._latency_refresh = refresh
+        self._keep_dialog(dialog)
+        refresh()
+
     def open_style_manager_dialog(self):
         """Открывает диалог управления стилями линий."""
-        dialog = tk.Toplevel(self.app.root)
+        if self._show_existing_dialog(self._style_dialog, modal=True):
+            self.refresh_style_list()
+            return
+        dialog = self._style_dialog = tk.Toplevel(self.app.root)
         dialog.title("Управление Стилями Линий (ГОСТ 2.303-68)")
         dialog.geometry("500x450")
         dialog.configure(bg="#2b2b2b")
@@ -383,13 +617,24 @@ class CADUI:
         tk.Label(dialog, text="ГЛОБАЛЬНАЯ ПАЛИТРА СТИЛЕЙ", bg="#333333", fg="#cccccc",
                  font=("Segoe UI", 10, "bold"), padx=10, pady=8).pack(fill=tk.X)
 
+        # Фильтр по имени стиля
+        filter_frame = tk.Frame(dialog, bg="#2b2b2b")
+        filter_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        tk.Label(filter_frame, text="Поиск:", bg="#2b2b2b", fg="#cccccc").pack(side=tk.LEFT, padx=(0, 5))
+        self.style_filter_var = tk.StringVar()
+        tk.Entry(filter_frame, textvariable=self.style_filter_var, bg="#3a3a3a", fg="white",
+                 relief="flat").pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.style_filter_var.trace_add("write", lambda *args: self.refresh_style_list())
+
         # Фрейм со списком стилей
         style_list_frame = tk.Frame(dialog, bg="#1e1e1e")
         style_list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
         self.style_list_widget = StylePreviewList(style_list_frame,
                                                   render_preview_callback=self.render_style_preview,
-                                                  on_select=self._on_style_preview_select)
+                                                  on_select=self._on_style_preview_select,
+                                                  style_provider=self.app.style_manager.get_style,
+                                                  count_provider=self.app.scene.style_usage_count)
         self.style_list_widget.pack(fill=tk.BOTH, expand=True)
 
         self.style_details_frame = tk.Frame(dialog, bg="#2b2b2b", bd=0, relief=tk.FLAT)
@@ -441,6 +686,22 @@ class CADUI:
                                    command=lambda: self._delete_selected_style(dialog), bg="#993333", font_size=9).pack(
             side=tk.RIGHT, padx=5)
 
+        library_frame = tk.Frame(dialog, bg="#2b2b2b")
+        library_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        self._create_styled_button(library_frame, text="Импорт библиотеки...",
+                                   command=lambda: self._import_style_library(dialog), font_size=8).pack(
+            side=tk.LEFT, padx=5)
+        self._create_styled_button(library_frame, text="Экспорт библиотеки...",
+                                   command=lambda: self._export_style_library(dialog), font_size=8).pack(
+            side=tk.LEFT, padx=5)
+        self._create_styled_button(library_frame, text="Выделить объекты",
+                                   command=lambda: self._select_style_objects(dialog), font_size=8).pack(
+            side=tk.RIGHT, padx=5)
+        self._create_styled_button(library_frame, text="Переименовать...",
+                                   command=lambda: self._rename_selected_style(dialog), font_size=8).pack(
+            side=tk.RIGHT, padx=5)
+
+        self._keep_dialog(dialog)
         self.refresh_style_list()  # Первоначальное заполнение списка
 
     def refresh_style_list(self, preserve_selection=True):
@@ -448,11 +709,43 @@ class CADUI:
         if not hasattr(self, "style_list_widget"):
             return
         selected = self.style_list_widget.get_selected_style() if preserve_selection else None
-        styles = [(name, self.app.style_manager.get_style(name)) for name in self.app.style_manager.get_style_names()]
-        self.style_list_widget.populate(styles)
+        query = self.style_filter_var.get() if hasattr(self, "style_filter_var") else ""
+        self.style_list_widget.populate(self.app.style_manager.search_styles(query))
         if selected:
             self.style_list_widget.select(selected)
 
+    def _import_style_library(self, parent_dialog):
+        """Загружает стили из файла библиотеки."""
+        path = filedialog.askopenfilename(parent=parent_dialog, title="Импорт библиотеки стилей",
+                                          filetypes=[("Библиотека стилей", "*.mcstyles"), ("Все файлы", "*.*")])
+        if not path:
+            return
+        try:
+            added, skipped = self.app.style_manager.import_library(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось загрузить библиотеку: {e}", parent=parent_dialog)
+            return
+        self.refresh_style_list()
+        self.update_current_style_ui()
+        message = f"Добавлено стилей: {added}."
+        if skipped:
+            message += f" Пропущено (имя уже занято): {skipped}."
+        messagebox.showinfo("Импорт", message, parent=parent_dialog)
+
+    def _export_style_library(self, parent_dialog):
+        """Сохраняет пользовательские стили в файл библиотеки."""
+        path = filedialog.asksaveasfilename(parent=parent_dialog, title="Экспорт библиотеки стилей",
+                                            defaultextension=".mcstyles",
+                                            filetypes=[("Библиотека стилей", "*.mcstyles")])
+        if not path:
+            return
+        try:
+            count = self.app.style_manager.export_library(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить библиотеку: {e}", parent=parent_dialog)
+            return
+        messagebox.showinfo("Экспорт", f"Сохранено стилей: {count}.", parent=parent_dialog)
+
     def _on_style_preview_select(self, style_name):
         """Загружает параметры выбранного стиля в поля редактирования."""
         if not style_name:
@@ -484,13 +777,14 @@ class CADUI:
 
             new_class = self.edit_class_var.get() or style.thickness_class
 
+            old_descriptor = self.app.style_manager.get_render_descriptor(selected_name)
             self.app.style_manager.update_style(selected_name,
                                                 thickness_mm=new_thickness,
                                                 dash_pattern=new_dash_pattern,
                                                 thickness_class=new_class)
 
             self.refresh_style_list()
-            self.app.view.draw_all()
+            self.app.view.restyle_style(selected_name, old_descriptor)
 
             messagebox.showinfo("Успех", f"Стиль '{selected_name}' обновлен.", parent=parent_dialog)
 
@@ -515,16 +809,62 @@ class CADUI:
                 messagebox.showerror("Ошибка", "Базовые стили ЕСКД нельзя удалять.", parent=parent_dialog)
                 return
 
-            if messagebox.askyesno("Подтверждение", f"Вы уверены, что хотите удалить стиль '{selected_name}'?",
-                                   parent=parent_dialog):
-                self.app.style_manager.delete_style(selected_name)
+            # Объекты удаляемого стиля переводятся на текущий (или первый оставшийся) стиль
+            style_manager = self.app.style_manager
+            replacement = style_manager.current_style_name
+            if replacement == selected_name:
+                replacement = next(name for name in style_manager.get_style_names() if name != selected_name)
+            used = self.app.scene.style_usage_count(selected_name)
+            question = f"Вы уверены, что хотите удалить стиль '{selected_name}'?"
+            if used or self.app.scene.blocks_using_style(selected_name):
+                question += f"\nОбъекты этого стиля ({used}) получат стиль '{replacement}'."
+
+            if messagebox.askyesno("Подтверждение", question, parent=parent_dialog):
+                style_manager.delete_style(selected_name)
+                self.app.scene.reassign_style(selected_name, replacement)
                 self.refresh_style_list()
                 self.update_current_style_ui()
+                self.app.update_info()
+                self.app.update_selection_ui()
                 self.app.view.draw_all()
                 messagebox.showinfo("Успех", f"Стиль '{selected_name}' удален.", parent=parent_dialog)
 
         except IndexError:
             messagebox.showerror("Ошибка", "Сначала выберите стиль для удаления.", parent=parent_dialog)
+        except ValueError as e:
+            messagebox.showerror("Запрет", str(e), parent=parent_dialog)
+
+    def _rename_selected_style(self, parent_dialog):
+        """Переименовывает выбранный пользовательский стиль вместе со всеми его объектами."""
+        selected_name = self.style_list_widget.get_selected_style()
+        if not selected_name:
+            messagebox.showerror("Ошибка", "Сначала выберите стиль.", parent=parent_dialog)
+            return
+        new_name = simpledialog.askstring("Переименование", "Новое имя стиля:", initialvalue=selected_name,
+                                          parent=parent_dialog)
+        if not new_name or new_name.strip() == selected_name:
+            return
+        try:
+            self.app.style_manager.rename_style(selected_name, new_name)
+        except (KeyError, ValueError) as e:
+            messagebox.showerror("Ошибка", str(e), parent=parent_dialog)
+            return
+        new_name = new_name.strip()
+        self.app.scene.reassign_style(selected_name, new_name)
+        self.style_list_widget.selected_name = new_name
+        self.refresh_style_list()
+        self.update_current_style_ui()
+        self.app.update_info()
+        self.app.update_selection_ui()
+        self.app.view.draw_all()
+
+    def _select_style_objects(self, parent_dialog):
+        """Выделяет на чертеже все объекты выбранного стиля."""
+        selected_name = self.style_list_widget.get_selected_style()
+        if not selected_name:
+            messagebox.showerror("Ошибка", "Сначала выберите стиль.", parent=parent_dialog)
+            return
+        self.app.select_objects_of_style(selected_name)
 
     def _open_add_style_dialog(self, parent_dialog):
         """Диалог для добавления нового пользовательского стиля."""
@@ -586,80 +926,278 @@ class CADUI:
                                                                                                    pady=10)
 
 
+def _format_dash(value):
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else f"{value:.1f}"
+    return str(value)
+
+
 class StylePreviewList(tk.Frame):
-    """Список стилей с визуальным превью."""
+    """
+    Список стилей с визуальным превью. Строки виртуальные: виджеты создаются только для
+    видимых строк и при прокрутке переназначаются другим стилям.
+    """
+    ROW_HEIGHT = 62
 
-    def __init__(self, master, render_preview_callback, on_select):
+    def __init__(self, master, render_preview_callback, on_select, style_provider, count_provider=None):
         super().__init__(master, bg="#1e1e1e")
         self.render_preview = render_preview_callback
         self.on_select = on_select
-        self.canvas = tk.Canvas(self, bg="#1e1e1e", highlightthickness=0, bd=0)
-        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.canvas.yview,
+        self.style_provider = style_provider  # имя -> LineStyle; стили запрашиваются только для видимых строк
+        self.count_provider = count_provider  # имя -> число объектов стиля на чертеже
+        self.body = tk.Frame(self, bg="#1e1e1e")
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.yview,
                                       bg="#252526", troughcolor="#1e1e1e", borderwidth=0)
-        self.inner = tk.Frame(self.canvas, bg="#1e1e1e")
-
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
-        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.body.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.canvas.create_window((0, 0), window=self.inner, anchor="nw")
-        self.inner.bind("<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
-
-        self.row_widgets = {}
+        self.body.bind("<Configure>", lambda e: self._redraw())
+        self._bind_wheel(self.body)
+
+        self._names = []  # имена стилей в порядке показа
+        self._positions = {}  # имя -> позиция в списке
+        self._rows = []  # пул строк: (строка, превью, инфо, имя, параметры, шаблон)
+        self._row_keys = []  # (имя, стиль, ревизия, выделена, число объектов) — что показано в строке пула
+        self._first = 0
         self.selected_name = None
 
-    def populate(self, styles):
-        for child in self.inner.winfo_children():
-            child.destroy()
-        self.row_widgets.clear()
-        for name, style in styles:
-            def _fmt_dash(v):
-                if isinstance(v, float):
-                    return str(int(v)) if v.is_integer() else f"{v:.1f}"
-                if isinstance(v, int):
-                    return str(v)
-                return str(v)
-            row = tk.Frame(self.inner, bg="#1e1e1e", padx=8, pady=6,
-                           highlightthickness=1, highlightbackground="#2b2b2b")
-            preview = tk.Canvas(row, width=200, height=28, bg="#1e1e1e", highlightthickness=0, bd=0)
-            self.render_preview(preview, style)
-            preview.pack(side=tk.LEFT)
-            info = tk.Frame(row, bg="#1e1e1e")
-            info.pack(side=tk.LEFT, padx=10)
-            tk.Label(info, text=name, bg="#1e1e1e", fg="#eeeeee", font=("Segoe UI", 9, "bold")).pack(anchor="w")
-            tag = "ЕСКД" if style.is_basic else "Польз."
-            pattern = "Сплошная линия" if not style.dash_pattern else \
-                "Шаблон: " + " - ".join(_fmt_dash(v) for v in style.dash_pattern)
-            tk.Label(info, text=f"{style.thickness_mm:.2f} мм • {tag}", bg="#1e1e1e", fg="#aaaaaa",
-                     font=("Segoe UI", 8)).pack(anchor="w")
-            tk.Label(info, text=pattern, bg="#1e1e1e", fg="#888888",
-                     font=("Segoe UI", 8, "italic")).pack(anchor="w", pady=(2, 0))
-            row.pack(fill=tk.X, padx=4, pady=3)
-
-            for widget in (row, preview, info):
-                widget.bind("<Button-1>", lambda e, n=name: self.select(n))
-
-            self.row_widgets[name] = (row, preview, info)
-
-        if self.selected_name and self.selected_name in self.row_widgets:
-            self._set_row_state(self.selected_name, True)
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", lambda e: self.yview("scroll", -1 if e.delta > 0 else 1, "units"))
+        widget.bind("<Button-4>", lambda e: self.yview("scroll", -1, "units"))
+        widget.bind("<Button-5>", lambda e: self.yview("scroll", 1, "units"))
+
+    def populate(self, names):
+        self._names = list(names)
+        self._positions = {name: i for i, name in enumerate(self._names)}
+        if self.selected_name not in self._positions:
+            self.selected_name = None
+        self._redraw()
 
     def select(self, name):
-        if name not in self.row_widgets:
+        position = self._positions.get(name)
+        if position is None:
             return
-        if self.selected_name and self.selected_name in self.row_widgets:
-            self._set_row_state(self.selected_name, False)
         self.selected_name = name
-        self._set_row_state(name, True)
+        rows = self._visible_rows()
+        if position < self._first:
+            self._first = position
+        elif position >= self._first + rows - 1:
+            self._first = position - rows + 2
+        self._redraw()
         if self.on_select:
             self.on_select(name)
 
     def get_selected_style(self):
         return self.selected_name
 
-    def _set_row_state(self, name, active):
-        row, preview, info = self.row_widgets[name]
+    def _visible_rows(self):
+        return max(1, self.body.winfo_height() // self.ROW_HEIGHT + 1)
+
+    def yview(self, *args):
+        """Команда полосы прокрутки: ("moveto", доля) или ("scroll", n, "units" | "pages")."""
+        rows = self._visible_rows()
+        if args and args[0] == "moveto":
+            self._first = int(float(args[1]) * len(self._names))
+        elif args and args[0] == "scroll":
+            step = rows - 1 if args[2] == "pages" else 1
+            self._first += int(args[1]) * max(1, step)
+        self._redraw()
+
+    def _create_row(self, k):
+        row = tk.Frame(self.body, bg="#1e1e1e", padx=8, pady=6,
+                       highlightthickness=1, highlightbackground="#2b2b2b")
+        preview = tk.Canvas(row, width=200, height=28, bg="#1e1e1e", highlightthickness=0, bd=0)
+        preview.pack(side=tk.LEFT)
+        info = tk.Frame(row, bg="#1e1e1e")
+        info.pack(side=tk.LEFT, padx=10)
+        name_label = tk.Label(info, text="", bg="#1e1e1e", fg="#eeeeee", font=("Segoe UI", 9, "bold"))
+        name_label.pack(anchor="w")
+        meta_label = tk.Label(info, text="", bg="#1e1e1e", fg="#aaaaaa", font=("Segoe UI", 8))
+        meta_label.pack(anchor="w")
+        pattern_label = tk.Label(info, text="", bg="#1e1e1e", fg="#888888", font=("Segoe UI", 8, "italic"))
+        pattern_label.pack(anchor="w", pady=(2, 0))
+
+        widgets = (row, preview, info, name_label, meta_label, pattern_label)
+        for widget in widgets:
+            widget.bind("<Button-1>", lambda e, k=k: self._on_row_click(k))
+            self._bind_wheel(widget)
+        self._rows.append(widgets)
+        self._row_keys.append(None)
+
+    def _redraw(self):
+        rows = self._visible_rows()
+        count = len(self._names)
+        self._first = max(0, min(self._first, count - rows + 1))
+        while len(self._rows) < min(rows, count):
+            self._create_row(len(self._rows))
+
+        for k, widgets in enumerate(self._rows):
+            index = self._first + k
+            name = self._names[index] if k < rows and index < count else None
+            style = self.style_provider(name) if name is not None else None
+            if style is None:
+                if self._row_keys[k] is not None:
+                    widgets[0].place_forget()
+                    self._row_keys[k] = None
+                continue
+            active = name == self.selected_name
+            usage = self.count_provider(name) if self.count_provider else None
+            key = (name, style, style.revision, active, usage)
+            if self._row_keys[k] is None:
+                widgets[0].place(x=4, y=k * self.ROW_HEIGHT + 3, relwidth=1.0, width=-8,
+                                 height=self.ROW_HEIGHT - 6)
+            if self._row_keys[k] != key:
+                self._show_style(widgets, name, style, active, usage)
+                self._row_keys[k] = key
+
+        if count:
+            self.scrollbar.set(self._first / count, min(1.0, (self._first + rows) / count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _show_style(self, widgets, name, style, active, usage=None):
+        row, preview, info, name_label, meta_label, pattern_label = widgets
+        self.render_preview(preview, style)
+        tag = "ЕСКД" if style.is_basic else "Польз."
+        pattern = "Сплошная линия" if not style.dash_pattern else \
+            "Шаблон: " + " - ".join(_format_dash(v) for v in style.dash_pattern)
+        name_label.configure(text=name)
+        meta = f"{style.thickness_mm:.2f} мм • {tag}"
+        if usage is not None:
+            meta += f" • объектов: {usage}"
+        meta_label.configure(text=meta)
+        pattern_label.configure(text=pattern)
         bg = "#2b2b2b" if active else "#1e1e1e"
-        for widget in (row, preview, info):
+        for widget in widgets:
             widget.configure(bg=bg)
-        for child in info.winfo_children():
-            child.configure(bg=bg)
\ No newline at end of file
+
+    def _on_row_click(self, k):
+        index = self._first + k
+        if index < len(self._names):
+            self.select(self._names[index])
+
+
+class VirtualListView(tk.Frame):
+    """
+    Виртуальный список строк фиксированной высоты. Строки не хранятся: при прокрутке
+    и обновлении форматируются только видимые (row_provider(индекс) -> текст),
+    текстовые элементы холста переиспользуются. Если заданы key_provider(индекс) -> ключ
+    и index_provider(ключ) -> индекс, выбранная строка после изменения модели находится
+    заново по ключу, а не остается на прежнем номере.
+    """
+
+    def __init__(self, master, row_height=18, on_activate=None, bg="#1e1e1e", fg="#d4d4d4",
+                 font=("Consolas", 9)):
+        super().__init__(master, bg=bg)
+        self.row_height = row_height
+        self.on_activate = on_activate
+        self.fg = fg
+        self.font = font
+        self._count = 0
+        self._count_provider = lambda: 0
+        self._row_provider = lambda index: ""
+        self._key_provider = None
+        self._index_provider = None
+        self._first = 0
+        self._items = []
+        self._texts = []
+        self._selected = None
+        self._selected_key = None
+
+        self.header = tk.Label(self, text="", bg=bg, fg="#aaaaaa", font=("Segoe UI", 9), anchor="w",
+                               justify=tk.LEFT, padx=5)
+        self.header.pack(fill=tk.X)
+        self.canvas = tk.Canvas(self, bg=bg, highlightthickness=0, bd=0)
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.yview,
+                                      bg="#252526", troughcolor=bg, borderwidth=0)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(5, 0), pady=5)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y, pady=5)
+
+        self.canvas.bind("<Configure>", lambda e: self._redraw())
+        self.canvas.bind("<MouseWheel>", lambda e: self.yview("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.yview("scroll", -1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.yview("scroll", 1, "units"))
+        self.canvas.bind("<Button-1>", self._on_click)
+
+    def set_providers(self, count_provider, row_provider, key_provider=None, index_provider=None):
+        self._count_provider = count_provider
+        self._row_provider = row_provider
+        self._key_provider = key_provider
+        self._index_provider = index_provider
+        self.refresh()
+
+    def set_header(self, text):
+        self.header.config(text=text)
+
+    def refresh(self):
+        """Пересчитывает число строк и перерисовывает только видимые строки."""
+        self._count = self._count_provider()
+        self._reanchor_selection()
+        self._redraw()
+
+    def _reanchor_selection(self):
+        """Переносит выделение на новую позицию выбранной строки или снимает его, если строки больше нет."""
+        index = self._selected
+        if index is None:
+            return
+        if self._key_provider is None:
+            if index >= self._count:
+                self._selected = None
+            return
+        if index < self._count and self._key_provider(index) == self._selected_key:
+            return
+        index = self._index_provider(self._selected_key) if self._index_provider else None
+        self._selected = index
+        if index is None:
+            self._selected_key = None
+
+    def _visible_rows(self):
+        return max(1, self.canvas.winfo_height() // self.row_height + 1)
+
+    def yview(self, *args):
+        """Команда полосы прокрутки: ("moveto", доля) или ("scroll", n, "units" | "pages")."""
+        rows = self._visible_rows()
+        if args and args[0] == "moveto":
+            self._first = int(float(args[1]) * self._count)
+        elif args and args[0] == "scroll":
+            step = rows - 1 if args[2] == "pages" else 1
+            self._first += int(args[1]) * max(1, step)
+        self._redraw()
+
+    def _redraw(self):
+        rows = self._visible_rows()
+        count = self._count
+        self._first = max(0, min(self._first, count - rows + 1))
+        canvas = self.canvas
+        for k in range(rows):
+            index = self._first + k
+            text = self._row_provider(index) if index < count else ""
+            fill = "#ffd54f" if index == self._selected else self.fg
+            if k == len(self._items):
+                self._items.append(canvas.create_text(4, k * self.row_height + 2, text=text, anchor="nw",
+                                                      fill=fill, font=self.font))
+                self._texts.append(text)
+                continue
+            item = self._items[k]
+            if self._texts[k] != text:
+                canvas.itemconfigure(item, text=text)
+                self._texts[k] = text
+            canvas.itemconfigure(item, fill=fill)
+        for k in range(rows, len(self._items)):
+            if self._texts[k]:
+                canvas.itemconfigure(self._items[k], text="")
+                self._texts[k] = ""
+
+        if count:
+            self.scrollbar.set(self._first / count, min(1.0, (self._first + rows) / count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _on_click(self, event):
+        index = self._first + int(event.y // self.row_height)
+        if index >= self._count:
+            return
+        self._selected = index
+        self._selected_key = self._key_provider(index) if self._key_provider else None
+        self._redraw()
+        if self.on_activate:
+            self.on_activate(index)
@@ -1,22 +1,185 @@
 import tkinter as tk
-from math import floor, ceil, sin, pi, hypot
+from itertools import islice
+from math import floor, ceil, hypot, pi
+from time import perf_counter
 
-from core.view_transforms import ViewTransform
+from core.view_transforms import ViewTransform, grid_step_for_scale, bucket_scale
 from core.scene import Scene
 from core.style_manager import StyleManager
+from core.segment import Segment
+from core.polyline import Polyline
+from core.arc import Arc
+from core.block import BlockReference, BlockArray
+from core.dash_tessellation import DashTessellationCache, tessellate_world
+from core.render_descriptor import RenderKind, MM_TO_PIXEL
+from core.render_pipeline import RenderPipeline
+from core.profiling import FrameProfiler
+from core.raster_tiles import (TileCache, TileRasterizer, TILE_PX, tile_world_size, tiles_for_bounds,
+                               tiles_area, snapshot_entity_lines, pixel_runs)
+from core.density import DensityGrid, iter_object_lines, hex_to_rgb
+from core.wave_geometry import WaveGeometryCache, wave_profile, place_profile, WAVE, ZIGZAG
+
+
+# Прогрессивная отрисовка включается, когда объектов в сцене больше порога
+PROGRESSIVE_THRESHOLD = 5000
+# Длительность одной порции отрисовки (с) — остальное время отдается mainloop
+PROGRESSIVE_SLICE = 0.012
+# Карта плотности включается, если объектов не меньше порога и средняя длина объекта
+# на экране меньше DENSITY_MAX_AVG_PX пикселей
+DENSITY_MIN_OBJECTS = 20000
+DENSITY_MAX_AVG_PX = 2.0
+# Целевое время кадра карты плотности (с): при превышении ячейка гистограммы укрупняется,
+# а объекты сцены берутся с шагом (выборкой)
+DENSITY_FRAME_BUDGET = 0.15
+# Растровый режим: пауза (мс), после которой вид считается остановившимся, и период опроса растеризатора
+RASTER_REST_MS = 250
+TILE_POLL_MS = 15
+
+
+def _nearest_color(color, palette):
+    """Индекс ближайшего по RGB цвета палитры (индекс 0 — прозрачный, не выбирается)."""
+    r, g, b = hex_to_rgb(color)
+    best, best_distance = 1, None
+    for index in range(1, len(palette)):
+        pr, pg, pb = hex_to_rgb(palette[index])
+        distance = (pr - r) ** 2 + (pg - g) ** 2 + (pb - b) ** 2
+        if best_distance is None or distance < best_distance:
+            best, best_distance = index, distance
+    return best
+
+
+class CanvasItemPool:
+    """
+    Пул однотипных элементов холста. За кадр элементы раздаются по порядку (place),
+    существующие только перемещаются, лишние скрываются, новые создаются лишь при нехватке.
+    """
+
+    def __init__(self, canvas, kind, **options):
+        self.canvas = canvas
+        self.kind = kind
+        self.options = options
+        self._items = []
+        self._contents = []  # текущий текст или изображение каждого элемента
+        self._visible = 0
+        self._used = 0
+        self._grown = False
+
+    def begin(self):
+        self._used = 0
+        self._grown = False
+
+    def place(self, coords, text=None, image=None):
+        """Размещает очередной элемент пула по координатам холста coords."""
+        i = self._used
+        self._used += 1
+        canvas = self.canvas
+        content = image if self.kind == "image" else text
+        if i == len(self._items):
+            if self.kind == "image":
+                item = canvas.create_image(*coords, image=image, **self.options)
+            else:
+                create = canvas.create_text if self.kind == "text" else canvas.create_line
+                if text is None:
+                    item = create(*coords, **self.options)
+                else:
+                    item = create(*coords, text=text, **self.options)
+            self._items.append(item)
+            self._contents.append(content)
+            self._grown = True
+            return item
+
+        item = self._items[i]
+        canvas.coords(item, *coords)
+        if i >= self._visible:
+            canvas.itemconfigure(item, state="normal")
+        if content is not None and self._contents[i] != content:
+            if self.kind == "image":
+                canvas.itemconfigure(item, image=image)
+            else:
+                canvas.itemconfigure(item, text=text)
+            self._contents[i] = content
+        return item
+
+    def visible_count(self):
+        return self._visible
+
+    def end(self):
+        """Скрывает неиспользованные элементы; возвращает True, если пул вырос за кадр."""
+        for item in self._items[self._used:self._visible]:
+            self.canvas.itemconfigure(item, state="hidden")
+        self._visible = self._used
+        return self._grown
+
+    def hide_all(self):
+        self.begin()
+        self.end()
 
 
 class CADView:
 
     def __init__(self, canvas_ref: tk.Canvas, transform_ref: ViewTransform, scene_ref: Scene,
-                 style_manager_ref: StyleManager, selection_provider=None):
+                 style_manager_ref: StyleManager, selection_provider=None, focus_provider=None):
         self.canvas = canvas_ref
         self.trans = transform_ref
         self.scene = scene_ref
         self.style_manager = style_manager_ref
         self.selection_provider = selection_provider or (lambda: set())
+        self.focus_provider = focus_provider  # Точка (мир), от которой начинается прогрессивная отрисовка
+        self.progress_callback = None  # progress_callback(нарисовано, всего) во время прогрессивной отрисовки
+        self.progressive_rendering = True
+        self._render_job = None
+        # Фоновая подготовка координат для больших сцен; о готовности поток сообщает сам
+        self.pipeline = RenderPipeline(on_ready=self._on_pipeline_ready)
+        self._pending = None
+        self._pending_version = None
+        self._pending_focus = None
+        self._pending_params = None
+        self._pending_entities = None
+        self._pending_total = 0
+        self._pending_done = 0
+        self.density_map_enabled = True  # Автоматический переход к карте плотности при отдалении
+        self.density_active = False
+        self._density_item = None
+        self._density_image = None
+        self._density_cell = 3  # Размер ячейки гистограммы в пикселях
+        self._density_stride = 1  # В гистограмму попадает каждый stride-й объект сцены
+        self._density_drawn = 0
+        # Замеры кадров: оверлей на холсте и frame_callback(запись) после каждого кадра
+        self.profiler = FrameProfiler()
+        self.frame_callback = None
+        self.show_overlay = False
+        self._overlay_item = None
+        self._drawn_items = 0  # Элементы объектов и подложек, созданные за текущий кадр
+        self._progressive_record = None  # Запись кадра, счетчики которой дописываются по окончании прохода
+        # Растровый режим: при панорамировании и зуме показываются готовые тайлы
+        self.raster_mode = False
+        self.tile_cache = TileCache()
+        self.rasterizer = TileRasterizer()
+        self._tile_pool = CanvasItemPool(self.canvas, "image", anchor="nw", tags="raster-tile")
+        self._tile_palette = [None]
+        self._tile_style_version = self.style_manager.version
+        self._scene_version = 0
+        self._rest_job = None
+        self._tile_poll_job = None
+        self.scene.add_change_listener(self._on_scene_change)
+        self.world_space_dashes = False  # Штрихи по ГОСТ в мировых единицах вместо экранных dash Tk
+        self.dash_cache = DashTessellationCache()
+        self.wave_cache = WaveGeometryCache()
         self.bg_color = "#121212"
         self.grid_color = "#333333"
+        # Пулы переиспользуемых элементов холста для сетки и подписей
+        self._grid_pool = CanvasItemPool(self.canvas, "line", fill=self.grid_color, tags="grid")
+        self._x_label_pool = CanvasItemPool(self.canvas, "text", fill="#888", font=("Arial", 8), tags="label")
+        self._y_label_pool = CanvasItemPool(self.canvas, "text", fill="#888", font=("Arial", 8), anchor="e",
+                                            tags="label")
+        self._axis_items = None
+        # Элементы холста, нарисованные для каждого объекта: объект -> (дескриптор, [id]),
+        # и подложки выделения: объект -> [id]
+        self._object_items = {}
+        self._highlight_items = {}
+        self._current_items = None
+        self._label_step = None
+        self._label_texts = {}
         self.set_bg_color(self.bg_color)
 
     def set_bg_color(self, color):
@@ -25,128 +188,838 @@ class CADView:
         self.canvas.config(bg=self.bg_color)
 
     def draw_all(self):
-        """Полная перерисовка сцены (сетка, оси, объекты)."""
-        self.canvas.delete("all")
-        self.draw_grid()
-        self.draw_axes()
-        self.draw_labels()
-        self.draw_segments()
+        """Полная перерисовка сцены (сетка, оси, объекты). Сетка, оси и подписи не пересоздаются."""
+        if self._rest_job is not None:
+            self.canvas.after_cancel(self._rest_job)
+            self._rest_job = None
+        self._render_frame(self.draw_segments)
 
-    def draw_segments(self):
-        """Рисует отрезки из сцены, используя данные LineStyle."""
-        MM_TO_PIXEL = 3.7795  # 1 мм ≈ 3.78 px при 96 dpi [web:89]
+    def draw_interactive(self):
+        """
+        Кадр во время панорамирования/зума. В растровом режиме объекты показываются готовыми
+        тайлами, а векторная отрисовка возвращается, когда вид перестает меняться.
+        """
+        if not self.raster_mode or self.trans.rotation_angle % (2 * pi) > 1e-9:
+            # Тайлы выровнены по мировым осям — при повороте вида используется векторный режим
+            self.draw_all()
+            return
+        self._render_frame(self._draw_tiles)
+        if self._rest_job is not None:
+            self.canvas.after_cancel(self._rest_job)
+        self._rest_job = self.canvas.after(RASTER_REST_MS, self._on_view_rest)
+
+    def _render_frame(self, draw_objects):
+        profiler = self.profiler
+        if self._progressive_record is not None:
+            # Прерванный прогрессивный проход: в его запись идет то, что успели нарисовать
+            self._fill_counts(self._progressive_record)
+            self._progressive_record = None
+        profiler.begin_frame()
+        self.canvas.delete("segment", "segment-selected", "preview")
+        self._drawn_items = 0
+        with profiler.phase("grid"):
+            self.draw_grid()
+        with profiler.phase("axes"):
+            self.draw_axes()
+        with profiler.phase("labels"):
+            self.draw_labels()
+        with profiler.phase("segments"):
+            draw_objects()
+
+        record = profiler.end_frame()
+        if record is not None:
+            # Прогрессивный проход дописывает счетчики кадра, когда нарисует все порции
+            self._progressive_record = record if self.is_rendering() else None
+            self._finish_record(record)
+
+    def _fill_counts(self, record):
+        """Заполняет счетчики кадра по пулам и картам элементов, без обхода элементов холста."""
+        drawn = self._density_drawn if self.density_active else len(self._object_items)
+        record.item_count = self._item_count()
+        record.drawn = drawn
+        record.culled = max(0, self.scene.object_count() - drawn)
+
+    def _finish_record(self, record):
+        self._fill_counts(record)
+        self._update_overlay()
+        if self.frame_callback:
+            self.frame_callback(record)
+
+    def _item_count(self):
+        """Число элементов холста: пулы сетки, подписей и тайлов, оси, карта плотности и объекты кадра."""
+        count = (self._grid_pool.visible_count() + self._x_label_pool.visible_count()
+                 + self._y_label_pool.visible_count() + self._tile_pool.visible_count() + self._drawn_items)
+        if self._axis_items is not None:
+            count += len(self._axis_items)
+        if self.density_active:
+            count += 1
+        if self._overlay_item is not None and self.show_overlay:
+            count += 1
+        return count
 
+    def _update_overlay(self):
+        """Оверлей производительности в левом верхнем углу холста."""
+        if not self.show_overlay:
+            if self._overlay_item is not None:
+                self.canvas.itemconfigure(self._overlay_item, state="hidden")
+            return
+        text = "\n".join(self.profiler.summary_lines())
+        if self._overlay_item is None:
+            self._overlay_item = self.canvas.create_text(10, 10, text=text, anchor="nw", fill="#9fe89f",
+                                                         font=("Consolas", 9), tags="perf-overlay")
+        else:
+            self.canvas.itemconfigure(self._overlay_item, text=text, state="normal")
+        self.canvas.tag_raise(self._overlay_item)
+
+    def set_overlay_visible(self, visible):
+        self.show_overlay = visible
+        self._update_overlay()
+
+    def draw_segments(self):
+        """Рисует объекты сцены по скомпилированным дескрипторам стилей, сгруппировав отрезки по стилю."""
+        self.cancel_progressive()
+        self._tile_pool.hide_all()
         selected_segments = set(self.selection_provider() or [])
+        frame_params = {}
+        self._object_items = {}
+        self._highlight_items = {}
+        visible = self.trans.get_visible_bounds()
+
+        # Подсветка выделения рисуется под всеми линиями одним проходом
+        for obj in selected_segments:
+            self._draw_highlight(obj, frame_params, visible)
+
+        if self._use_density():
+            self._draw_density(frame_params, visible)
+            return
+        self._hide_density()
+
+        if self.progressive_rendering and self.scene.object_count() > PROGRESSIVE_THRESHOLD:
+            self._start_progressive(frame_params, visible)
+            return
 
+        groups = {}
         for s in self.scene.segments:
-            style = self.style_manager.get_style(s.style_name)
-            if not style:
+            group = groups.get(s.style_name)
+            if group is None:
+                groups[s.style_name] = group = []
+            group.append(s)
+
+        to_canvas = self.trans.world_to_canvas
+        object_items = self._object_items
+        for style_name, segments in groups.items():
+            params = self._get_frame_params(style_name, frame_params)
+            if not params:
+                continue
+            descriptor, dash = params
+            if self._is_simple(descriptor):
+                # Быстрый путь: параметры стиля общие для всей группы
+                color, width = descriptor.color, descriptor.width_px
+                create_line = self.canvas.create_line
+                tags = ("segment", descriptor.tag)
+                for s in segments:
+                    item = create_line(to_canvas(s.x1, s.y1), to_canvas(s.x2, s.y2),
+                                       fill=color, width=width, dash=dash, tags=tags)
+                    object_items[s] = (descriptor, [item])
+                self._drawn_items += len(segments)
+            else:
+                for s in segments:
+                    self._draw_object(s, frame_params, visible)
+
+        for entity in self.scene.entities:
+            self._draw_object(entity, frame_params, visible)
+
+    # --- Растровые тайлы ---
+
+    def _on_scene_change(self, bounds):
+        """Сцена изменилась: тайлы затронутой области больше не актуальны."""
+        self.tile_cache.invalidate(bounds)
+        self._scene_version += 1
+
+    def _on_view_rest(self):
+        self._rest_job = None
+        self.draw_all()
+
+    def _tile_styles(self):
+        """
+        Снимок стилей для потока растеризации и палитра (индекс 0 — прозрачный). Берутся только
+        стили, которые есть на сцене, — остальные записи библиотеки не разбираются. Если палитра
+        заполнена, новый цвет заменяется ближайшим из уже занятых.
+        """
+        palette = [None]
+        indices = {}  # цвет -> индекс палитры
+        styles = {}
+        for name in self.scene.used_style_names():
+            descriptor = self.style_manager.get_render_descriptor(name)
+            if descriptor is None:
+                continue
+            color = descriptor.color
+            index = indices.get(color)
+            if index is None:
+                if len(palette) < 256:
+                    index = len(palette)
+                    palette.append(color)
+                else:
+                    index = _nearest_color(color, palette)
+                indices[color] = index
+            styles[name] = (index, descriptor.width_px, descriptor.world_pattern)
+        return styles, palette
+
+    def _draw_tiles(self):
+        """Размещает готовые тайлы видимой области и заказывает недостающие фоновой растеризации."""
+        self.cancel_progressive()
+        self._hide_density()
+        self._object_items = {}
+        self._highlight_items = {}
+        if self._tile_style_version != self.style_manager.version:
+            self._tile_style_version = self.style_manager.version
+            self.tile_cache.clear()
+
+        scale = self.trans.scale
+        visible = self.trans.get_visible_bounds()
+        to_canvas = self.trans.world_to_canvas
+        size = tile_world_size(scale)
+        missing = []
+        pool = self._tile_pool
+        pool.begin()
+        for key in tiles_for_bounds(visible, scale):
+            image = self.tile_cache.get(key)
+            if image is None:
+                missing.append(key)
+                continue
+            pool.place(to_canvas(key[1] * size, (key[2] + 1) * size), image=image)
+        pool.end()
+
+        if missing:
+            # После видимых тайлов дорисовываются соседние — на случай дальнейшего сдвига
+            visible_keys = set(missing)
+            prefetch = [key for key in tiles_for_bounds(visible, scale, margin=1)
+                        if key not in visible_keys and self.tile_cache.get(key) is None]
+            keys = missing + prefetch
+            styles, self._tile_palette = self._tile_styles()
+            # Составные объекты раскладываются на линии здесь, в потоке Tk, — их кэши ленивые
+            entity_lines = snapshot_entity_lines(self.scene.entities, tiles_area(keys))
+            self.rasterizer.request(keys, self.scene.segments, entity_lines, styles, self._scene_version)
+            if self._tile_poll_job is None:
+                self._tile_poll_job = self.canvas.after(TILE_POLL_MS, self._poll_tiles)
+
+    def _poll_tiles(self):
+        """Забирает растеризованные тайлы и создает из них изображения (в потоке Tk)."""
+        self._tile_poll_job = None
+        if self.rasterizer.take_error() is not None:
+            # Растеризация не удалась — показываем сцену векторно, следующая заявка начнется заново
+            self.draw_all()
+            return
+        added = False
+        for key, version, pixels in self.rasterizer.take_results():
+            if version != self._scene_version:
                 continue
+            image = tk.PhotoImage(width=TILE_PX, height=TILE_PX)
+            for row, runs in pixel_runs(pixels, self._tile_palette):
+                for col, colors in runs:
+                    image.put("{" + " ".join(colors) + "}", to=(col, row))
+            self.tile_cache.put(key, image)
+            added = True
+        if added and self._rest_job is not None:
+            # Вид еще в движении — показываем новые тайлы сразу
+            self._render_frame(self._draw_tiles)
+        if self.rasterizer.busy and self._rest_job is not None:
+            self._tile_poll_job = self.canvas.after(TILE_POLL_MS, self._poll_tiles)
 
-            p1 = self.trans.world_to_canvas(s.x1, s.y1)
-            p2 = self.trans.world_to_canvas(s.x2, s.y2)
-
-            # --- Толщина: строго по ГОСТ (1 мм и 0.5 мм) ---
-            # В StyleManager: "Сплошная основная" = 1.0, остальные = 0.5 мм [web:118][web:121]
-            line_width = style.thickness_mm * MM_TO_PIXEL
-            line_width = max(1.0, line_width)
-
-            # --- Паттерн штриховки, завязанный на шаг сетки ---
-            name_lower = style.name.lower()
-            step = self.trans.grid_step()  # 1 шаг = 1 мм в world [web:121]
-
-            override_pattern = None
-
-            if "штриховая" in name_lower:
-                # ГОСТ: штрих 2–8 мм, пробел 1–2 мм.
-                # Берём среднее: штрих 4 мм, пробел 1.5 мм, в шагах сетки. [web:118]
-                override_pattern = (4.0 * step, 1.5 * step)
-
-            elif "штрихпунктирная" in name_lower:
-                # ГОСТ: штрих 5–30 мм, пробел 3–5 мм, точка 1–2 мм.
-                # Типичный набор: 15 мм штрих, 4 мм пробел, 2 мм точка, 4 мм пробел. [web:118]
-                override_pattern = (15.0 * step, 4.0 * step, 2.0 * step, 4.0 * step)
-
-            # Если override_pattern None, берётся dash_pattern из LineStyle.dash_pattern (в шагах = мм)
-            dash_pattern = style.get_tk_dash_pattern(self.trans.scale, override_pattern=override_pattern)
-
-            is_selected = s in selected_segments
-            if is_selected:
-                self.canvas.create_line(
-                    p1, p2,
-                    fill="#ffd54f",
-                    width=line_width + 3,
-                    dash=(),
-                    tags="segment-selected"
-                )
-
-            if "волнистая" in name_lower:
-                self._draw_wavy_line(p1, p2, style.color, line_width)
-            elif "изломами" in name_lower:
-                self._draw_zigzag_line(p1, p2, style.color, line_width)
+    # --- Карта плотности ---
+
+    def _use_density(self):
+        """Нужно ли показывать вместо линий карту плотности (при очень плотной картинке)."""
+        if not self.density_map_enabled:
+            return False
+        count = self.scene.object_count()
+        if count < DENSITY_MIN_OBJECTS:
+            return False
+        return self.scene.total_length() * self.trans.scale / count < DENSITY_MAX_AVG_PX
+
+    def _draw_density(self, frame_params, visible):
+        """
+        Строит гистограмму длин видимых линий в экранных ячейках, окрашенную по стилям,
+        и показывает ее одним изображением на холсте.
+        """
+        started = perf_counter()
+        cell = self._density_cell
+        stride = self._density_stride
+        # Снимок вида не обращается к Tk: перевод каждой вершины не стоит запросов размера холста
+        state = self.trans.snapshot()
+        grid = DensityGrid(state.width, state.height, cell)
+        x_lo, y_lo, x_hi, y_hi = visible
+        to_canvas = state.world_to_canvas
+        colors = {}
+        binned = 0
+
+        # При stride > 1 в гистограмму попадает каждый stride-й объект — равномерная выборка
+        for obj in islice(self.scene.all_objects(), 0, None, stride):
+            if isinstance(obj, Segment):
+                if (max(obj.x1, obj.x2) < x_lo or min(obj.x1, obj.x2) > x_hi
+                        or max(obj.y1, obj.y2) < y_lo or min(obj.y1, obj.y2) > y_hi):
+                    continue
             else:
-                self.canvas.create_line(
-                    p1, p2,
-                    fill=style.color,
-                    width=line_width,
-                    dash=dash_pattern,
-                    tags="segment"
-                )
+                b = obj.bounds()
+                if b[2] < x_lo or b[0] > x_hi or b[3] < y_lo or b[1] > y_hi:
+                    continue
+            binned += 1
+            for x1, y1, x2, y2, style_name in iter_object_lines(obj, visible):
+                rgb = colors.get(style_name, False)
+                if rgb is False:
+                    params = self._get_frame_params(style_name, frame_params)
+                    colors[style_name] = rgb = hex_to_rgb(params[0].color) if params else None
+                if rgb is None:
+                    continue
+                p1 = to_canvas(x1, y1)
+                p2 = to_canvas(x2, y2)
+                grid.add_line(p1[0], p1[1], p2[0], p2[1], rgb)
+
+        image = tk.PhotoImage(width=grid.cols, height=grid.rows)
+        for row, runs in grid.rows_of_runs():
+            for col, run_colors in runs:
+                image.put("{" + " ".join(run_colors) + "}", to=(col, row))
+        if cell > 1:
+            image = image.zoom(cell)
+
+        # Изображение держится в атрибуте, иначе Tk потеряет его при сборке мусора
+        self._density_image = image
+        if self._density_item is None:
+            self._density_item = self.canvas.create_image(0, 0, image=image, anchor="nw", tags="density")
+        else:
+            self.canvas.itemconfigure(self._density_item, image=image, state="normal")
+        self.density_active = True
+        self._density_drawn = binned
+
+        # Подстройка под бюджет времени кадра: сначала укрупняется ячейка (дешевле построение
+        # изображения), затем разреживается выборка объектов пропорционально перерасходу
+        elapsed = perf_counter() - started
+        if elapsed > DENSITY_FRAME_BUDGET:
+            if cell < 16:
+                self._density_cell = cell * 2
+            self._density_stride = max(stride + 1, int(stride * elapsed / DENSITY_FRAME_BUDGET + 0.5))
+        elif elapsed < DENSITY_FRAME_BUDGET / 4:
+            if stride > 1:
+                self._density_stride = stride // 2
+            elif cell > 2:
+                self._density_cell = cell - 1
+
+    def _hide_density(self):
+        if self.density_active:
+            self.canvas.itemconfigure(self._density_item, state="hidden")
+            self._density_image = None
+            self.density_active = False
+
+    # --- Прогрессивная отрисовка ---
+
+    def _start_progressive(self, frame_params, visible):
+        """
+        Запускает отрисовку порциями по времени между тиками mainloop. Отсечение, перевод
+        в координаты холста и упорядочивание отрезков по удаленности от курсора (или центра
+        вида) выполняет фоновый поток конвейера; поток Tk только создает элементы холста.
+        """
+        state = self.trans.snapshot()
+        focus = self.focus_provider() if self.focus_provider else None
+
+        # Составные объекты немногочисленны и держат собственные кэши — готовятся в потоке Tk
+        x_lo, y_lo, x_hi, y_hi = visible
+        fx, fy = (x_lo + x_hi) / 2, (y_lo + y_hi) / 2
+        if focus and x_lo <= focus[0] <= x_hi and y_lo <= focus[1] <= y_hi:
+            fx, fy = focus
+        keyed = []
+        for entity in self.scene.entities:
+            b = entity.bounds()
+            if b[2] < x_lo or b[0] > x_hi or b[3] < y_lo or b[1] > y_hi:
+                continue
+            # Для крупных объектов берется ближайшая к фокусу точка габарита
+            cx = min(max(fx, b[0]), b[2]) - fx
+            cy = min(max(fy, b[1]), b[3]) - fy
+            keyed.append((cx * cx + cy * cy, entity.segment_id, entity))
+        keyed.sort(key=lambda item: (item[0], item[1]))
+
+        self._pending = []
+        self._pending_entities = [item[2] for item in keyed]
+        self._pending_params = (frame_params, visible)
+        self._pending_focus = focus
+        self._submit_segments(state)
+        self._poll_pipeline()
+
+    def _submit_segments(self, state):
+        """
+        Передает конвейеру живой список отрезков сцены без копирования. Добавленные позже
+        отрезки конвейер не видит, а удаление создает новый список; версия сцены запоминается,
+        чтобы отбросить результат, если сцена изменилась до его получения.
+        """
+        self._pending_version = self._scene_version
+        self.pipeline.submit(state, self.scene.segments, self._pending_focus)
+
+    def _on_pipeline_ready(self):
+        """Вызывается из потока конвейера: получение результата планируется в потоке Tk."""
+        self.canvas.after_idle(self._poll_pipeline)
+
+    def _poll_pipeline(self):
+        """Забирает результат конвейера для текущего вида и начинает создавать элементы холста."""
+        if self._pending is None or self._pending_entities is None:
+            return  # Отрисовка отменена или уже идет
+        result = self.pipeline.poll()
+        if result is None:
+            return  # Результата еще нет — о готовности сообщит on_ready
+        if self._pending_version != self._scene_version:
+            # Сцена изменилась, пока конвейер считал, — готовим кадр заново по текущему списку
+            self._submit_segments(result[0])
+            return
+
+        state, batches = result
+        frame_params = self._pending_params[0]
+        # Поток: [подготовленные координаты или None, параметры стиля, объекты, позиция]
+        streams = []
+        for batch in batches:
+            params = self._get_frame_params(batch.style_name, frame_params)
+            if not params:
+                continue
+            coords = batch.coords if self._is_simple(params[0]) else None
+            streams.append([coords, params, batch.segments, 0])
+        if self._pending_entities:
+            streams.append([None, None, self._pending_entities, 0])
+        self._pending = streams
+        self._pending_entities = None
+        self._pending_total = sum(len(stream[2]) for stream in streams)
+        self._pending_done = 0
+        self._render_batch()
+
+    def _render_batch(self):
+        """Рисует очередную порцию объектов (понемногу из каждого стиля) и планирует следующую."""
+        self._render_job = None
+        streams = self._pending
+        if streams is None:
+            return
+        frame_params, visible = self._pending_params
+        create_line = self.canvas.create_line
+        object_items = self._object_items
+        deadline = perf_counter() + PROGRESSIVE_SLICE
+
+        while streams:
+            for stream in list(streams):
+                coords, params, objects, pos = stream
+                end = min(pos + 64, len(objects))
+                if coords is not None:
+                    descriptor, dash = params
+                    color, width = descriptor.color, descriptor.width_px
+                    tags = ("segment", descriptor.tag)
+                    for i in range(pos, end):
+                        k = i * 4
+                        item = create_line(coords[k], coords[k + 1], coords[k + 2], coords[k + 3],
+                                           fill=color, width=width, dash=dash, tags=tags)
+                        object_items[objects[i]] = (descriptor, [item])
+                    self._drawn_items += end - pos
+                else:
+                    for obj in objects[pos:end]:
+                        self._draw_object(obj, frame_params, visible)
+                stream[3] = end
+                self._pending_done += end - pos
+                if end == len(objects):
+                    streams.remove(stream)
+            if perf_counter() >= deadline:
+                break
+
+        if streams:
+            self._render_job = self.canvas.after(1, self._render_batch)
+        else:
+            self._pending = None
+            self._pending_params = None
+            record, self._progressive_record = self._progressive_record, None
+            if record is not None:
+                self._finish_record(record)
+        if self.progress_callback:
+            self.progress_callback(self._pending_done, self._pending_total)
+
+    def cancel_progressive(self):
+        """Прерывает незавершенную прогрессивную отрисовку (например, при новом панорамировании или зуме)."""
+        if self._render_job is not None:
+            self.canvas.after_cancel(self._render_job)
+            self._render_job = None
+        if self._pending is not None:
+            self.pipeline.cancel()
+            self._pending = None
+            self._pending_params = None
+            self._pending_entities = None
+            if self.progress_callback:
+                self.progress_callback(0, 0)
+
+    def is_rendering(self):
+        return self._pending is not None
+
+    def _is_simple(self, descriptor):
+        """Стиль рисуется одним элементом холста на объект, и его можно сменить через itemconfig."""
+        return descriptor.kind is RenderKind.SOLID or (descriptor.kind is RenderKind.DASHED
+                                                       and not self.world_space_dashes)
+
+    def _line(self, *args, **kwargs):
+        """create_line для линий объекта: созданный элемент запоминается за текущим объектом."""
+        item = self.canvas.create_line(*args, **kwargs)
+        if self._current_items is not None:
+            self._current_items.append(item)
+        return item
+
+    def _draw_object(self, obj, frame_params, visible):
+        """Рисует один объект сцены и запоминает его элементы холста."""
+        self._current_items = items = []
+        descriptor = None
+        if isinstance(obj, BlockArray):
+            self._draw_block_array(obj, frame_params, visible)
+        elif isinstance(obj, BlockReference):
+            self._draw_block_reference(obj, frame_params, visible)
+        else:
+            params = self._get_frame_params(obj.style_name, frame_params)
+            if params:
+                descriptor = params[0]
+                if isinstance(obj, Polyline):
+                    self._draw_polyline(obj, params)
+                elif isinstance(obj, Arc):
+                    # Дуги и окружности: число хорд по радиусу на экране, разбиение кэшируется по корзине
+                    self._draw_polyline(obj, params, obj.tessellate(self.trans.zoom_bucket()))
+                else:
+                    to_canvas = self.trans.world_to_canvas
+                    self._draw_line(to_canvas(obj.x1, obj.y1), to_canvas(obj.x2, obj.y2), params,
+                                    world=(obj.x1, obj.y1, obj.x2, obj.y2), key=obj.segment_id)
+        self._current_items = None
+        self._drawn_items += len(items)
+        if items or descriptor is not None:
+            self._object_items[obj] = (descriptor, items)
+
+    def _draw_highlight(self, obj, frame_params, visible):
+        """Рисует желтую подложку выделенного объекта и запоминает ее элементы."""
+        items = []
+        to_canvas = self.trans.world_to_canvas
+        if isinstance(obj, BlockReference):
+            # Вставки и массивы: подложка под каждой линией видимых экземпляров
+            x_lo, y_lo, x_hi, y_hi = obj.bounds()
+            if not (x_hi < visible[0] or x_lo > visible[2] or y_hi < visible[1] or y_lo > visible[3]):
+                params_list = [self._get_frame_params(name, frame_params) for name in obj.block.style_names]
+                if isinstance(obj, BlockArray):
+                    instances = [obj.instance_coords(offset) for offset in obj.instance_offsets(visible)]
+                else:
+                    instances = [obj.world_coords()]
+                for coords in instances:
+                    for i, params in enumerate(params_list):
+                        if not params:
+                            continue
+                        j = i * 4
+                        items.append(self.canvas.create_line(
+                            to_canvas(coords[j], coords[j + 1]), to_canvas(coords[j + 2], coords[j + 3]),
+                            fill="#ffd54f", width=params[0].width_px + 3, dash=(),
+                            tags=("segment-selected", params[0].tag + "-sel")))
+        else:
+            params = self._get_frame_params(obj.style_name, frame_params)
+            if params:
+                if isinstance(obj, (Polyline, Arc)):
+                    v = obj.tessellate(self.trans.zoom_bucket()) if isinstance(obj, Arc) else obj.vertices
+                    coords = []
+                    for i in range(0, len(v), 2):
+                        coords.extend(to_canvas(v[i], v[i + 1]))
+                    items.append(self.canvas.create_line(*coords, fill="#ffd54f", width=params[0].width_px + 3,
+                                                         dash=(), joinstyle=tk.ROUND,
+                                                         tags=("segment-selected", params[0].tag + "-sel")))
+                else:
+                    items.append(self.canvas.create_line(to_canvas(obj.x1, obj.y1), to_canvas(obj.x2, obj.y2),
+                                                         fill="#ffd54f", width=params[0].width_px + 3, dash=(),
+                                                         tags=("segment-selected", params[0].tag + "-sel")))
+        self._highlight_items[obj] = items
+        self._drawn_items += len(items)
+        return items
+
+    def update_selection(self, old_selection, new_selection):
+        """
+        Обновляет подсветку по разнице старого и нового выделения без полной перерисовки:
+        удаляются подложки снятых объектов, создаются подложки добавленных.
+        """
+        for obj in set(old_selection) - set(new_selection):
+            items = self._highlight_items.pop(obj, None)
+            if items:
+                self.canvas.delete(*items)
+                self._drawn_items -= len(items)
+
+        added = set(new_selection) - set(old_selection)
+        if not added:
+            return
+        frame_params = {}
+        visible = self.trans.get_visible_bounds()
+        created = False
+        for obj in added:
+            created = bool(self._draw_highlight(obj, frame_params, visible)) or created
+        # Подложки опускаются под линии одним вызовом. В режиме карты плотности, тайлов или когда
+        # все объекты отсечены линий на холсте нет — новые подложки и так лежат поверх сетки.
+        if created and self.canvas.find_withtag("segment"):
+            self.canvas.tag_lower("segment-selected", "segment")
+
+    def restyle_objects(self, objects):
+        """
+        Применяет новый стиль объектов к уже нарисованным элементам. Простые стили меняются
+        через itemconfig; если меняется способ отрисовки (волна, излом, штрихи в мировых
+        единицах), перерисовывается только сам объект.
+        """
+        if self.density_active or self.is_rendering() or self._tile_pool.visible_count():
+            # Карта плотности, тайлы и незавершенный прогрессивный проход (с кэшированными
+            # параметрами стилей) строятся по всей сцене — перерисовываем кадр целиком
+            self.draw_all()
+            return
+        frame_params = {}
+        visible = self.trans.get_visible_bounds()
+        for obj in objects:
+            if obj.style_name is None:
+                continue  # Вставки блоков не имеют собственного стиля
+            entry = self._object_items.get(obj)
+            params = self._get_frame_params(obj.style_name, frame_params)
+            if entry is None or not params:
+                continue
+            old_descriptor, items = entry
+            descriptor, dash = params
+            if old_descriptor is not None and self._is_simple(old_descriptor) and self._is_simple(descriptor):
+                for item in items:
+                    self.canvas.itemconfigure(item, fill=descriptor.color, width=descriptor.width_px, dash=dash)
+                self._object_items[obj] = (descriptor, items)
+            else:
+                if items:
+                    self.canvas.delete(*items)
+                    self._drawn_items -= len(items)
+                self._draw_object(obj, frame_params, visible)
+            for item in self._highlight_items.get(obj, ()):
+                self.canvas.itemconfigure(item, width=descriptor.width_px + 3)
+
+    def restyle_style(self, style_name, old_descriptor):
+        """
+        Применяет измененный стиль к нарисованной сцене по тегу стиля: цвет, толщина и штрихи
+        меняются одним itemconfig на тег. Объекты стиля перерисовываются, только если изменился
+        способ отрисовки (например, сплошная линия стала волнистой).
+        """
+        descriptor = self.style_manager.get_render_descriptor(style_name)
+        if (descriptor is None or old_descriptor is None or self.density_active or self.is_rendering()
+                or self._tile_pool.visible_count()):
+            # Карта плотности, тайлы и незавершенный прогрессивный проход строятся по всей сцене
+            self.draw_all()
+            return
+
+        canvas = self.canvas
+        if self._same_geometry(old_descriptor, descriptor):
+            options = {"fill": descriptor.color, "width": descriptor.width_px}
+            if self._is_simple(descriptor):
+                options["dash"] = descriptor.dash(self.trans.scale)
+            canvas.itemconfigure(descriptor.tag, **options)
+        else:
+            frame_params = {}
+            visible = self.trans.get_visible_bounds()
+            affected = [obj for obj, (d, _) in self._object_items.items()
+                        if (d.name == style_name if d is not None
+                            else isinstance(obj, BlockReference) and style_name in obj.block.style_names)]
+            for obj in affected:
+                items = self._object_items.pop(obj)[1]
+                if items:
+                    canvas.delete(*items)
+                    self._drawn_items -= len(items)
+                self._draw_object(obj, frame_params, visible)
+        canvas.itemconfigure(descriptor.tag + "-sel", width=descriptor.width_px + 3)
+
+    def _same_geometry(self, old, new):
+        """Можно ли перейти от дескриптора old к new без пересоздания элементов холста."""
+        if self._is_simple(old) and self._is_simple(new):
+            return True
+        if old.kind is not new.kind:
+            return False
+        return not (self.world_space_dashes and old.world_pattern != new.world_pattern)
+
+    def _get_frame_params(self, style_name, cache):
+        """Возвращает (дескриптор стиля, шаблон штрихов для текущего масштаба); один раз на кадр."""
+        if style_name in cache:
+            return cache[style_name]
+        descriptor = self.style_manager.get_render_descriptor(style_name)
+        params = (descriptor, descriptor.dash(self.trans.scale)) if descriptor else None
+        cache[style_name] = params
+        return params
+
+    def _draw_line(self, p1, p2, params, world=None, key=None):
+        """
+        Рисует один отрезок (в координатах холста) с заданными параметрами стиля.
+        world — мировые координаты отрезка для штриховки в мировых единицах, key — id для кэша штрихов.
+        """
+        descriptor, dash_pattern = params
+        kind = descriptor.kind
+        if kind is RenderKind.WAVY or kind is RenderKind.ZIGZAG:
+            length = hypot(world[2] - world[0], world[3] - world[1]) if world is not None else None
+            self._draw_wave(p1, p2, descriptor, key, length)
+        elif self.world_space_dashes and descriptor.world_pattern and world is not None:
+            self._draw_world_dashes(world, key, descriptor)
+        else:
+            self._line(
+                p1, p2,
+                fill=descriptor.color,
+                width=descriptor.width_px,
+                dash=dash_pattern,
+                tags=("segment", descriptor.tag)
+            )
+
+    def _draw_world_dashes(self, coords, key, descriptor):
+        """Рисует штрихи, нарезанные в мировых координатах (шаблон начинается в начале объекта)."""
+        if key is not None:
+            pieces = self.dash_cache.pieces(key, coords, descriptor.world_pattern, self.trans.scale)
+        else:
+            pieces = tessellate_world(coords, descriptor.world_pattern, self.trans.scale)
+        to_canvas = self.trans.world_to_canvas
+        for j in range(0, len(pieces), 4):
+            self._line(
+                to_canvas(pieces[j], pieces[j + 1]),
+                to_canvas(pieces[j + 2], pieces[j + 3]),
+                fill=descriptor.color,
+                width=descriptor.width_px,
+                capstyle=tk.BUTT,
+                tags=("segment", descriptor.tag)
+            )
+
+    def _draw_block_reference(self, reference, frame_params, visible):
+        """Рисует вставку блока по кэшированным мировым координатам; невидимые вставки отсекаются целиком."""
+        x_lo, y_lo, x_hi, y_hi = reference.bounds()
+        if x_hi < visible[0] or x_lo > visible[2] or y_hi < visible[1] or y_lo > visible[3]:
+            return
+
+        coords = reference.world_coords()
+        style_names = reference.block.style_names
+        to_canvas = self.trans.world_to_canvas
+        for i, style_name in enumerate(style_names):
+            params = self._get_frame_params(style_name, frame_params)
+            if not params:
+                continue
+            j = i * 4
+            p1 = to_canvas(coords[j], coords[j + 1])
+            p2 = to_canvas(coords[j + 2], coords[j + 3])
+            self._draw_line(p1, p2, params, world=coords[j:j + 4])
+
+    def _draw_block_array(self, block_array, frame_params, visible):
+        """Рисует массив: вычисляются и рисуются только экземпляры, попадающие в видимую область."""
+        x_lo, y_lo, x_hi, y_hi = block_array.bounds()
+        if x_hi < visible[0] or x_lo > visible[2] or y_hi < visible[1] or y_lo > visible[3]:
+            return
+
+        style_names = block_array.block.style_names
+        params_list = [self._get_frame_params(name, frame_params) for name in style_names]
+        to_canvas = self.trans.world_to_canvas
+        for offset in block_array.instance_offsets(visible):
+            coords = block_array.instance_coords(offset)
+            for i, params in enumerate(params_list):
+                if not params:
+                    continue
+                j = i * 4
+                p1 = to_canvas(coords[j], coords[j + 1])
+                p2 = to_canvas(coords[j + 2], coords[j + 3])
+                self._draw_line(p1, p2, params, world=coords[j:j + 4])
+
+    def _draw_polyline(self, polyline, params, vertices=None):
+        """
+        Рисует полилинию одним элементом холста (многоточечный create_line).
+        vertices — готовое разбиение объекта (для дуг), по умолчанию вершины полилинии.
+        """
+        descriptor, dash_pattern = params
+        v = polyline.vertices if vertices is None else vertices
+        to_canvas = self.trans.world_to_canvas
+        coords = []
+        for i in range(0, len(v), 2):
+            coords.extend(to_canvas(v[i], v[i + 1]))
+
+        if descriptor.kind in (RenderKind.WAVY, RenderKind.ZIGZAG):
+            # Волна/излом строится по каждому звену отдельно
+            for i in range(0, len(coords) - 2, 2):
+                p1, p2 = (coords[i], coords[i + 1]), (coords[i + 2], coords[i + 3])
+                length = hypot(v[i + 2] - v[i], v[i + 3] - v[i + 1])
+                self._draw_wave(p1, p2, descriptor, (polyline.segment_id, i // 2), length)
+        elif self.world_space_dashes and descriptor.world_pattern:
+            self._draw_world_dashes(v, polyline.segment_id, descriptor)
+        else:
+            self._line(*coords, fill=descriptor.color, width=descriptor.width_px,
+                       dash=dash_pattern, joinstyle=tk.ROUND, tags=("segment", descriptor.tag))
 
     def draw_grid(self):
-        """Рисует сетку."""
+        """Рисует сетку, переиспользуя линии из пула."""
         step = self.trans.grid_step()
         wx1, wy1, wx2, wy2 = self.trans.get_visible_bounds()
+        to_canvas = self.trans.world_to_canvas
 
         sx, ex = floor(wx1 / step) * step, ceil(wx2 / step) * step
         sy, ey = floor(wy1 / step) * step, ceil(wy2 / step) * step
 
+        pool = self._grid_pool
+        pool.begin()
         # Вертикальные линии
         for x in range(int(sx / step), int(ex / step) + 1):
-            p1 = self.trans.world_to_canvas(x * step, sy)
-            p2 = self.trans.world_to_canvas(x * step, ey)
-            self.canvas.create_line(p1, p2, fill=self.grid_color, tags="grid")
+            pool.place(to_canvas(x * step, sy) + to_canvas(x * step, ey))
 
         # Горизонтальные линии
         for y in range(int(sy / step), int(ey / step) + 1):
-            p1 = self.trans.world_to_canvas(sx, y * step)
-            p2 = self.trans.world_to_canvas(ex, y * step)
-            self.canvas.create_line(p1, p2, fill=self.grid_color, tags="grid")
+            pool.place(to_canvas(sx, y * step) + to_canvas(ex, y * step))
+        if pool.end():
+            # Новые линии созданы поверх осей — опускаем всю сетку вниз
+            self.canvas.tag_lower("grid")
 
     def draw_axes(self):
-        """Рисует оси X и Y."""
-        # Ось X (Красная)
-        self.canvas.create_line(self.trans.world_to_canvas(-100000, 0), self.trans.world_to_canvas(100000, 0),
-                                fill="#774444", width=2, tags="axes")
-        # Ось Y (Зеленая)
-        self.canvas.create_line(self.trans.world_to_canvas(0, -100000), self.trans.world_to_canvas(0, 100000),
-                                fill="#447744", width=2, tags="axes")
-
-        # Метка начала координат
-        o = self.trans.world_to_canvas(0, 0)
-        self.canvas.create_text(o[0] + 5, o[1] + 5, text="0", fill="#666", anchor="nw", tags="axes")
+        """Рисует оси X и Y (элементы создаются один раз и затем только перемещаются)."""
+        to_canvas = self.trans.world_to_canvas
+        x_axis = to_canvas(-100000, 0) + to_canvas(100000, 0)
+        y_axis = to_canvas(0, -100000) + to_canvas(0, 100000)
+        o = to_canvas(0, 0)
+
+        if self._axis_items is None:
+            self._axis_items = (
+                # Ось X (Красная)
+                self.canvas.create_line(*x_axis, fill="#774444", width=2, tags="axes"),
+                # Ось Y (Зеленая)
+                self.canvas.create_line(*y_axis, fill="#447744", width=2, tags="axes"),
+                # Метка начала координат
+                self.canvas.create_text(o[0] + 5, o[1] + 5, text="0", fill="#666", anchor="nw", tags="axes"),
+            )
+            return
+
+        x_item, y_item, origin_item = self._axis_items
+        self.canvas.coords(x_item, *x_axis)
+        self.canvas.coords(y_item, *y_axis)
+        self.canvas.coords(origin_item, o[0] + 5, o[1] + 5)
 
     def draw_labels(self):
-        """Рисует подписи координат осей."""
+        """Рисует подписи координат осей, переиспользуя текстовые элементы из пулов."""
         step = self.trans.grid_step()
         b = self.trans.get_visible_bounds()
         w, h = self.canvas.winfo_width(), self.canvas.winfo_height()
+        to_canvas = self.trans.world_to_canvas
+
+        # Строки подписей запоминаются для текущего шага сетки
+        if step != self._label_step:
+            self._label_step = step
+            self._label_texts = {}
+        texts = self._label_texts
 
-        fmt = lambda v: f"{int(round(v))}" if abs(v - round(v)) < 1e-9 else f"{v:.2f}".rstrip("0").rstrip(".")
+        def label(i):
+            text = texts.get(i)
+            if text is None:
+                v = i * step
+                text = f"{int(round(v))}" if abs(v - round(v)) < 1e-9 else f"{v:.2f}".rstrip("0").rstrip(".")
+                texts[i] = text
+            return text
 
         # Подписи для оси X
+        pool = self._x_label_pool
+        pool.begin()
         for x in range(int(floor(b[0] / step)), int(ceil(b[2] / step)) + 1):
             if x == 0: continue
-            cx, cy = self.trans.world_to_canvas(x * step, 0)
+            cx, cy = to_canvas(x * step, 0)
             if -20 < cx < w + 20 and -20 < cy < h + 20:
-                self.canvas.create_text(cx, cy + 15, text=fmt(x * step), fill="#888", font=("Arial", 8))
+                pool.place((cx, cy + 15), text=label(x))
+        pool.end()
 
         # Подписи для оси Y
+        pool = self._y_label_pool
+        pool.begin()
         for y in range(int(floor(b[1] / step)), int(ceil(b[3] / step)) + 1):
             if y == 0: continue
-            cx, cy = self.trans.world_to_canvas(0, y * step)
+            cx, cy = to_canvas(0, y * step)
             if -20 < cx < w + 20 and -20 < cy < h + 20:
-                self.canvas.create_text(cx - 25, cy, text=fmt(y * step), fill="#888", font=("Arial", 8), anchor="e")
+                pool.place((cx - 25, cy), text=label(y))
+        pool.end()
 
     def draw_preview(self, w1, w2, style_name):
         """Рисует предварительный (пунктирный) отрезок с учетом стиля."""
@@ -169,81 +1042,86 @@ class CADView:
                                 dash=dash_pattern,
                                 tags="preview")
 
+    def draw_polyline_preview(self, points, cursor, style_name):
+        """Рисует предварительную полилинию: набранные вершины и звено до курсора."""
+        style = self.style_manager.get_style(style_name)
+        if not style: return
+
+        line_width = style.thickness_mm * 3.7795
+        coords = []
+        for p in list(points) + [cursor]:
+            coords.extend(self.trans.world_to_canvas(*p))
+
+        self.canvas.delete("preview")
+        if len(coords) >= 4:
+            self.canvas.create_line(*coords,
+                                    fill=style.color,
+                                    width=line_width,
+                                    dash=(8, 4),
+                                    tags="preview")
+
+    def draw_arc_preview(self, cx, cy, radius, start_angle, sweep, style_name):
+        """Рисует предварительную окружность/дугу; разбиение — как при обычной отрисовке."""
+        style = self.style_manager.get_style(style_name)
+        self.canvas.delete("preview")
+        if not style or radius <= 0:
+            return
+        arc = Arc(cx, cy, radius, start_angle, sweep, style_name, 0)
+        v = arc.tessellate(self.trans.zoom_bucket())
+        coords = []
+        for i in range(0, len(v), 2):
+            coords.extend(self.trans.world_to_canvas(v[i], v[i + 1]))
+        self.canvas.create_line(*coords,
+                                fill=style.color,
+                                width=style.thickness_mm * MM_TO_PIXEL,
+                                dash=(8, 4),
+                                tags="preview")
+
     def clear_preview(self):
         """Удаляет предварительный отрезок."""
         self.canvas.delete("preview")
 
-    def _draw_wavy_line(self, p1, p2, color, width):
-        step = self.trans.grid_step()  # 1 шаг = 1 мм
-        amplitude_mm = 0.3 * step  # высота волны ≈ 0.3 шага (0.3 мм)
-        wavelength_mm = 1.5 * step  # длина волны ≈ 1.5 шага (1.5 мм)
+    def _wave_params(self, kind, bucket):
+        """
+        Длина волны и амплитуда (в мировых единицах) для корзины масштаба: экранные размеры
+        по шагу сетки, как и раньше, но зафиксированные для всей корзины.
+        """
+        scale = bucket_scale(bucket)
+        step = grid_step_for_scale(scale)  # 1 шаг = 1 мм
+        amplitude = max(3.0, 0.3 * step * MM_TO_PIXEL)  # высота волны/зубца ≈ 0.3 шага
+        if kind is RenderKind.WAVY:
+            wavelength = max(10.0, 1.5 * step * MM_TO_PIXEL)  # длина волны ≈ 1.5 шага
+        else:
+            wavelength = max(10.0, 1.0 * step * MM_TO_PIXEL, 12.0)  # шаг зигзага ≈ 1 шаг сетки
+        return wavelength / scale, amplitude / scale
 
-        amplitude = max(3.0, amplitude_mm * 3.7795)
-        wavelength = max(10.0, wavelength_mm * 3.7795)
+    def _draw_wave(self, p1, p2, descriptor, key=None, world_length=None):
+        """
+        Рисует волнистую линию или линию с изломами. Профиль строится в мировых единицах
+        и кэшируется по (key, корзина масштаба); при перерисовке он только переносится на экран.
+        world_length — длина в мировых координатах: в отличие от длины, пересчитанной с экрана,
+        она не меняется при панорамировании, и кэш профиля не промахивается из-за округления.
+        """
+        scale = self.trans.scale
+        screen_length = hypot(p2[0] - p1[0], p2[1] - p1[1])
+        if screen_length < 1:
+            self._line(p1, p2, fill=descriptor.color, width=descriptor.width_px, tags=("segment", descriptor.tag))
+            return
 
-        points = self._generate_wave_points(p1, p2, amplitude=amplitude,
-                                            wavelength=wavelength, mode="wave")
-        if len(points) >= 4:
-            self.canvas.create_line(*points, fill=color, width=width,
-                                    smooth=True, splinesteps=12, tags="segment")
+        kind = descriptor.kind
+        mode = WAVE if kind is RenderKind.WAVY else ZIGZAG
+        bucket = self.trans.zoom_bucket()
+        wavelength, amplitude = self._wave_params(kind, bucket)
+        length = world_length if world_length is not None else screen_length / scale
+        if key is not None:
+            profile = self.wave_cache.profile((key, mode, bucket), length, wavelength, amplitude, mode)
+        else:
+            profile = wave_profile(length, wavelength, amplitude, mode)
 
-    def _draw_zigzag_line(self, p1, p2, color, width):
-        step = self.trans.grid_step()
-        amplitude_mm = 0.3 * step  # зубец по высоте ≈ 0.3 шага
-        wavelength_mm = 1.0 * step  # шаг зигзага ≈ 1 шаг сетки
-
-        amplitude = max(3.0, amplitude_mm * 3.7795)
-        wavelength = max(10.0, wavelength_mm * 3.7795)
-
-        points = self._generate_wave_points(p1, p2, amplitude=amplitude,
-                                            wavelength=wavelength, mode="zigzag")
-        if len(points) >= 4:
-            self.canvas.create_line(*points, fill=color, width=width,
-                                    smooth=False, tags="segment")
-
-    def _generate_wave_points(self, p1, p2, amplitude, wavelength, mode="wave"):
-        x1, y1 = p1
-        x2, y2 = p2
-        dx = x2 - x1
-        dy = y2 - y1
-        length = hypot(dx, dy)
-        if length < 1:
-            return [x1, y1, x2, y2]
-
-        ux, uy = dx / length, dy / length
-        px, py = -uy, ux
-
-        if mode == "wave":
-            periods = max(length / wavelength, 1)
-            steps_per_period = 16
-            steps = max(int(periods * steps_per_period), 8)
-            points = []
-            for i in range(steps + 1):
-                t = i / steps
-                dist = t * length
-                base_x = x1 + ux * dist
-                base_y = y1 + uy * dist
-                phase = 2 * pi * dist / wavelength
-                offset = sin(phase) * amplitude
-                points.extend([base_x + px * offset, base_y + py * offset])
-            return points
+        points = place_profile(profile, p1[0], p1[1], p2[0], p2[1], scale)
+        if mode == WAVE:
+            self._line(*points, fill=descriptor.color, width=descriptor.width_px,
+                       smooth=True, splinesteps=12, tags=("segment", descriptor.tag))
         else:
-            spacing = max(wavelength, 12)
-            points = [x1, y1]
-            i = 1
-            while True:
-                dist = i * spacing
-                if dist >= length:
-                    break
-                base_x = x1 + ux * dist
-                base_y = y1 + uy * dist
-                points.extend([base_x, base_y])
-
-                offset = amplitude if i % 2 else -amplitude
-                kink_x = base_x + px * offset
-                kink_y = base_y + py * offset
-                points.extend([kink_x, kink_y, base_x, base_y])
-                i += 1
-
-            points.extend([x2, y2])
-            return points
\ No newline at end of file
+            self._line(*points, fill=descriptor.color, width=descriptor.width_px,
+                       smooth=False, tags=("segment", descriptor.tag))
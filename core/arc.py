@@ -0,0 +1,148 @@
+# core/arc.py
+
+from array import array
+from math import sqrt, cos, sin, acos, atan2, degrees, pi, ceil, hypot
+
+from .view_transforms import bucket_scale
+
+# Допустимое отклонение хорды от дуги на экране (px)
+CHORD_TOLERANCE_PX = 0.25
+MIN_CHORDS = 4
+MAX_CHORDS = 1024
+# Относительная точность разбиения для экспорта и растеризации (доля радиуса)
+EXACT_TOLERANCE = 1e-3
+
+
+def chord_count(radius_px, sweep, tolerance_px=CHORD_TOLERANCE_PX):
+    """
+    Число хорд, при котором отклонение хорды от дуги радиуса radius_px (на экране) не превышает
+    tolerance_px. Маленькие дуги получают несколько хорд, крупные — до MAX_CHORDS.
+    """
+    sweep = abs(sweep)
+    if radius_px <= tolerance_px:
+        return MIN_CHORDS
+    step = 2 * acos(1 - tolerance_px / radius_px)
+    return max(MIN_CHORDS, min(MAX_CHORDS, int(ceil(sweep / step))))
+
+
+class Arc:
+    """
+    Дуга окружности: центр, радиус, начальный угол и угол раствора (радианы, положительный —
+    против часовой стрелки). Длина, габариты и расстояние считаются точно; для отрисовки дуга
+    разбивается на хорды с числом, зависящим от радиуса на экране (кэш по зонным корзинам).
+    """
+    kind_name = "Дуга"
+
+    def __init__(self, cx, cy, radius, start_angle, sweep, style_name, segment_id):
+        if radius <= 0:
+            raise ValueError("Радиус должен быть положительным.")
+        if sweep == 0:
+            raise ValueError("Угол дуги не может быть нулевым.")
+        self.cx, self.cy = cx, cy
+        self.radius = radius
+        self.start_angle = start_angle
+        self.sweep = max(-2 * pi, min(2 * pi, sweep))
+        self.style_name = style_name
+        self.segment_id = segment_id
+        self._tessellations = {}  # зонная корзина -> array('d') вершин
+        self._vertices = None
+
+    def point_at(self, angle):
+        return self.cx + self.radius * cos(angle), self.cy + self.radius * sin(angle)
+
+    def start_point(self):
+        return self.point_at(self.start_angle)
+
+    def end_point(self):
+        return self.point_at(self.start_angle + self.sweep)
+
+    def _build(self, chords):
+        points = array('d')
+        step = self.sweep / chords
+        for i in range(chords + 1):
+            points.extend(self.point_at(self.start_angle + i * step))
+        return points
+
+    def tessellate(self, bucket):
+        """Вершины [x0, y0, ...] ломаной для зонной корзины масштаба (кэшируются)."""
+        points = self._tessellations.get(bucket)
+        if points is None:
+            points = self._build(chord_count(self.radius * bucket_scale(bucket), self.sweep))
+            self._tessellations[bucket] = points
+        return points
+
+    @property
+    def vertices(self):
+        """Подробное разбиение (не зависит от масштаба) — для экспорта, блоков и растеризации."""
+        if self._vertices is None:
+            self._vertices = self._build(chord_count(self.radius, self.sweep, self.radius * EXACT_TOLERANCE))
+        return self._vertices
+
+    def edges(self):
+        v = self.vertices
+        for i in range(0, len(v) - 2, 2):
+            yield v[i], v[i + 1], v[i + 2], v[i + 3]
+
+    def length(self):
+        return abs(self.sweep) * self.radius
+
+    def _contains_angle(self, angle):
+        """Лежит ли направление angle внутри раствора дуги."""
+        if abs(self.sweep) >= 2 * pi:
+            return True
+        if self.sweep > 0:
+            return (angle - self.start_angle) % (2 * pi) <= self.sweep
+        return (self.start_angle - angle) % (2 * pi) <= -self.sweep
+
+    def bounds(self):
+        """Точные габариты: концы дуги и пересечения с осями, попавшие в раствор."""
+        points = [self.start_point(), self.end_point()]
+        for k in range(4):
+            angle = k * pi / 2
+            if self._contains_angle(angle):
+                points.append(self.point_at(angle))
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def distance_to(self, px, py):
+        """Точное расстояние от точки до дуги."""
+        angle = atan2(py - self.cy, px - self.cx)
+        if self._contains_angle(angle):
+            return abs(hypot(px - self.cx, py - self.cy) - self.radius)
+        (x1, y1), (x2, y2) = self.start_point(), self.end_point()
+        return min(sqrt((px - x1) ** 2 + (py - y1) ** 2), sqrt((px - x2) ** 2 + (py - y2) ** 2))
+
+    def describe(self, as_degrees=True):
+        if as_degrees:
+            start = f"{degrees(self.start_angle) % 360:.2f}°"
+            sweep = f"{degrees(self.sweep):.2f}°"
+        else:
+            start = f"{self.start_angle % (2 * pi):.4f} рад"
+            sweep = f"{self.sweep:.4f} рад"
+        return (f"{self.kind_name} #{self.segment_id}\n"
+                f"Центр: ({self.cx:.2f}, {self.cy:.2f})\n"
+                f"Радиус: {self.radius:.2f}\n"
+                f"Начальный угол: {start}\n"
+                f"Раствор: {sweep}\n"
+                f"Длина: {self.length():.2f}\n"
+                f"Стиль: {self.style_name}")
+
+
+class Circle(Arc):
+    """Окружность — замкнутая дуга на полный оборот."""
+    kind_name = "Окружность"
+
+    def __init__(self, cx, cy, radius, style_name, segment_id):
+        super().__init__(cx, cy, radius, 0.0, 2 * pi, style_name, segment_id)
+
+    def bounds(self):
+        r = self.radius
+        return self.cx - r, self.cy - r, self.cx + r, self.cy + r
+
+    def describe(self, as_degrees=True):
+        return (f"{self.kind_name} #{self.segment_id}\n"
+                f"Центр: ({self.cx:.2f}, {self.cy:.2f})\n"
+                f"Радиус: {self.radius:.2f}\n"
+                f"Длина: {self.length():.2f}\n"
+                f"Стиль: {self.style_name}")
@@ -0,0 +1,368 @@
+# core/block.py
+
+from array import array
+from math import sqrt, cos, sin, degrees, pi, ceil, floor
+
+from .segment import Segment, distance_point_to_segment
+
+
+def iter_segment_tuples(objects):
+    """Раскладывает объекты сцены на кортежи (x1, y1, x2, y2, style_name) для определения блока."""
+    for obj in objects:
+        if isinstance(obj, Segment):
+            yield obj.x1, obj.y1, obj.x2, obj.y2, obj.style_name
+        elif hasattr(obj, "edges") and obj.style_name:
+            for x1, y1, x2, y2 in obj.edges():
+                yield x1, y1, x2, y2, obj.style_name
+
+
+class BlockDefinition:
+    """
+    Определение блока — именованная группа отрезков в локальных координатах блока.
+    Координаты хранятся плоским массивом [x1, y1, x2, y2, ...], стили — параллельным списком.
+    Любое изменение увеличивает version, по которой вставки сбрасывают свои кэши.
+    """
+    def __init__(self, name, segments=(), base_point=(0.0, 0.0)):
+        self.name = name
+        self.coords = array('d')
+        self.style_names = []
+        self.version = 0
+        self._bounds = None
+        self._style_totals = None
+        self.set_segments(segments, base_point)
+
+    def set_segments(self, segments, base_point=(0.0, 0.0)):
+        """Заменяет содержимое блока кортежами (x1, y1, x2, y2, style_name) относительно base_point."""
+        bx, by = base_point
+        self.coords = array('d')
+        self.style_names = []
+        for x1, y1, x2, y2, style_name in segments:
+            self.coords.extend((x1 - bx, y1 - by, x2 - bx, y2 - by))
+            self.style_names.append(style_name)
+        self._touch()
+
+    def add_segment(self, x1, y1, x2, y2, style_name):
+        """Добавляет отрезок в локальных координатах блока."""
+        self.coords.extend((x1, y1, x2, y2))
+        self.style_names.append(style_name)
+        self._touch()
+
+    def segment_count(self):
+        return len(self.style_names)
+
+    def replace_style(self, old_name, new_name):
+        """Переводит отрезки блока со стиля old_name на new_name; возвращает их число."""
+        count = 0
+        for i, style_name in enumerate(self.style_names):
+            if style_name == old_name:
+                self.style_names[i] = new_name
+                count += 1
+        if count:
+            self._touch()
+        return count
+
+    def bounds(self):
+        """Габариты блока в локальных координатах или None для пустого блока."""
+        if self._bounds is None and self.style_names:
+            xs = self.coords[0::2]
+            ys = self.coords[1::2]
+            self._bounds = (min(xs), min(ys), max(xs), max(ys))
+        return self._bounds
+
+    def style_totals(self):
+        """Возвращает {имя стиля: (количество, суммарная длина)} в единицах блока."""
+        if self._style_totals is None:
+            totals = {}
+            c = self.coords
+            for i, style_name in enumerate(self.style_names):
+                j = i * 4
+                length = sqrt((c[j + 2] - c[j]) ** 2 + (c[j + 3] - c[j + 1]) ** 2)
+                count, total = totals.get(style_name, (0, 0.0))
+                totals[style_name] = (count + 1, total + length)
+            self._style_totals = totals
+        return self._style_totals
+
+    def length(self):
+        return sum(total for _, total in self.style_totals().values())
+
+    def _touch(self):
+        self.version += 1
+        self._bounds = None
+        self._style_totals = None
+
+
+class BlockReference:
+    """
+    Вставка блока: хранит только ссылку на определение и преобразование
+    (точка вставки, поворот в радианах, масштаб). Мировые координаты отрезков
+    вычисляются лениво и кэшируются до изменения блока или самой вставки.
+    """
+    style_name = None  # Стили берутся из определения блока
+
+    def __init__(self, block, x, y, rotation=0.0, scale=1.0, segment_id=None):
+        self.block = block
+        self.x, self.y = x, y
+        self.rotation = rotation
+        self.scale = scale
+        self.segment_id = segment_id
+        self._cache_key = None
+        self._world = None
+        self._bounds = None
+
+    def set_transform(self, x=None, y=None, rotation=None, scale=None):
+        """Изменяет преобразование вставки и сбрасывает кэш."""
+        if x is not None: self.x = x
+        if y is not None: self.y = y
+        if rotation is not None: self.rotation = rotation
+        if scale is not None: self.scale = scale
+        self._cache_key = None
+
+    def transform_point(self, lx, ly):
+        """Переводит точку из координат блока в мировые."""
+        ca, sa = cos(self.rotation) * self.scale, sin(self.rotation) * self.scale
+        return self.x + lx * ca - ly * sa, self.y + lx * sa + ly * ca
+
+    def world_coords(self):
+        """Плоский массив мировых координат [x1, y1, x2, y2, ...] (кэшируется)."""
+        self._refresh()
+        return self._world
+
+    def bounds(self):
+        """Габариты вставки в мировых координатах."""
+        self._refresh()
+        return self._bounds
+
+    def length(self):
+        return self.block.length() * abs(self.scale)
+
+    def style_totals(self):
+        """Статистика по стилям с учетом масштаба вставки."""
+        k = abs(self.scale)
+        return {name: (count, total * k) for name, (count, total) in self.block.style_totals().items()}
+
+    def distance_to(self, px, py):
+        """Кратчайшее расстояние от точки до любого отрезка вставки."""
+        c = self.world_coords()
+        best = float("inf")
+        for j in range(0, len(c), 4):
+            d = distance_point_to_segment(px, py, c[j], c[j + 1], c[j + 2], c[j + 3])
+            if d < best:
+                best = d
+        return best
+
+    def describe(self, as_degrees=True):
+        """Возвращает форматированное описание вставки."""
+        unit = "°" if as_degrees else "rad"
+        angle = degrees(self.rotation) if as_degrees else self.rotation
+        return (f"Вставка блока #{self.segment_id}\n"
+                f"Блок: {self.block.name}\n"
+                f"Точка вставки: ({self.x:.2f}, {self.y:.2f})\n"
+                f"Поворот: {angle:.2f} {unit}\n"
+                f"Масштаб: {self.scale:.2f}\n"
+                f"Отрезков: {self.block.segment_count()}\n"
+                f"Длина: {self.length():.2f}")
+
+    def _refresh(self):
+        key = self.block.version
+        if self._cache_key == key:
+            return
+        ca, sa = cos(self.rotation) * self.scale, sin(self.rotation) * self.scale
+        x0, y0 = self.x, self.y
+        local = self.block.coords
+        world = array('d', local)
+        for j in range(0, len(local), 2):
+            lx, ly = local[j], local[j + 1]
+            world[j] = x0 + lx * ca - ly * sa
+            world[j + 1] = y0 + lx * sa + ly * ca
+        self._world = world
+        if world:
+            xs, ys = world[0::2], world[1::2]
+            self._bounds = (min(xs), min(ys), max(xs), max(ys))
+        else:
+            self._bounds = (x0, y0, x0, y0)
+        # Ключ публикуется последним: совпавший ключ означает готовые _world и _bounds
+        self._cache_key = key
+
+
+class BlockArray(BlockReference):
+    """
+    Массив вставок блока (прямоугольный или круговой). Хранит только параметры
+    массива: отдельные экземпляры не материализуются, их преобразования
+    вычисляются на лету, а отсечение выполняется по габаритам экземпляра.
+    """
+    RECTANGULAR = "rect"
+    POLAR = "polar"
+
+    def __init__(self, block, x, y, rotation=0.0, scale=1.0, segment_id=None):
+        super().__init__(block, x, y, rotation, scale, segment_id)
+        self.mode = self.RECTANGULAR
+        self.rows, self.cols = 1, 1
+        self.row_spacing, self.col_spacing = 0.0, 0.0
+        self.count = 1
+        self.total_angle = 2 * pi
+        self.center = (x, y)
+        self._array_bounds_key = None
+        self._array_bounds = None
+
+    @classmethod
+    def rectangular(cls, block, x, y, rows, cols, row_spacing, col_spacing, rotation=0.0, scale=1.0,
+                    segment_id=None):
+        if rows < 1 or cols < 1:
+            raise ValueError("Количество рядов и столбцов должно быть не меньше 1.")
+        array_ref = cls(block, x, y, rotation, scale, segment_id)
+        array_ref.rows, array_ref.cols = int(rows), int(cols)
+        array_ref.row_spacing, array_ref.col_spacing = row_spacing, col_spacing
+        return array_ref
+
+    @classmethod
+    def polar(cls, block, x, y, count, total_angle, center, rotation=0.0, scale=1.0, segment_id=None):
+        """total_angle — угол заполнения в радианах; 2π означает полный круг."""
+        if count < 1:
+            raise ValueError("Количество элементов должно быть не меньше 1.")
+        array_ref = cls(block, x, y, rotation, scale, segment_id)
+        array_ref.mode = cls.POLAR
+        array_ref.count = int(count)
+        array_ref.total_angle = total_angle
+        array_ref.center = center
+        return array_ref
+
+    def instance_count(self):
+        return self.rows * self.cols if self.mode == self.RECTANGULAR else self.count
+
+    def _polar_step(self):
+        if self.count < 2:
+            return 0.0
+        if abs(abs(self.total_angle) - 2 * pi) < 1e-9:
+            return self.total_angle / self.count
+        return self.total_angle / (self.count - 1)
+
+    def instance_offsets(self, visible=None):
+        """
+        Итерирует экземпляры как (dx, dy, angle) относительно базовой вставки:
+        для прямоугольного массива — сдвиг, для кругового — поворот вокруг центра.
+        Если задан visible = (x1, y1, x2, y2), пропускает экземпляры вне этой области.
+        """
+        base = super().bounds()
+        if self.mode == self.RECTANGULAR:
+            if visible is None:
+                row_range, col_range = range(self.rows), range(self.cols)
+            else:
+                # Видимые ряды/столбцы находятся напрямую, без перебора экземпляров
+                col_range = _visible_index_range(base[0], base[2], visible[0], visible[2],
+                                                 self.col_spacing, self.cols)
+                row_range = _visible_index_range(base[1], base[3], visible[1], visible[3],
+                                                 self.row_spacing, self.rows)
+            for r in row_range:
+                for c in col_range:
+                    yield c * self.col_spacing, r * self.row_spacing, 0.0
+        else:
+            step = self._polar_step()
+            for k in range(self.count):
+                angle = k * step
+                if visible is not None:
+                    x_lo, y_lo, x_hi, y_hi = self._rotated_bounds(base, angle)
+                    if x_hi < visible[0] or x_lo > visible[2] or y_hi < visible[1] or y_lo > visible[3]:
+                        continue
+                yield 0.0, 0.0, angle
+
+    def instance_coords(self, offset):
+        """Мировые координаты отрезков одного экземпляра (плоский массив)."""
+        dx, dy, angle = offset
+        base = self.world_coords()
+        if angle == 0.0:
+            if dx == 0.0 and dy == 0.0:
+                return base
+            coords = array('d', base)
+            for j in range(0, len(coords), 2):
+                coords[j] += dx
+                coords[j + 1] += dy
+            return coords
+        cx, cy = self.center
+        ca, sa = cos(angle), sin(angle)
+        coords = array('d', base)
+        for j in range(0, len(coords), 2):
+            tx, ty = base[j] - cx, base[j + 1] - cy
+            coords[j] = cx + tx * ca - ty * sa
+            coords[j + 1] = cy + tx * sa + ty * ca
+        return coords
+
+    def bounds(self):
+        """Габариты всего массива."""
+        base = super().bounds()
+        key = (self._cache_key, self.x, self.y, self.rotation, self.scale, self.mode, self.rows, self.cols, self.row_spacing, self.col_spacing,
+               self.count, self.total_angle, self.center)
+        if self._array_bounds_key != key:
+            self._array_bounds_key = key
+            if self.mode == self.RECTANGULAR:
+                span_x = (self.cols - 1) * self.col_spacing
+                span_y = (self.rows - 1) * self.row_spacing
+                self._array_bounds = (base[0] + min(0.0, span_x), base[1] + min(0.0, span_y),
+                                      base[2] + max(0.0, span_x), base[3] + max(0.0, span_y))
+            else:
+                boxes = [self._rotated_bounds(base, angle) for _, _, angle in self.instance_offsets()]
+                self._array_bounds = (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                                      max(b[2] for b in boxes), max(b[3] for b in boxes))
+        return self._array_bounds
+
+    def length(self):
+        return super().length() * self.instance_count()
+
+    def style_totals(self):
+        n = self.instance_count()
+        return {name: (count * n, total * n) for name, (count, total) in super().style_totals().items()}
+
+    def distance_to(self, px, py):
+        """Расстояние до ближайшего отрезка среди экземпляров рядом с точкой."""
+        base = super().bounds()
+        reach = max(base[2] - base[0], base[3] - base[1])
+        probe = (px - reach, py - reach, px + reach, py + reach)
+        best = float("inf")
+        for offset in self.instance_offsets(probe):
+            c = self.instance_coords(offset)
+            for j in range(0, len(c), 4):
+                d = distance_point_to_segment(px, py, c[j], c[j + 1], c[j + 2], c[j + 3])
+                if d < best:
+                    best = d
+        return best
+
+    def describe(self, as_degrees=True):
+        """Возвращает форматированное описание массива."""
+        if self.mode == self.RECTANGULAR:
+            layout = (f"Ряды × столбцы: {self.rows} × {self.cols}\n"
+                      f"Шаг: {self.row_spacing:.2f} × {self.col_spacing:.2f}")
+        else:
+            angle = degrees(self.total_angle) if as_degrees else self.total_angle
+            unit = "°" if as_degrees else "rad"
+            layout = (f"Элементов по кругу: {self.count}\n"
+                      f"Угол заполнения: {angle:.2f} {unit}\n"
+                      f"Центр: ({self.center[0]:.2f}, {self.center[1]:.2f})")
+        return (f"Массив блока #{self.segment_id}\n"
+                f"Блок: {self.block.name}\n"
+                f"{layout}\n"
+                f"Экземпляров: {self.instance_count()}\n"
+                f"Длина: {self.length():.2f}")
+
+    def _rotated_bounds(self, box, angle):
+        if angle == 0.0:
+            return box
+        cx, cy = self.center
+        ca, sa = cos(angle), sin(angle)
+        xs, ys = [], []
+        for x, y in ((box[0], box[1]), (box[2], box[1]), (box[2], box[3]), (box[0], box[3])):
+            tx, ty = x - cx, y - cy
+            xs.append(cx + tx * ca - ty * sa)
+            ys.append(cy + tx * sa + ty * ca)
+        return min(xs), min(ys), max(xs), max(ys)
+
+
+def _visible_index_range(lo, hi, vis_lo, vis_hi, spacing, n):
+    """Диапазон индексов i, для которых [lo + i*spacing, hi + i*spacing] пересекает [vis_lo, vis_hi]."""
+    if spacing == 0.0:
+        return range(n) if hi >= vis_lo and lo <= vis_hi else range(0)
+    a = (vis_lo - hi) / spacing
+    b = (vis_hi - lo) / spacing
+    if a > b:
+        a, b = b, a
+    first = max(0, int(ceil(a)))
+    last = min(n - 1, int(floor(b)))
+    return range(first, last + 1)
@@ -0,0 +1,166 @@
+# core/dash_tessellation.py
+
+from array import array
+from collections import OrderedDict
+from math import hypot, ceil, log2
+
+# Минимальный период шаблона на экране (px): при отдалении шаблон увеличивается
+# в 2^k раз, чтобы штрихи не сливались в сплошную линию.
+MIN_PERIOD_PX = 12.0
+# Ограничение числа штрихов на один отрезок.
+MAX_PIECES = 4096
+
+
+def normalize_pattern(pattern):
+    """Приводит шаблон к четной длине (штрих, пробел, ...), как это делает Tk."""
+    pattern = tuple(max(float(v), 1e-3) for v in pattern)
+    if len(pattern) % 2:
+        pattern = pattern * 2
+    return pattern
+
+
+def dash_zoom_bucket(pattern, scale):
+    """
+    Номер зонной корзины k >= 0: шаблон в мировых единицах умножается на 2^k.
+    Внутри корзины штрихи неподвижны относительно геометрии при панорамировании и зуме.
+    """
+    period = sum(pattern)
+    if period <= 0 or scale <= 0:
+        return 0
+    return max(0, int(ceil(log2(MIN_PERIOD_PX / (period * scale)))))
+
+
+def tessellate_dashes(x1, y1, x2, y2, pattern, phase=0.0):
+    """
+    Разбивает отрезок на штрихи в мировых координатах. Шаблон начинается в точке (x1, y1)
+    со сдвигом phase вдоль шаблона. Возвращает (array [x1, y1, x2, y2, ...], новая фаза).
+    """
+    pieces = array('d')
+    length = hypot(x2 - x1, y2 - y1)
+    period = sum(pattern)
+    if length == 0.0 or period <= 0:
+        return pieces, phase
+    ux, uy = (x2 - x1) / length, (y2 - y1) / length
+
+    # Находим элемент шаблона и смещение внутри него, соответствующие фазе
+    offset = phase % period
+    idx = 0
+    while offset >= pattern[idx]:
+        offset -= pattern[idx]
+        idx = (idx + 1) % len(pattern)
+
+    dist = 0.0
+    while dist < length:
+        remaining = pattern[idx] - offset
+        end = min(length, dist + remaining)
+        if idx % 2 == 0:  # четные элементы — штрихи, нечетные — пробелы
+            pieces.extend((x1 + ux * dist, y1 + uy * dist, x1 + ux * end, y1 + uy * end))
+        if dist + remaining > length:
+            offset += length - dist
+            break
+        dist = end
+        idx = (idx + 1) % len(pattern)
+        offset = 0.0
+
+    return pieces, (sum(pattern[:idx]) + offset) % period
+
+
+def scaled_pattern(coords, pattern, bucket):
+    """Шаблон корзины bucket, дополнительно увеличенный, если штрихов слишком много."""
+    total = sum(hypot(coords[i + 2] - coords[i], coords[i + 3] - coords[i + 1])
+                for i in range(0, len(coords) - 2, 2))
+    factor = 2 ** bucket
+    while total / (sum(pattern) * factor) > MAX_PIECES:
+        factor *= 2
+    return tuple(v * factor for v in pattern)
+
+
+def tessellate_world(coords, pattern, scale):
+    """Штрихи цепочки вершин без кэширования (для объектов без собственного id, например экземпляров блоков)."""
+    pattern = normalize_pattern(pattern)
+    return tessellate_chain(coords, scaled_pattern(coords, pattern, dash_zoom_bucket(pattern, scale)))
+
+
+def tessellate_chain(coords, pattern):
+    """Разбивает цепочку вершин [x0, y0, x1, y1, ...] на штрихи; шаблон непрерывен через вершины."""
+    pieces = array('d')
+    phase = 0.0
+    for i in range(0, len(coords) - 2, 2):
+        part, phase = tessellate_dashes(coords[i], coords[i + 1], coords[i + 2], coords[i + 3], pattern, phase)
+        pieces.extend(part)
+    return pieces
+
+
+class DashTessellationCache:
+    """
+    Кэш штрихов в мировых координатах по ключу (id объекта, зонная корзина).
+    Повторные кадры (панорамирование, зум внутри корзины) используют готовые массивы.
+    """
+
+    def __init__(self, max_entries=20000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (object_id, bucket) -> (геометрия, шаблон, штрихи)
+
+    def pieces(self, object_id, coords, pattern, scale):
+        """
+        Штрихи для цепочки вершин coords (отрезок — две вершины) с шаблоном pattern
+        в мировых единицах при масштабе scale (px на мировую единицу).
+        """
+        pattern = normalize_pattern(pattern)
+        if not pattern:
+            return None
+        bucket = dash_zoom_bucket(pattern, scale)
+        key = (object_id, bucket)
+        geometry = tuple(coords)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == geometry and entry[1] == pattern:
+            self._entries.move_to_end(key)
+            return entry[2]
+
+        pieces = tessellate_chain(coords, scaled_pattern(coords, pattern, bucket))
+
+        self._entries[key] = (geometry, pattern, pieces)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return pieces
+
+    def clear(self):
+        self._entries.clear()
+
+
+def _iter_pieces(style, coords, pieces):
+    if pieces is None:
+        for i in range(0, len(coords) - 2, 2):
+            yield style, coords[i], coords[i + 1], coords[i + 2], coords[i + 3]
+    else:
+        for j in range(0, len(pieces), 4):
+            yield style, pieces[j], pieces[j + 1], pieces[j + 2], pieces[j + 3]
+
+
+def iter_scene_pieces(scene, style_manager, scale, cache):
+    """
+    Итерирует (стиль, x1, y1, x2, y2) — сплошные куски всех объектов сцены в мировых
+    координатах с учетом штриховки. Общий источник для экспорта и растеризации.
+    """
+    for obj in scene.all_objects():
+        if obj.style_name is None:
+            # Вставки и массивы блоков: стили берутся из определения блока
+            offsets = obj.instance_offsets() if hasattr(obj, "instance_offsets") else (None,)
+            style_names = obj.block.style_names
+            for offset in offsets:
+                coords = obj.world_coords() if offset is None else obj.instance_coords(offset)
+                for i, style_name in enumerate(style_names):
+                    style = style_manager.get_style(style_name)
+                    if not style:
+                        continue
+                    segment = coords[i * 4:i * 4 + 4]
+                    pieces = tessellate_world(segment, style.dash_pattern, scale) if style.dash_pattern else None
+                    yield from _iter_pieces(style, segment, pieces)
+            continue
+
+        style = style_manager.get_style(obj.style_name)
+        if not style:
+            continue
+        coords = obj.vertices if hasattr(obj, "vertices") else (obj.x1, obj.y1, obj.x2, obj.y2)
+        pieces = cache.pieces(obj.segment_id, coords, style.dash_pattern, scale) if style.dash_pattern else None
+        yield from _iter_pieces(style, coords, pieces)
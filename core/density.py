@@ -0,0 +1,113 @@
+# core/density.py
+
+from array import array
+from math import hypot, log1p
+
+
+def hex_to_rgb(color, default=(200, 200, 200)):
+    """'#RRGGBB' -> (r, g, b); для нераспознанных цветов возвращает default."""
+    if isinstance(color, str) and len(color) == 7 and color.startswith("#"):
+        try:
+            return int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
+        except ValueError:
+            pass
+    return default
+
+
+def iter_object_lines(obj, visible=None):
+    """
+    Итерирует (x1, y1, x2, y2, стиль) — прямые участки объекта сцены в мировых координатах.
+    Для вставок и массивов блоков стиль берется из определения блока; visible ограничивает
+    экземпляры массива видимой областью.
+    """
+    if obj.style_name is None:
+        style_names = obj.block.style_names
+        if hasattr(obj, "instance_offsets"):
+            instances = (obj.instance_coords(offset) for offset in obj.instance_offsets(visible))
+        else:
+            instances = (obj.world_coords(),)
+        for coords in instances:
+            for i, style_name in enumerate(style_names):
+                j = i * 4
+                yield coords[j], coords[j + 1], coords[j + 2], coords[j + 3], style_name
+        return
+
+    if hasattr(obj, "vertices"):
+        v = obj.vertices
+        for i in range(0, len(v) - 2, 2):
+            yield v[i], v[i + 1], v[i + 2], v[i + 3], obj.style_name
+        return
+
+    yield obj.x1, obj.y1, obj.x2, obj.y2, obj.style_name
+
+
+class DensityGrid:
+    """
+    Двумерная гистограмма длин линий в экранных ячейках cell x cell пикселей.
+    Для каждой ячейки копится суммарная длина и взвешенный по длине цвет стиля.
+    """
+
+    def __init__(self, width, height, cell):
+        self.cell = cell
+        self.cols = max(1, int(width // cell) + 1)
+        self.rows = max(1, int(height // cell) + 1)
+        size = self.cols * self.rows
+        self.lengths = array('d', bytes(8 * size))
+        self.red = array('d', bytes(8 * size))
+        self.green = array('d', bytes(8 * size))
+        self.blue = array('d', bytes(8 * size))
+
+    def add_line(self, x1, y1, x2, y2, rgb):
+        """Распределяет длину экранного отрезка по ячейкам, через которые он проходит."""
+        cell = self.cell
+        length = hypot(x2 - x1, y2 - y1)
+        n = int(length / cell) + 1
+        part = length / n if length > 0 else 1.0
+        dx, dy = (x2 - x1) / n, (y2 - y1) / n
+        x, y = x1 + dx / 2, y1 + dy / 2
+        cols, rows = self.cols, self.rows
+        lengths, red, green, blue = self.lengths, self.red, self.green, self.blue
+        r, g, b = rgb[0] * part, rgb[1] * part, rgb[2] * part
+        for _ in range(n):
+            cx, cy = int(x // cell), int(y // cell)
+            if 0 <= cx < cols and 0 <= cy < rows:
+                k = cy * cols + cx
+                lengths[k] += part
+                red[k] += r
+                green[k] += g
+                blue[k] += b
+            x += dx
+            y += dy
+
+    def rows_of_runs(self):
+        """
+        Итерирует (строка, [(первый столбец, [цвета '#rrggbb', ...]), ...]) — непрерывные
+        участки непустых ячеек. Яркость ячейки растет логарифмически с плотностью.
+        """
+        lengths = self.lengths
+        peak = max(lengths) if lengths else 0.0
+        if peak <= 0:
+            return
+        norm = 1.0 / log1p(peak / self.cell)
+        cols = self.cols
+        for row in range(self.rows):
+            runs = []
+            run = None
+            base = row * cols
+            for col in range(cols):
+                k = base + col
+                total = lengths[k]
+                if total <= 0:
+                    run = None
+                    continue
+                # Минимальная яркость 35%, чтобы одиночные линии оставались видимыми
+                brightness = (0.35 + 0.65 * log1p(total / self.cell) * norm) / total
+                color = "#%02x%02x%02x" % (min(255, int(self.red[k] * brightness)),
+                                           min(255, int(self.green[k] * brightness)),
+                                           min(255, int(self.blue[k] * brightness)))
+                if run is None:
+                    run = (col, [])
+                    runs.append(run)
+                run[1].append(color)
+            if runs:
+                yield row, runs
@@ -17,6 +17,7 @@ class LineStyle:
         self.is_basic = is_basic
         self.color = color
         self.thickness_class = thickness_class or self.infer_class(thickness_mm)
+        self.revision = 0  # Увеличивается при каждом изменении параметров стиля
 
     def get_tk_dash_pattern(self, scale, override_pattern=None):
         """
@@ -26,9 +27,7 @@ class LineStyle:
         if not pattern:
             return ()
 
-        base = 20.0  # BASE_SCALE
-        raw_factor = scale / base if base > 0 else 1.0
-        factor = max(0.8, min(1.2, raw_factor))  # чуть смягчаем при зуме
+        factor = self.dash_factor(scale)
 
         pattern_pixels = []
         for length_mm in pattern:
@@ -37,6 +36,13 @@ class LineStyle:
             pattern_pixels.append(pixels)
         return tuple(pattern_pixels)
 
+    @staticmethod
+    def dash_factor(scale):
+        """Поправка длины штрихов к масштабу (смягчена до 0.8–1.2)."""
+        base = 20.0  # BASE_SCALE
+        raw_factor = scale / base if base > 0 else 1.0
+        return max(0.8, min(1.2, raw_factor))  # чуть смягчаем при зуме
+
     @staticmethod
     def infer_class(thickness_mm):
         return "s" if thickness_mm > 0.5 else "s_half"
\ No newline at end of file
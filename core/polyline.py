@@ -0,0 +1,61 @@
+# core/polyline.py
+
+from array import array
+from math import sqrt
+
+from .segment import distance_point_to_segment
+
+
+class Polyline:
+    """
+    Полилиния — цепочка отрезков одного стиля. Вершины хранятся в одном плоском
+    массиве [x0, y0, x1, y1, ...], поэтому общие точки соседних звеньев не дублируются.
+    """
+    def __init__(self, points, style_name, segment_id):
+        self.vertices = array('d')
+        for x, y in points:
+            self.vertices.append(x)
+            self.vertices.append(y)
+        if len(self.vertices) < 4:
+            raise ValueError("Полилиния должна содержать хотя бы две вершины.")
+        self.style_name = style_name
+        self.segment_id = segment_id
+
+    def vertex_count(self):
+        return len(self.vertices) // 2
+
+    def points(self):
+        """Итерирует вершины как пары (x, y)."""
+        v = self.vertices
+        for i in range(0, len(v), 2):
+            yield v[i], v[i + 1]
+
+    def edges(self):
+        """Итерирует звенья как кортежи (x1, y1, x2, y2)."""
+        v = self.vertices
+        for i in range(0, len(v) - 2, 2):
+            yield v[i], v[i + 1], v[i + 2], v[i + 3]
+
+    def length(self):
+        """Суммарная длина всех звеньев."""
+        return sum(sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2) for x1, y1, x2, y2 in self.edges())
+
+    def bounds(self):
+        """Возвращает габариты (min_x, min_y, max_x, max_y)."""
+        xs = self.vertices[0::2]
+        ys = self.vertices[1::2]
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def distance_to(self, px, py):
+        """Кратчайшее расстояние от точки до полилинии."""
+        return min(distance_point_to_segment(px, py, x1, y1, x2, y2) for x1, y1, x2, y2 in self.edges())
+
+    def describe(self, as_degrees=True):
+        """Возвращает форматированное описание полилинии."""
+        v = self.vertices
+        return (f"Полилиния #{self.segment_id}\n"
+                f"Вершин: {self.vertex_count()}\n"
+                f"Начало: ({v[0]:.2f}, {v[1]:.2f})\n"
+                f"Конец: ({v[-2]:.2f}, {v[-1]:.2f})\n"
+                f"Длина: {self.length():.2f}\n"
+                f"Стиль: {self.style_name}")
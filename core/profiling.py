@@ -0,0 +1,264 @@
+# core/profiling.py
+
+import csv
+from collections import deque
+from contextlib import contextmanager
+from time import perf_counter, time, strftime, localtime
+
+# Этапы кадра CADView.draw_all в порядке выполнения
+FRAME_PHASES = ("grid", "axes", "labels", "segments")
+# Верхние границы корзин гистограмм задержек (мс); последняя корзина — все, что дольше
+LATENCY_BUCKETS_MS = (2, 4, 8, 16, 33, 50, 100, 250)
+# Событие считается медленным, если его обработка с ожиданием в очереди дольше этого (мс)
+SLOW_EVENT_MS = 50.0
+
+
+class LatencyHistogram:
+    """Гистограмма задержек (мс) по корзинам LATENCY_BUCKETS_MS с подсчетом среднего и максимума."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        index = 0
+        for bound in LATENCY_BUCKETS_MS:
+            if ms <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def mean(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+    def percentile(self, fraction):
+        """Верхняя граница корзины, в которую попадает заданная доля событий (None — дольше последней)."""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return None
+
+    def bucket_labels(self):
+        labels = [f"≤{bound}" for bound in LATENCY_BUCKETS_MS]
+        labels.append(f">{LATENCY_BUCKETS_MS[-1]}")
+        return labels
+
+
+class FrameRecord:
+    """Замер одного кадра: время этапов (мс), число элементов холста, отрисованные и отсеченные объекты."""
+    __slots__ = ("timestamp", "source", "frame_ms", "phases", "item_count", "drawn", "culled", "handler_ms")
+
+    def __init__(self, timestamp, source):
+        self.timestamp = timestamp
+        self.source = source  # Обработчик ввода, вызвавший перерисовку (или None)
+        self.frame_ms = 0.0
+        self.phases = {}
+        self.item_count = 0
+        self.drawn = 0
+        self.culled = 0
+        self.handler_ms = None  # Полное время обработчика, внутри которого был кадр
+
+
+class FrameProfiler:
+    """
+    Кольцевой буфер замеров кадров и обработчиков ввода. Хранит последние capacity кадров;
+    старые записи вытесняются автоматически.
+    """
+
+    def __init__(self, capacity=600):
+        self.enabled = True
+        self.frames = deque(maxlen=capacity)
+        self.handlers = deque(maxlen=capacity)  # (время, имя обработчика, мс)
+        self.latency = {}  # имя обработчика -> LatencyHistogram времени обработки
+        self.queue_delay = {}  # имя обработчика -> LatencyHistogram ожидания в очереди
+        self.slow_events = deque(maxlen=100)  # (время, имя, обработка мс, очередь мс, кадр мс)
+        self._clock_offset = None  # Минимальная разница часов программы и времени событий Tk
+        self._current = None
+        self._frame_start = 0.0
+        self._handler = None
+        self._handler_frames = []
+
+    # --- Кадры ---
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self._current = FrameRecord(time(), self._handler)
+        self._frame_start = perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        """Замер этапа кадра: with profiler.phase("grid"): ..."""
+        if self._current is None:
+            yield
+            return
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self._current.phases[name] = (perf_counter() - start) * 1000.0
+
+    def end_frame(self, item_count=0, drawn=0, culled=0):
+        """Завершает кадр и возвращает его запись (или None, если профилирование выключено)."""
+        record = self._current
+        if record is None:
+            return None
+        self._current = None
+        record.frame_ms = (perf_counter() - self._frame_start) * 1000.0
+        record.item_count = item_count
+        record.drawn = drawn
+        record.culled = culled
+        self.frames.append(record)
+        if self._handler is not None:
+            self._handler_frames.append(record)
+        return record
+
+    # --- Обработчики ввода ---
+
+    def wrap(self, name, handler):
+        """
+        Оборачивает обработчик события Tk замером его длительности и ожидания события в очереди.
+        Длительности копятся в гистограммах по имени обработчика, медленные события — в slow_events.
+        """
+        def timed(*args, **kwargs):
+            if not self.enabled or self._handler is not None:
+                return handler(*args, **kwargs)
+            queued = self._queue_delay(args[0] if args else None)
+            self._handler = name
+            start = perf_counter()
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                elapsed = (perf_counter() - start) * 1000.0
+                self._handler = None
+                now = time()
+                self.handlers.append((now, name, elapsed))
+                frame_ms = 0.0
+                for record in self._handler_frames:
+                    record.handler_ms = elapsed
+                    frame_ms += record.frame_ms
+                self._handler_frames = []
+                self._record_latency(now, name, elapsed, queued, frame_ms)
+        return timed
+
+    def _queue_delay(self, event):
+        """
+        Ожидание события в очереди (мс) по его метке времени Tk. Часы Tk и программы не связаны,
+        поэтому задержка отсчитывается от наименьшей замеченной разницы между ними.
+        """
+        stamp = getattr(event, "time", None)
+        if not isinstance(stamp, int) or stamp <= 0:
+            return None
+        offset = time() * 1000.0 - stamp
+        if self._clock_offset is None or offset < self._clock_offset:
+            self._clock_offset = offset
+        return offset - self._clock_offset
+
+    def _record_latency(self, now, name, elapsed, queued, frame_ms):
+        histogram = self.latency.get(name)
+        if histogram is None:
+            histogram = self.latency[name] = LatencyHistogram()
+        histogram.add(elapsed)
+        if queued is not None:
+            delays = self.queue_delay.get(name)
+            if delays is None:
+                delays = self.queue_delay[name] = LatencyHistogram()
+            delays.add(queued)
+        if elapsed + (queued or 0.0) >= SLOW_EVENT_MS:
+            self.slow_events.append((now, name, elapsed, queued, frame_ms))
+
+    def latency_report(self):
+        """Текстовый отчет: гистограммы по обработчикам и последние медленные события."""
+        if not self.latency:
+            return "Нет данных об обработчиках ввода."
+        labels = LatencyHistogram().bucket_labels()
+        lines = ["Время обработки событий, мс (корзины: " + " ".join(labels) + ")", ""]
+        for name in sorted(self.latency, key=lambda n: -self.latency[n].max_ms):
+            lines.extend(self._histogram_lines(name, self.latency[name]))
+            delays = self.queue_delay.get(name)
+            if delays is not None:
+                lines.extend(self._histogram_lines("  очередь", delays))
+            lines.append("")
+        lines.append(f"Медленные события (≥ {SLOW_EVENT_MS:.0f} мс):")
+        if not self.slow_events:
+            lines.append("  нет")
+        for stamp, name, elapsed, queued, frame_ms in reversed(self.slow_events):
+            wait = f", очередь {queued:.1f} мс" if queued is not None else ""
+            frame = f", из них кадр {frame_ms:.1f} мс" if frame_ms else ""
+            lines.append(f"  {strftime('%H:%M:%S', localtime(stamp))}  {name}: {elapsed:.1f} мс{frame}{wait}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _histogram_lines(name, histogram):
+        p95 = histogram.percentile(0.95)
+        p95_text = f"≤{p95}" if p95 is not None else f">{LATENCY_BUCKETS_MS[-1]}"
+        lines = [f"{name}: {histogram.count} соб., среднее {histogram.mean():.1f}, "
+                 f"p95 {p95_text}, максимум {histogram.max_ms:.1f}"]
+        peak = max(histogram.counts) or 1
+        bars = []
+        for label, count in zip(histogram.bucket_labels(), histogram.counts):
+            if count:
+                bars.append(f"    {label:>5} │{'█' * max(1, round(20 * count / peak))} {count}")
+        lines.extend(bars)
+        return lines
+
+    # --- Сводка и экспорт ---
+
+    def last(self):
+        return self.frames[-1] if self.frames else None
+
+    def average_frame_ms(self, count=30):
+        """Среднее время последних count кадров (мс)."""
+        if not self.frames:
+            return 0.0
+        recent = list(self.frames)[-count:]
+        return sum(r.frame_ms for r in recent) / len(recent)
+
+    def fps(self, count=30):
+        """Достижимая частота кадров по среднему времени последних кадров."""
+        average = self.average_frame_ms(count)
+        return 1000.0 / average if average > 0 else 0.0
+
+    def summary_lines(self):
+        """Строки для оверлея на холсте."""
+        record = self.last()
+        if record is None:
+            return ["Нет данных о кадрах"]
+        lines = [f"Кадр: {record.frame_ms:.1f} мс (среднее {self.average_frame_ms():.1f} мс, {self.fps():.0f} FPS)"]
+        lines.append("  ".join(f"{name}: {record.phases.get(name, 0.0):.1f}" for name in FRAME_PHASES))
+        lines.append(f"Элементов холста: {record.item_count}   "
+                     f"Объектов: {record.drawn} нарисовано / {record.culled} отсечено")
+        if record.source:
+            handler = f"{record.handler_ms:.1f} мс" if record.handler_ms is not None else "…"
+            lines.append(f"Обработчик: {record.source} ({handler})")
+        return lines
+
+    def export_csv(self, path):
+        """Сохраняет буфер кадров в CSV для анализа вне программы."""
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["timestamp", "source", "frame_ms"] + [f"{name}_ms" for name in FRAME_PHASES]
+                            + ["item_count", "drawn", "culled", "handler_ms"])
+            for r in self.frames:
+                writer.writerow([f"{r.timestamp:.6f}", r.source or "", f"{r.frame_ms:.3f}"]
+                                + [f"{r.phases.get(name, 0.0):.3f}" for name in FRAME_PHASES]
+                                + [r.item_count, r.drawn, r.culled,
+                                   "" if r.handler_ms is None else f"{r.handler_ms:.3f}"])
+
+    def clear(self):
+        self.frames.clear()
+        self.handlers.clear()
+        self.latency.clear()
+        self.queue_delay.clear()
+        self.slow_events.clear()
@@ -0,0 +1,264 @@
+# core/raster_tiles.py
+
+import threading
+from collections import OrderedDict, deque
+from itertools import islice
+from math import floor
+
+from .dash_tessellation import tessellate_world
+from .density import iter_object_lines
+
+# Размер тайла в пикселях (тайлы квадратные, фиксированного размера в мире для каждого масштаба)
+TILE_PX = 256
+# Память на пиксель изображения Tk (RGBA)
+BYTES_PER_PIXEL = 4
+
+
+def tile_world_size(scale):
+    """Сторона тайла в мировых единицах при масштабе scale (px на единицу)."""
+    return TILE_PX / scale
+
+
+def tile_rect(key):
+    """Мировой прямоугольник (x_lo, y_lo, x_hi, y_hi) тайла по ключу (масштаб, tx, ty)."""
+    scale, tx, ty = key
+    size = tile_world_size(scale)
+    return tx * size, ty * size, (tx + 1) * size, (ty + 1) * size
+
+
+def tiles_for_bounds(bounds, scale, margin=0):
+    """Ключи тайлов, покрывающих мировую область bounds, с запасом margin тайлов по краям."""
+    size = tile_world_size(scale)
+    x_lo, y_lo, x_hi, y_hi = bounds
+    tx0, tx1 = int(floor(x_lo / size)) - margin, int(floor(x_hi / size)) + margin
+    ty0, ty1 = int(floor(y_lo / size)) - margin, int(floor(y_hi / size)) + margin
+    return [(scale, tx, ty) for ty in range(ty0, ty1 + 1) for tx in range(tx0, tx1 + 1)]
+
+
+def tiles_area(keys):
+    """Мировой прямоугольник, охватывающий все тайлы keys."""
+    rects = [tile_rect(key) for key in keys]
+    return (min(r[0] for r in rects), min(r[1] for r in rects),
+            max(r[2] for r in rects), max(r[3] for r in rects))
+
+
+def snapshot_entity_lines(entities, area):
+    """
+    Прямые участки составных объектов (x1, y1, x2, y2, стиль), пересекающих area. Вызывается
+    в потоке Tk: вставки, массивы и дуги строят кэши лениво, и поток растеризации не должен
+    обращаться к ним, пока сцена меняется.
+    """
+    lines = []
+    for obj in entities:
+        b = obj.bounds()
+        if b[2] < area[0] or b[0] > area[2] or b[3] < area[1] or b[1] > area[3]:
+            continue
+        lines.extend(iter_object_lines(obj, area))
+    return lines
+
+
+def rasterize_tile(lines, key):
+    """
+    Растеризует линии [(x1, y1, x2, y2, индекс цвета, толщина px), ...] в мировых координатах
+    в тайл key. Возвращает bytearray TILE_PX * TILE_PX индексов палитры (0 — прозрачный пиксель).
+    """
+    scale = key[0]
+    x0, y0, x1_rect, y1_rect = tile_rect(key)
+    size = TILE_PX
+    pixels = bytearray(size * size)
+    for x1, y1, x2, y2, color, width in lines:
+        # Экранные координаты внутри тайла: ось Y направлена вниз
+        ax, ay = (x1 - x0) * scale, (y1_rect - y1) * scale
+        bx, by = (x2 - x0) * scale, (y1_rect - y2) * scale
+        dx, dy = bx - ax, by - ay
+        steps = int(max(abs(dx), abs(dy))) + 1
+        sx, sy = dx / steps, dy / steps
+        half = int(width / 2)
+        # Толщина набирается параллельными проходами вдоль младшей оси
+        horizontal = abs(dx) >= abs(dy)
+        for offset in range(-half, half + 1):
+            x = ax + (0 if horizontal else offset)
+            y = ay + (offset if horizontal else 0)
+            for _ in range(steps + 1):
+                px, py = int(x), int(y)
+                if 0 <= px < size and 0 <= py < size:
+                    pixels[py * size + px] = color
+                x += sx
+                y += sy
+    return pixels
+
+
+def pixel_runs(pixels, palette, size=TILE_PX):
+    """Итерирует (строка, [(первый столбец, [цвета]), ...]) — непрерывные участки непрозрачных пикселей."""
+    for row in range(size):
+        base = row * size
+        line = pixels[base:base + size]
+        if not any(line):
+            continue
+        runs = []
+        run = None
+        for col, index in enumerate(line):
+            if not index:
+                run = None
+                continue
+            if run is None:
+                run = (col, [])
+                runs.append(run)
+            run[1].append(palette[index])
+        yield row, runs
+
+
+class TileCache:
+    """LRU-кэш готовых изображений тайлов с ограничением по памяти."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._tiles = OrderedDict()  # ключ -> изображение
+        self._tile_bytes = TILE_PX * TILE_PX * BYTES_PER_PIXEL
+
+    def get(self, key):
+        image = self._tiles.get(key)
+        if image is not None:
+            self._tiles.move_to_end(key)
+        return image
+
+    def put(self, key, image):
+        self._tiles[key] = image
+        self._tiles.move_to_end(key)
+        while len(self._tiles) * self._tile_bytes > self.max_bytes:
+            self._tiles.popitem(last=False)
+
+    def invalidate(self, bounds=None):
+        """Удаляет тайлы всех масштабов, пересекающие мировую область bounds (None — все)."""
+        if bounds is None:
+            self._tiles.clear()
+            return
+        x_lo, y_lo, x_hi, y_hi = bounds
+        for key in list(self._tiles):
+            t = tile_rect(key)
+            # Запас на толщину линий, выступающую за габарит объекта
+            pad = 4.0 / key[0]
+            if t[2] + pad >= x_lo and t[0] - pad <= x_hi and t[3] + pad >= y_lo and t[1] - pad <= y_hi:
+                del self._tiles[key]
+
+    def memory_bytes(self):
+        return len(self._tiles) * self._tile_bytes
+
+    def __len__(self):
+        return len(self._tiles)
+
+    def clear(self):
+        self._tiles.clear()
+
+
+class TileRasterizer:
+    """
+    Фоновый поток растеризации тайлов. Новая заявка вытесняет незавершенную; готовые
+    тайлы (ключ, версия сцены, пиксели) забираются потоком Tk через take_results,
+    где из них и создаются изображения (Tk нельзя вызывать из других потоков).
+    Ошибка при растеризации не останавливает поток: заявка снимается, а исключение
+    сохраняется в error до вызова take_error.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._job = None
+        self._generation = 0
+        self._results = deque()
+        self._thread = None
+        self.busy = False
+        self.error = None
+
+    def request(self, keys, segments, entity_lines, styles, version):
+        """
+        keys — ключи тайлов в порядке приоритета; segments — список отрезков сцены (читаются
+        только первые len(segments) на момент заявки); entity_lines — снимок линий составных
+        объектов (snapshot_entity_lines); styles — {имя стиля: (индекс цвета, толщина px,
+        шаблон штрихов в мире)}.
+        """
+        with self._lock:
+            self._generation += 1
+            self._job = (self._generation, list(keys), segments, len(segments), entity_lines, styles, version)
+            self.busy = True
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="tile-rasterizer", daemon=True)
+            self._thread.start()
+        self._wakeup.set()
+
+    def cancel(self):
+        with self._lock:
+            self._generation += 1
+            self._job = None
+
+    def take_results(self):
+        results = []
+        while self._results:
+            results.append(self._results.popleft())
+        return results
+
+    def take_error(self):
+        """Возвращает и сбрасывает исключение последней неудачной заявки (или None)."""
+        with self._lock:
+            error, self.error = self.error, None
+        return error
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                job = self._job
+                self._job = None
+                self._wakeup.clear()
+            if job is None:
+                with self._lock:
+                    self.busy = self._job is not None
+                continue
+            try:
+                self._render(*job)
+            except Exception as exc:
+                with self._lock:
+                    self.error = exc
+            finally:
+                with self._lock:
+                    self.busy = self._job is not None
+
+    def _render(self, generation, keys, segments, count, entity_lines, styles, version):
+        if not keys:
+            return
+        # Линии собираются один раз для объединения всех тайлов заявки
+        scale = keys[0][0]
+        rects = [tile_rect(key) for key in keys]
+        area = tiles_area(keys)
+        x_lo, y_lo, x_hi, y_hi = area
+        lines = []
+
+        def add(x1, y1, x2, y2, style_name):
+            style = styles.get(style_name)
+            if style is None:
+                return
+            color, width, pattern = style
+            if pattern:
+                pieces = tessellate_world((x1, y1, x2, y2), pattern, scale)
+                for j in range(0, len(pieces), 4):
+                    lines.append((pieces[j], pieces[j + 1], pieces[j + 2], pieces[j + 3], color, width))
+            else:
+                lines.append((x1, y1, x2, y2, color, width))
+
+        # У отрезков нет ленивых кэшей — их поля читаются напрямую
+        for s in islice(segments, count):
+            x1, y1, x2, y2 = s.x1, s.y1, s.x2, s.y2
+            if max(x1, x2) < x_lo or min(x1, x2) > x_hi or max(y1, y2) < y_lo or min(y1, y2) > y_hi:
+                continue
+            add(x1, y1, x2, y2, s.style_name)
+        for line in entity_lines:
+            add(*line)
+
+        for key, rect in zip(keys, rects):
+            if self._generation != generation:
+                return  # Заявка устарела — вид успел измениться
+            pad = 4.0 / scale
+            tile_lines = [l for l in lines
+                          if max(l[0], l[2]) >= rect[0] - pad and min(l[0], l[2]) <= rect[2] + pad
+                          and max(l[1], l[3]) >= rect[1] - pad and min(l[1], l[3]) <= rect[3] + pad]
+            self._results.append((key, version, rasterize_tile(tile_lines, key)))
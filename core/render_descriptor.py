@@ -0,0 +1,77 @@
+# core/render_descriptor.py
+
+from enum import Enum
+
+from .view_transforms import grid_step_for_scale
+
+MM_TO_PIXEL = 3.7795  # 1 мм ≈ 3.78 px при 96 dpi [web:89]
+
+
+class RenderKind(Enum):
+    """Способ отрисовки стиля линии."""
+    SOLID = "solid"
+    DASHED = "dashed"
+    WAVY = "wavy"
+    ZIGZAG = "zigzag"
+
+
+class RenderDescriptor:
+    """
+    Скомпилированное неизменяемое описание отрисовки LineStyle: вид линии, цвет,
+    толщина в пикселях и шаблоны штрихов Tk по шагу сетки.
+    Создается StyleManager и сбрасывается только при update_style. tag — постоянный тег холста
+    стиля: им помечены все элементы объектов этого стиля.
+    """
+    __slots__ = ("name", "tag", "kind", "color", "width_px", "world_pattern", "_style", "_grid_pattern", "_dashes")
+
+    def __init__(self, style, tag=None):
+        self.name = style.name
+        self.tag = tag
+        self.color = style.color
+        # --- Толщина: строго по ГОСТ (1 мм и 0.5 мм) ---
+        # В StyleManager: "Сплошная основная" = 1.0, остальные = 0.5 мм [web:118][web:121]
+        self.width_px = max(1.0, style.thickness_mm * MM_TO_PIXEL)
+        # Шаблон в мировых единицах (мм) — для штриховки в мировых координатах
+        self.world_pattern = tuple(style.dash_pattern)
+        self._style = style
+        self._dashes = {}
+
+        name_lower = style.name.lower()
+        # --- Паттерн штриховки, завязанный на шаг сетки (в шагах сетки) ---
+        self._grid_pattern = None
+        if "штриховая" in name_lower:
+            # ГОСТ: штрих 2–8 мм, пробел 1–2 мм.
+            # Берём среднее: штрих 4 мм, пробел 1.5 мм, в шагах сетки. [web:118]
+            self._grid_pattern = (4.0, 1.5)
+        elif "штрихпунктирная" in name_lower:
+            # ГОСТ: штрих 5–30 мм, пробел 3–5 мм, точка 1–2 мм.
+            # Типичный набор: 15 мм штрих, 4 мм пробел, 2 мм точка, 4 мм пробел. [web:118]
+            self._grid_pattern = (15.0, 4.0, 2.0, 4.0)
+
+        if "волнистая" in name_lower:
+            self.kind = RenderKind.WAVY
+        elif "изломами" in name_lower:
+            self.kind = RenderKind.ZIGZAG
+        elif self._grid_pattern or self.world_pattern:
+            self.kind = RenderKind.DASHED
+        else:
+            self.kind = RenderKind.SOLID
+
+    def dash(self, scale):
+        """
+        Шаблон штрихов Tk (в пикселях) для масштаба scale. Кэшируется по шагу сетки и поправке
+        масштаба, поэтому штрихи меняются вместе с сеткой, а не на границах корзин масштаба.
+        """
+        if self.kind is not RenderKind.DASHED:
+            return ()
+        step = grid_step_for_scale(scale)  # 1 шаг = 1 мм в world [web:121]
+        key = (step, round(self._style.dash_factor(scale), 2))
+        dash = self._dashes.get(key)
+        if dash is None:
+            override = None
+            if self._grid_pattern:
+                override = tuple(v * step for v in self._grid_pattern)
+            # Иначе берётся dash_pattern стиля (в шагах = мм), зафиксированный при компиляции
+            dash = self._style.get_tk_dash_pattern(scale, override_pattern=override or self.world_pattern)
+            self._dashes[key] = dash
+        return dash
@@ -0,0 +1,137 @@
+# core/render_pipeline.py
+
+import threading
+from array import array
+from itertools import islice
+
+
+class SegmentBatch:
+    """
+    Подготовленная порция отрезков одного стиля: плоский массив координат холста
+    [x1, y1, x2, y2, ...] и отрезки в том же порядке (ближние к фокусу — первыми).
+    """
+    __slots__ = ("style_name", "coords", "segments")
+
+    def __init__(self, style_name, coords, segments):
+        self.style_name = style_name
+        self.coords = coords
+        self.segments = segments
+
+
+def prepare_segment_batches(segments, state, focus=None, count=None):
+    """
+    Отсекает невидимые отрезки, переводит координаты в систему холста для снимка вида
+    state (ViewState) и группирует их по стилю. Чистая математика без обращений к Tk —
+    выполняется в рабочем потоке. count ограничивает обработку первыми count отрезками
+    (живой список сцены может пополняться во время расчета). Возвращает список SegmentBatch.
+    """
+    x_lo, y_lo, x_hi, y_hi = state.get_visible_bounds()
+    if focus is None or not (x_lo <= focus[0] <= x_hi and y_lo <= focus[1] <= y_hi):
+        focus = ((x_lo + x_hi) / 2, (y_lo + y_hi) / 2)
+    fx, fy = focus
+
+    groups = {}
+    for s in (segments if count is None else islice(segments, count)):
+        x1, y1, x2, y2 = s.x1, s.y1, s.x2, s.y2
+        if max(x1, x2) < x_lo or min(x1, x2) > x_hi or max(y1, y2) < y_lo or min(y1, y2) > y_hi:
+            continue
+        cx, cy = (x1 + x2) / 2 - fx, (y1 + y2) / 2 - fy
+        group = groups.get(s.style_name)
+        if group is None:
+            groups[s.style_name] = group = []
+        group.append((cx * cx + cy * cy, s.segment_id, s))
+
+    to_canvas = state.world_to_canvas
+    batches = []
+    for style_name, group in groups.items():
+        group.sort(key=lambda item: (item[0], item[1]))
+        coords = array('d')
+        ordered = []
+        for _, _, s in group:
+            coords.extend(to_canvas(s.x1, s.y1))
+            coords.extend(to_canvas(s.x2, s.y2))
+            ordered.append(s)
+        batches.append(SegmentBatch(style_name, coords, ordered))
+    return batches
+
+
+class RenderPipeline:
+    """
+    Фоновый поток подготовки координат для отрисовки. Каждая заявка получает номер поколения;
+    поток берет только последнюю заявку, а результаты устаревших поколений отбрасываются.
+    on_ready() вызывается из рабочего потока, когда результат готов, — вместо опроса по таймеру.
+    """
+
+    def __init__(self, threaded=True, on_ready=None):
+        self.threaded = threaded
+        self.on_ready = on_ready
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._job = None  # (поколение, ViewState, отрезки, число отрезков, фокус)
+        self._result = None  # (поколение, ViewState, [SegmentBatch])
+        self._thread = None
+
+    def submit(self, state, segments, focus=None):
+        """
+        Ставит заявку на подготовку кадра; возвращает ее поколение. segments может быть живым
+        списком сцены: обрабатываются только отрезки, которые были в нем на момент заявки.
+        """
+        count = len(segments)
+        with self._lock:
+            self.generation += 1
+            generation = self.generation
+            self._result = None
+            if not self.threaded:
+                self._job = None
+            else:
+                self._job = (generation, state, segments, count, focus)
+        if not self.threaded:
+            batches = prepare_segment_batches(segments, state, focus, count)
+            with self._lock:
+                self._result = (generation, state, batches)
+            return generation
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="render-pipeline", daemon=True)
+            self._thread.start()
+        self._wakeup.set()
+        return generation
+
+    def cancel(self):
+        """Делает устаревшими заявку в работе и неполученный результат."""
+        with self._lock:
+            self.generation += 1
+            self._job = None
+            self._result = None
+
+    def poll(self):
+        """
+        Возвращает (ViewState, [SegmentBatch]) для текущего поколения или None, если результата
+        еще нет. Вызывается из потока Tk.
+        """
+        with self._lock:
+            result = self._result
+            if result is None or result[0] != self.generation:
+                return None
+            self._result = None
+            return result[1], result[2]
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                job = self._job
+                self._job = None
+                self._wakeup.clear()
+            if job is None:
+                continue
+            generation, state, segments, count, focus = job
+            batches = prepare_segment_batches(segments, state, focus, count)
+            with self._lock:
+                # Пока поток считал, вид мог измениться — такой результат не нужен
+                ready = generation == self.generation
+                if ready:
+                    self._result = (generation, state, batches)
+            if ready and self.on_ready:
+                self.on_ready()
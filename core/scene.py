@@ -1,32 +1,467 @@
+from math import sqrt
+
 from .segment import Segment
+from .polyline import Polyline
+from .arc import Arc, Circle
+from .block import BlockDefinition, BlockReference, BlockArray, iter_segment_tuples
+from .slot_list import SlotList
+
+# Доля пустых слотов, после которой хранилище стоит уплотнить
+COMPACT_RATIO = 0.25
 
 class Scene:
     """Класс для управления коллекцией геометрических объектов (отрезков)."""
     def __init__(self, style_manager):
-        self.segments = []
+        self._segments = SlotList()
+        self._entities = SlotList()  # Составные объекты (полилинии и т.п.) с общим интерфейсом
+        self.blocks = {}  # имя блока -> BlockDefinition
         self.style_manager = style_manager # Ссылка на менеджер стилей
         self._segment_counter = 1
+        self._listeners = []  # callback(bounds) при изменении объектов; bounds=None — изменилось все
+        self._by_style = {}  # имя стиля -> {id объекта: объект} (вставки блоков не входят)
+        self._reset_aggregates()
+
+    @property
+    def segments(self):
+        """Отрезки сцены в порядке хранения (список строится заново только после удалений)."""
+        return self._segments.live()
+
+    @property
+    def entities(self):
+        return self._entities.live()
+
+    def add_change_listener(self, callback):
+        """Подписывает callback(bounds) на изменения геометрии или стилей объектов сцены."""
+        self._listeners.append(callback)
+
+    def _notify_change(self, bounds=None):
+        for callback in self._listeners:
+            callback(bounds)
 
     def add_segment(self, x1, y1, x2, y2, style_name):
         style = self.style_manager.get_style(style_name)
         if style:
             # Храним только имя стиля; цвет и остальные параметры берутся при отрисовке
-            self.segments.append(Segment(x1, y1, x2, y2, style_name, self._segment_counter))
+            segment = Segment(x1, y1, x2, y2, style_name, self._segment_counter)
+            self._segments.add(segment)
             self._segment_counter += 1
+            self._index_style(segment)
+            self._accumulate(segment)
+            self._notify_change(segment.bounds())
+            return segment
+        return None
+
+    def add_segments(self, coords, style_name):
+        """
+        Добавляет отрезки пачкой: coords — итерируемое строк (x1, y1, x2, y2) или плоский
+        array('d') [x1, y1, x2, y2, ...]. Стиль проверяется один раз, id выделяются подряд,
+        индекс стилей, статистика и габариты обновляются за один проход. Возвращает список отрезков.
+        """
+        if not self.style_manager.get_style(style_name):
+            return []
+        if hasattr(coords, "typecode"):
+            flat = coords
+            if len(flat) % 4:
+                raise ValueError("Длина массива координат должна быть кратна 4.")
+            coords = (flat[i:i + 4] for i in range(0, len(flat), 4))
+
+        segment_id = self._segment_counter
+        segments = []
+        total = 0.0
+        min_x = min_y = float("inf")
+        max_x = max_y = float("-inf")
+        for x1, y1, x2, y2 in coords:
+            segments.append(Segment(x1, y1, x2, y2, style_name, segment_id))
+            segment_id += 1
+            total += sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
+            if x1 < min_x: min_x = x1
+            if x2 < min_x: min_x = x2
+            if x1 > max_x: max_x = x1
+            if x2 > max_x: max_x = x2
+            if y1 < min_y: min_y = y1
+            if y2 < min_y: min_y = y2
+            if y1 > max_y: max_y = y1
+            if y2 > max_y: max_y = y2
+        if not segments:
+            return segments
+        self._segment_counter = segment_id
+
+        self._segments.extend(segments)
+        group = self._by_style.get(style_name)
+        if group is None:
+            self._by_style[style_name] = group = {}
+        group.update((s.segment_id, s) for s in segments)
+        if not self._stats_dirty:
+            self._stat_add(style_name, total, len(segments))
+        bounds = (min_x, min_y, max_x, max_y)
+        if not self._extents_dirty:
+            if self._extents is None:
+                self._extents = bounds
+            else:
+                e = self._extents
+                self._extents = (min(e[0], min_x), min(e[1], min_y), max(e[2], max_x), max(e[3], max_y))
+        self._notify_change(bounds)
+        return segments
+
+    def add_polyline(self, points, style_name):
+        """Добавляет полилинию по списку вершин [(x, y), ...]."""
+        style = self.style_manager.get_style(style_name)
+        if not style:
+            return None
+        return self._add_entity(Polyline(points, style_name, self._segment_counter))
+
+    def add_circle(self, cx, cy, radius, style_name):
+        """Добавляет окружность."""
+        if not self.style_manager.get_style(style_name):
+            return None
+        return self._add_entity(Circle(cx, cy, radius, style_name, self._segment_counter))
+
+    def add_arc(self, cx, cy, radius, start_angle, sweep, style_name):
+        """Добавляет дугу; углы в радианах, положительный раствор — против часовой стрелки."""
+        if not self.style_manager.get_style(style_name):
+            return None
+        return self._add_entity(Arc(cx, cy, radius, start_angle, sweep, style_name, self._segment_counter))
+
+    # --- Блоки ---
+
+    def define_block(self, name, objects, base_point=(0.0, 0.0)):
+        """Создает определение блока из отрезков/полилиний; координаты берутся относительно base_point."""
+        if not name:
+            raise ValueError("Имя блока не может быть пустым.")
+        if name in self.blocks:
+            raise ValueError(f"Блок с именем '{name}' уже существует.")
+        block = BlockDefinition(name, iter_segment_tuples(objects), base_point)
+        if not block.segment_count():
+            raise ValueError("Блок должен содержать хотя бы один отрезок.")
+        self.blocks[name] = block
+        return block
+
+    def redefine_block(self, name, objects, base_point=(0.0, 0.0)):
+        """Заменяет содержимое блока; все его вставки обновляются разом."""
+        block = self.blocks.get(name)
+        if not block:
+            raise KeyError(f"Блок '{name}' не найден.")
+        block.set_segments(iter_segment_tuples(objects), base_point)
+        # Вставки пересчитают координаты по версии блока, агрегаты — лениво
+        self._extents_dirty = True
+        self._stats_dirty = True
+        self._notify_change()
+        return block
+
+    def insert_block(self, name, x, y, rotation=0.0, scale=1.0):
+        """Добавляет вставку блока (ссылку с преобразованием, без копирования отрезков)."""
+        block = self.blocks.get(name)
+        if not block:
+            raise KeyError(f"Блок '{name}' не найден.")
+        return self._add_entity(BlockReference(block, x, y, rotation, scale, self._segment_counter))
+
+    def add_rectangular_array(self, name, x, y, rows, cols, row_spacing, col_spacing, rotation=0.0, scale=1.0):
+        """Добавляет прямоугольный массив вставок блока (экземпляры не материализуются)."""
+        block = self.blocks.get(name)
+        if not block:
+            raise KeyError(f"Блок '{name}' не найден.")
+        array_ref = BlockArray.rectangular(block, x, y, rows, cols, row_spacing, col_spacing,
+                                           rotation, scale, self._segment_counter)
+        return self._add_entity(array_ref)
+
+    def add_polar_array(self, name, x, y, count, total_angle, center, rotation=0.0, scale=1.0):
+        """Добавляет круговой массив вставок блока; total_angle в радианах."""
+        block = self.blocks.get(name)
+        if not block:
+            raise KeyError(f"Блок '{name}' не найден.")
+        array_ref = BlockArray.polar(block, x, y, count, total_angle, center, rotation, scale,
+                                     self._segment_counter)
+        return self._add_entity(array_ref)
+
+    def _add_entity(self, entity):
+        self._entities.add(entity)
+        self._segment_counter += 1
+        self._index_style(entity)
+        self._accumulate(entity)
+        self._notify_change(entity.bounds())
+        return entity
+
+    def remove_segment(self, segment):
+        """Удаляет отрезок со сцены за O(1). Габариты пересчитываются лениво."""
+        self._segments.remove(segment)
+        self._unindex_style(segment)
+        self._discount(segment)
+        self._notify_change(segment.bounds())
+
+    def remove_entity(self, entity):
+        """Удаляет составной объект со сцены."""
+        self._entities.remove(entity)
+        self._unindex_style(entity)
+        self._discount(entity)
+        self._notify_change(entity.bounds())
+
+    def remove_object(self, obj):
+        """Удаляет отрезок или составной объект."""
+        if isinstance(obj, Segment):
+            self.remove_segment(obj)
+        else:
+            self.remove_entity(obj)
+
+    def remove_objects(self, objects):
+        """
+        Удаляет набор объектов за время, пропорциональное его размеру; подписчики получают
+        одно уведомление с общей областью изменений. Набор проверяется целиком до удаления:
+        если хотя бы одного объекта нет на сцене, ValueError, и сцена не меняется.
+        """
+        batch = {}
+        for obj in objects:
+            store = self._segments if isinstance(obj, Segment) else self._entities
+            if obj not in store:
+                raise ValueError(f"Объект #{obj.segment_id} отсутствует на сцене.")
+            batch[obj.segment_id] = (obj, store)
+
+        changed = None
+        for obj, store in batch.values():
+            store.remove(obj)
+            self._unindex_style(obj)
+            self._discount(obj)
+            b = obj.bounds()
+            changed = b if changed is None else (min(changed[0], b[0]), min(changed[1], b[1]),
+                                                 max(changed[2], b[2]), max(changed[3], b[3]))
+        if changed is not None:
+            self._notify_change(changed)
+
+    def get_object(self, segment_id):
+        """Объект сцены по id или None."""
+        obj = self._segments.get(segment_id)
+        return obj if obj is not None else self._entities.get(segment_id)
+
+    def needs_compaction(self):
+        """Накопилось ли достаточно пустых слотов, чтобы уплотнить хранилище."""
+        for store in (self._segments, self._entities):
+            if store.tombstones() > max(64, COMPACT_RATIO * len(store)):
+                return True
+        return False
+
+    def compact(self):
+        """Уплотняет хранилища объектов (порядок объектов не меняется)."""
+        self._segments.compact()
+        self._entities.compact()
+
+    def all_objects(self):
+        """Итерирует все объекты сцены: отрезки, затем составные объекты."""
+        yield from self.segments
+        yield from self.entities
+
+    def object_count(self):
+        return len(self._segments) + len(self._entities)
+
+    def set_segments_style(self, segments, style_name):
+        """Назначает стиль набору отрезков, поддерживая статистику по стилям."""
+        changed = None
+        for segment in segments:
+            if segment.style_name is None or segment.style_name == style_name:
+                continue
+            length = segment.length()
+            self._stat_sub(segment.style_name, length)
+            self._unindex_style(segment)
+            segment.style_name = style_name
+            self._index_style(segment)
+            self._stat_add(style_name, length)
+            b = segment.bounds()
+            changed = b if changed is None else (min(changed[0], b[0]), min(changed[1], b[1]),
+                                                 max(changed[2], b[2]), max(changed[3], b[3]))
+        if changed is not None:
+            self._notify_change(changed)
 
     def clear(self):
         """Очищает сцену от всех объектов."""
-        self.segments = []
+        self._segments.clear()
+        self._entities.clear()
+        self.blocks = {}
         self._segment_counter = 1
+        self._by_style = {}
+        self._reset_aggregates()
+        self._notify_change()
+
+    # --- Индекс стиль -> объекты ---
+
+    def _index_style(self, obj):
+        if obj.style_name is not None:
+            group = self._by_style.get(obj.style_name)
+            if group is None:
+                self._by_style[obj.style_name] = group = {}
+            group[obj.segment_id] = obj
+
+    def _unindex_style(self, obj):
+        group = self._by_style.get(obj.style_name)
+        if group is not None:
+            group.pop(obj.segment_id, None)
+            if not group:
+                del self._by_style[obj.style_name]
+
+    def objects_with_style(self, style_name):
+        """Объекты со стилем style_name (без вставок блоков) — за время, пропорциональное их числу."""
+        return list(self._by_style.get(style_name, {}).values())
+
+    def style_usage_count(self, style_name):
+        """Число объектов со стилем style_name (без вставок блоков)."""
+        return len(self._by_style.get(style_name, ()))
+
+    def used_style_names(self):
+        """Имена стилей, которые встречаются на сцене: у объектов и в определениях блоков."""
+        names = set(self._by_style)
+        for block in self.blocks.values():
+            names.update(block.style_names)
+        return names
+
+    def blocks_using_style(self, style_name):
+        return [block for block in self.blocks.values() if style_name in block.style_names]
+
+    def reassign_style(self, old_name, new_name):
+        """
+        Переводит все объекты и определения блоков со стиля old_name на new_name (при удалении
+        или переименовании стиля). Возвращает число переведенных объектов и отрезков блоков.
+        """
+        if old_name == new_name:
+            return 0
+        group = self._by_style.pop(old_name, {})
+        target = self._by_style.setdefault(new_name, {})
+        for obj in group.values():
+            obj.style_name = new_name
+            target[obj.segment_id] = obj
+        if not target:
+            del self._by_style[new_name]
+        count = len(group)
+        for block in self.blocks.values():
+            count += block.replace_style(old_name, new_name)
+        if count:
+            # Статистика old_name (объекты и вставки блоков) целиком переходит к new_name —
+            # за O(1) без обхода сцены; габариты не меняются
+            stat = None if self._stats_dirty else self._style_stats.pop(old_name, None)
+            if stat is not None:
+                self._stat_add(new_name, stat[1], stat[0])
+            self._notify_change()
+        return count
+
+    # --- Агрегаты сцены (габариты и статистика по стилям) ---
+
+    def get_extents(self):
+        """Возвращает габариты сцены (min_x, min_y, max_x, max_y) или None для пустой сцены."""
+        if self._extents_dirty:
+            self._recompute_extents()
+        return self._extents
+
+    def get_style_statistics(self):
+        """Возвращает {имя стиля: (количество, суммарная длина)}."""
+        if self._stats_dirty:
+            self._recompute_style_stats()
+        return {name: (count, total) for name, (count, total) in self._style_stats.items()}
+
+    def total_length(self):
+        """Суммарная длина всех объектов сцены."""
+        if self._stats_dirty:
+            self._recompute_style_stats()
+        return sum(total for _, total in self._style_stats.values())
+
+    def _reset_aggregates(self):
+        self._extents = None
+        self._extents_dirty = False
+        self._style_stats = {}  # имя стиля -> [количество, суммарная длина]
+        self._stats_dirty = False
+
+    def _accumulate(self, obj):
+        self._add_object_stats(obj)
+        if self._extents_dirty:
+            return
+        x_lo, y_lo, x_hi, y_hi = obj.bounds()
+        if self._extents is None:
+            self._extents = (x_lo, y_lo, x_hi, y_hi)
+        else:
+            min_x, min_y, max_x, max_y = self._extents
+            self._extents = (min(min_x, x_lo), min(min_y, y_lo), max(max_x, x_hi), max(max_y, y_hi))
+
+    def _discount(self, obj):
+        self._sub_object_stats(obj)
+        if self._extents_dirty or self._extents is None:
+            return
+        if not self.object_count():
+            self._extents = None
+            return
+        # Пересчет нужен, только если объект касался границы габаритов
+        min_x, min_y, max_x, max_y = self._extents
+        x_lo, y_lo, x_hi, y_hi = obj.bounds()
+        if x_lo <= min_x or x_hi >= max_x or y_lo <= min_y or y_hi >= max_y:
+            self._extents_dirty = True
+
+    def _recompute_extents(self):
+        self._extents = None
+        self._extents_dirty = False
+        if not self.object_count():
+            return
+        min_x = min_y = float("inf")
+        max_x = max_y = float("-inf")
+        for s in self.segments:
+            if s.x1 < min_x: min_x = s.x1
+            if s.x2 < min_x: min_x = s.x2
+            if s.x1 > max_x: max_x = s.x1
+            if s.x2 > max_x: max_x = s.x2
+            if s.y1 < min_y: min_y = s.y1
+            if s.y2 < min_y: min_y = s.y2
+            if s.y1 > max_y: max_y = s.y1
+            if s.y2 > max_y: max_y = s.y2
+        for e in self.entities:
+            x_lo, y_lo, x_hi, y_hi = e.bounds()
+            if x_lo < min_x: min_x = x_lo
+            if y_lo < min_y: min_y = y_lo
+            if x_hi > max_x: max_x = x_hi
+            if y_hi > max_y: max_y = y_hi
+        self._extents = (min_x, min_y, max_x, max_y)
+
+    def _recompute_style_stats(self):
+        self._style_stats = {}
+        self._stats_dirty = False
+        for obj in self.all_objects():
+            self._add_object_stats(obj)
+
+    def _add_object_stats(self, obj):
+        if self._stats_dirty:
+            return
+        if isinstance(obj, BlockReference):
+            for name, (count, total) in obj.style_totals().items():
+                self._stat_add(name, total, count)
+        else:
+            self._stat_add(obj.style_name, obj.length())
+
+    def _sub_object_stats(self, obj):
+        if self._stats_dirty:
+            return
+        if isinstance(obj, BlockReference):
+            for name, (count, total) in obj.style_totals().items():
+                self._stat_sub(name, total, count)
+        else:
+            self._stat_sub(obj.style_name, obj.length())
+
+    def _stat_add(self, style_name, length, count=1):
+        stat = self._style_stats.get(style_name)
+        if stat is None:
+            self._style_stats[style_name] = [count, length]
+        else:
+            stat[0] += count
+            stat[1] += length
+
+    def _stat_sub(self, style_name, length, count=1):
+        stat = self._style_stats.get(style_name)
+        if stat is None:
+            return
+        stat[0] -= count
+        stat[1] -= length
+        if stat[0] <= 0:
+            del self._style_stats[style_name]
 
     def describe(self, as_degrees=True):
         """Возвращает описание всех объектов на сцене."""
-        if not self.segments:
+        if not self.object_count():
             return "Нет объектов на сцене."
 
-        output = f"Всего объектов: {len(self.segments)}\n\n"
+        parts = [f"Всего объектов: {self.object_count()}\n\n"]
         for i, s in enumerate(self.segments):
-            output += f"--- Отрезок {i + 1} ---\n"
-            output += s.describe(as_degrees)
-            output += "\n\n"
-        return output
\ No newline at end of file
+            parts.append(f"--- Отрезок {i + 1} ---\n{s.describe(as_degrees)}\n\n")
+        for i, e in enumerate(self.entities):
+            parts.append(f"--- Объект {i + 1} ---\n{e.describe(as_degrees)}\n\n")
+        return "".join(parts)
\ No newline at end of file
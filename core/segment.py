@@ -25,6 +25,15 @@ class Segment:
         angle = atan2(self.y2 - self.y1, self.x2 - self.x1)
         return degrees(angle) if as_degrees else angle
 
+    def bounds(self):
+        """Возвращает габариты (min_x, min_y, max_x, max_y)."""
+        return (min(self.x1, self.x2), min(self.y1, self.y2),
+                max(self.x1, self.x2), max(self.y1, self.y2))
+
+    def distance_to(self, px, py):
+        """Кратчайшее расстояние от точки до отрезка."""
+        return distance_point_to_segment(px, py, self.x1, self.y1, self.x2, self.y2)
+
     def describe(self, as_degrees=True):
         """Возвращает форматированное описание отрезка."""
         unit = "°" if as_degrees else "rad"
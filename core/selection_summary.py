@@ -0,0 +1,74 @@
+# core/selection_summary.py
+
+from .block import BlockReference
+
+
+class SelectionSummary:
+    """
+    Сводка по набору объектов за один проход: количество, суммарная длина, диапазон длин,
+    разбивка по стилям и общий габарит. Вставки блоков раскладываются по стилям определения.
+    """
+
+    def __init__(self, objects):
+        self.count = 0
+        self.total_length = 0.0
+        self.min_length = None
+        self.max_length = None
+        self.styles = {}  # имя стиля -> [количество, суммарная длина]
+        self.bounds = None
+        self.block_references = 0
+        self._own_styles = set()
+
+        min_x = min_y = float("inf")
+        max_x = max_y = float("-inf")
+        styles = self.styles
+        for obj in objects:
+            self.count += 1
+            length = obj.length()
+            self.total_length += length
+            if self.min_length is None or length < self.min_length:
+                self.min_length = length
+            if self.max_length is None or length > self.max_length:
+                self.max_length = length
+
+            if isinstance(obj, BlockReference):
+                self.block_references += 1
+                for name, (count, total) in obj.style_totals().items():
+                    stat = styles.setdefault(name, [0, 0.0])
+                    stat[0] += count
+                    stat[1] += total
+            else:
+                self._own_styles.add(obj.style_name)
+                stat = styles.setdefault(obj.style_name, [0, 0.0])
+                stat[0] += 1
+                stat[1] += length
+
+            x_lo, y_lo, x_hi, y_hi = obj.bounds()
+            if x_lo < min_x: min_x = x_lo
+            if y_lo < min_y: min_y = y_lo
+            if x_hi > max_x: max_x = x_hi
+            if y_hi > max_y: max_y = y_hi
+
+        if self.count:
+            self.bounds = (min_x, min_y, max_x, max_y)
+
+    def own_style_names(self):
+        """Стили, назначенные самим объектам (без стилей внутри блоков)."""
+        return self._own_styles
+
+    def lines(self):
+        """Строки сводки для инспектора."""
+        if not self.count:
+            return []
+        lines = [f"Объектов: {self.count}   Суммарная длина: {self.total_length:.2f}",
+                 f"Длина: от {self.min_length:.2f} до {self.max_length:.2f}, "
+                 f"в среднем {self.total_length / self.count:.2f}"]
+        min_x, min_y, max_x, max_y = self.bounds
+        lines.append(f"Габарит: ({min_x:.2f}, {min_y:.2f}) – ({max_x:.2f}, {max_y:.2f}), "
+                     f"{max_x - min_x:.2f} × {max_y - min_y:.2f}")
+        if self.block_references:
+            lines.append(f"Вставок блоков: {self.block_references}")
+        for name in sorted(self.styles):
+            count, total = self.styles[name]
+            lines.append(f"  {name}: {count} шт., {total:.2f}")
+        return lines
@@ -0,0 +1,78 @@
+# core/slot_list.py
+
+
+class SlotList:
+    """
+    Хранилище объектов сцены по слотам с таблицей id -> слот. Удаление не сдвигает список:
+    слот помечается пустым (None). Новые объекты всегда добавляются в конец, поэтому порядок
+    слотов совпадает с порядком добавления (и порядком отрисовки). Плотный список живых
+    объектов строится лениво, пустые слоты убирает compact.
+    """
+
+    def __init__(self):
+        self._slots = []
+        self._holes = 0  # Число пустых слотов
+        self._slot_of = {}  # id объекта -> индекс слота
+        self._live = []
+        self._live_dirty = False
+
+    def add(self, obj):
+        slot = len(self._slots)
+        self._slots.append(obj)
+        if not self._live_dirty:
+            self._live.append(obj)
+        self._slot_of[obj.segment_id] = slot
+
+    def extend(self, objects):
+        """Добавляет объекты пачкой в конец хранилища."""
+        start = len(self._slots)
+        self._slots.extend(objects)
+        if not self._live_dirty:
+            self._live.extend(objects)
+        slot_of = self._slot_of
+        for slot in range(start, len(self._slots)):
+            slot_of[self._slots[slot].segment_id] = slot
+
+    def remove(self, obj):
+        slot = self._slot_of.get(obj.segment_id)
+        if slot is None or self._slots[slot] is not obj:
+            raise ValueError(f"Объект #{obj.segment_id} отсутствует на сцене.")
+        del self._slot_of[obj.segment_id]
+        self._slots[slot] = None
+        self._holes += 1
+        self._live_dirty = True
+
+    def get(self, segment_id):
+        slot = self._slot_of.get(segment_id)
+        return None if slot is None else self._slots[slot]
+
+    def live(self):
+        """Плотный список объектов в порядке слотов (кэшируется до следующего удаления)."""
+        if self._live_dirty:
+            self._live = [obj for obj in self._slots if obj is not None]
+            self._live_dirty = False
+        return self._live
+
+    def tombstones(self):
+        return self._holes
+
+    def compact(self):
+        """Убирает пустые слоты и перестраивает таблицу id -> слот (порядок объектов сохраняется)."""
+        if not self._holes:
+            return
+        self._slots = list(self.live())
+        self._holes = 0
+        self._slot_of = {obj.segment_id: slot for slot, obj in enumerate(self._slots)}
+
+    def clear(self):
+        self._slots = []
+        self._holes = 0
+        self._slot_of = {}
+        self._live = []
+        self._live_dirty = False
+
+    def __contains__(self, obj):
+        return self.get(obj.segment_id) is obj
+
+    def __len__(self):
+        return len(self._slot_of)
@@ -0,0 +1,127 @@
+# core/style_library.py
+
+from bisect import bisect_left, insort
+
+from .line_style import LineStyle
+
+# Первая строка файла библиотеки стилей
+LIBRARY_HEADER = "MYCAD-STYLES 1"
+
+
+def encode_style(style):
+    """Строка библиотеки: имя, толщина, тип толщины, цвет и шаблон штрихов через табуляцию."""
+    if "\t" in style.name or "\n" in style.name:
+        raise ValueError(f"Имя стиля '{style.name}' содержит недопустимые символы.")
+    pattern = ",".join(f"{v:g}" for v in style.dash_pattern)
+    return f"{style.name}\t{style.thickness_mm:g}\t{style.thickness_class}\t{style.color}\t{pattern}"
+
+
+def decode_style(record):
+    """Собирает пользовательский LineStyle из строки библиотеки (ValueError при ошибке формата)."""
+    fields = record.split("\t")
+    if len(fields) != 5:
+        raise ValueError(f"Некорректная запись стиля: {record!r}")
+    name, thickness, thickness_class, color, pattern = fields
+    dash_pattern = tuple(float(v) for v in pattern.split(",") if v) if pattern else ()
+    return LineStyle(name, float(thickness), dash_pattern, is_basic=False, color=color,
+                     thickness_class=thickness_class)
+
+
+def read_library(path):
+    """
+    Читает файл библиотеки и возвращает [(имя, запись)]. Разбирается только имя — параметры
+    стиля разбираются при первом обращении к нему.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if f.readline().rstrip("\n") != LIBRARY_HEADER:
+            raise ValueError("Файл не является библиотекой стилей.")
+        records = []
+        for line in f:
+            line = line.rstrip("\n")
+            if line:
+                records.append((line.split("\t", 1)[0], line))
+    return records
+
+
+def write_library(path, styles):
+    """Сохраняет стили в файл библиотеки."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(LIBRARY_HEADER + "\n")
+        for style in styles:
+            f.write(encode_style(style) + "\n")
+
+
+class StyleNameIndex:
+    """
+    Индекс имен стилей: порядок добавления (для выпадающих списков) и отсортированный список
+    имен без учета регистра для поиска по префиксу и подстроке.
+    """
+
+    def __init__(self):
+        self._order = {}  # имя -> None, сохраняет порядок добавления
+        self._sorted = []  # [(имя в нижнем регистре, имя)]
+        self._names = None
+
+    def add(self, name):
+        if name in self._order:
+            return
+        self._order[name] = None
+        insort(self._sorted, (name.casefold(), name))
+        self._names = None
+
+    def add_many(self, names):
+        """Добавление пачкой: одна сортировка вместо вставки каждого имени."""
+        fresh = [name for name in names if name not in self._order]
+        if not fresh:
+            return
+        for name in fresh:
+            self._order[name] = None
+        self._sorted.extend((name.casefold(), name) for name in fresh)
+        self._sorted.sort()
+        self._names = None
+
+    def remove(self, name):
+        if name not in self._order:
+            return
+        del self._order[name]
+        key = (name.casefold(), name)
+        i = bisect_left(self._sorted, key)
+        if i < len(self._sorted) and self._sorted[i] == key:
+            del self._sorted[i]
+        self._names = None
+
+    def names(self):
+        """Все имена в порядке добавления (кэшированный кортеж)."""
+        if self._names is None:
+            self._names = tuple(self._order)
+        return self._names
+
+    def search(self, query, limit=None):
+        """Имена, начинающиеся с query, затем содержащие его; пустой запрос — все имена."""
+        query = query.strip().casefold()
+        if not query:
+            names = self.names()
+            return list(names[:limit] if limit else names)
+        start = bisect_left(self._sorted, (query,))
+        result = []
+        i = start
+        while i < len(self._sorted) and self._sorted[i][0].startswith(query):
+            result.append(self._sorted[i][1])
+            if limit and len(result) >= limit:
+                return result
+            i += 1
+        end = i
+        for j, (folded, name) in enumerate(self._sorted):
+            if start <= j < end:
+                continue
+            if query in folded:
+                result.append(name)
+                if limit and len(result) >= limit:
+                    break
+        return result
+
+    def __contains__(self, name):
+        return name in self._order
+
+    def __len__(self):
+        return len(self._order)
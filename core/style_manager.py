@@ -1,16 +1,22 @@
 # core/style_manager.py
 
 from .line_style import LineStyle
-from tkinter import messagebox
+from .render_descriptor import RenderDescriptor
+from .style_library import StyleNameIndex, decode_style, read_library, write_library
 
 
 class StyleManager:
     """Централизованный менеджер стилей линий (палитра стилей) согласно ГОСТ 2.303-68."""
 
     def __init__(self):
-        self.styles = {}
+        self.styles = {}  # имя -> LineStyle или еще не разобранная запись библиотеки (str)
+        self.index = StyleNameIndex()
+        self._descriptors = {}  # имя стиля -> RenderDescriptor
+        self._tags = {}  # имя стиля -> постоянный тег холста
+        self._tag_counter = 0
+        self.version = 0  # Увеличивается при каждом изменении или удалении стиля
         self._initialize_default_styles()
-        self.current_style_name = list(self.styles.keys())[0]
+        self.current_style_name = self.index.names()[0]
 
     def _initialize_default_styles(self):
         """Инициализирует базовые стили ЕСКД."""
@@ -32,14 +38,82 @@ class StyleManager:
 
         for style in default_styles:
             self.styles[style.name] = style
+        self.index.add_many(style.name for style in default_styles)
 
     def get_style(self, name):
-        """Возвращает объект LineStyle по имени."""
-        return self.styles.get(name)
+        """Возвращает объект LineStyle по имени (стиль из библиотеки разбирается при первом обращении)."""
+        style = self.styles.get(name)
+        if isinstance(style, str):
+            style = self._load_record(name, style)
+        return style
+
+    def _load_record(self, name, record):
+        try:
+            style = decode_style(record)
+            self._assert_valid_thickness(style.thickness_mm, style.thickness_class)
+        except ValueError:
+            # Испорченная запись библиотеки: стиль исключается, как будто его не было
+            del self.styles[name]
+            self.index.remove(name)
+            return None
+        self.styles[name] = style
+        return style
+
+    def get_render_descriptor(self, name):
+        """Возвращает скомпилированный RenderDescriptor стиля (или None, если стиля нет)."""
+        descriptor = self._descriptors.get(name)
+        if descriptor is None:
+            style = self.get_style(name)
+            if not style:
+                return None
+            descriptor = RenderDescriptor(style, self.style_tag(name))
+            self._descriptors[name] = descriptor
+        return descriptor
+
+    def style_tag(self, name):
+        """Тег холста стиля; не меняется при правке стиля, поэтому элементы можно менять по тегу."""
+        tag = self._tags.get(name)
+        if tag is None:
+            self._tag_counter += 1
+            tag = self._tags[name] = f"style-{self._tag_counter}"
+        return tag
 
     def get_style_names(self):
-        """Возвращает список имен всех стилей."""
-        return list(self.styles.keys())
+        """Возвращает имена всех стилей в порядке добавления (кэшированный кортеж индекса)."""
+        return self.index.names()
+
+    def search_styles(self, query, limit=None):
+        """Имена стилей по префиксу или подстроке (без учета регистра)."""
+        return self.index.search(query, limit)
+
+    def import_library(self, path):
+        """
+        Загружает библиотеку стилей из файла. Стили с уже существующими именами пропускаются.
+        Возвращает (добавлено, пропущено).
+        """
+        records = read_library(path)
+        added = []
+        for name, record in records:
+            if name in self.styles:
+                continue
+            self.styles[name] = record
+            added.append(name)
+        self.index.add_many(added)
+        if added:
+            self.version += 1
+        return len(added), len(records) - len(added)
+
+    def export_library(self, path, names=None):
+        """Сохраняет пользовательские стили (или стили names) в файл библиотеки."""
+        if names is None:
+            names = [name for name in self.index.names() if not self._is_basic(name)]
+        styles = [style for style in (self.get_style(name) for name in names) if style]
+        write_library(path, styles)
+        return len(styles)
+
+    def _is_basic(self, name):
+        style = self.styles.get(name)
+        return not isinstance(style, str) and style is not None and style.is_basic
 
     def add_style(self, name, thickness_mm, dash_pattern=(), color="#FFFFFF", is_basic=False, thickness_class=None):
         """Добавляет новый пользовательский стиль."""
@@ -49,16 +123,22 @@ class StyleManager:
         self._assert_valid_thickness(thickness_mm, thickness_class)
         self.styles[name] = LineStyle(name, thickness_mm, dash_pattern, is_basic, color,
                                       thickness_class=thickness_class)
+        self.index.add(name)
+        self.version += 1
 
     def update_style(self, name, **kwargs):
         """Обновляет параметры существующего стиля."""
-        style = self.styles.get(name)
+        style = self.get_style(name)
         if not style:
             raise KeyError(f"Стиль '{name}' не найден.")
 
         new_thickness = kwargs.get('thickness_mm', style.thickness_mm)
         new_class = kwargs.get('thickness_class', style.thickness_class)
         self._assert_valid_thickness(new_thickness, new_class)
+        # Кэш и версии сбрасываются только для принятой правки
+        self._descriptors.pop(name, None)
+        self.version += 1
+        style.revision += 1
         style.thickness_mm = new_thickness
         style.thickness_class = new_class
         if 'dash_pattern' in kwargs:
@@ -69,19 +149,48 @@ class StyleManager:
             # уже все обновлено, но для совместимости возвращаем
             pass
 
+    def rename_style(self, old_name, new_name):
+        """Переименовывает пользовательский стиль; тег холста стиля сохраняется."""
+        style = self.get_style(old_name)
+        if not style:
+            raise KeyError(f"Стиль '{old_name}' не найден.")
+        if style.is_basic:
+            raise ValueError("Базовые стили ЕСКД нельзя переименовывать.")
+        new_name = new_name.strip()
+        if not new_name:
+            raise ValueError("Имя стиля не может быть пустым.")
+        if new_name in self.styles:
+            raise ValueError(f"Стиль с именем '{new_name}' уже существует.")
+        del self.styles[old_name]
+        self.index.remove(old_name)
+        style.name = new_name
+        style.revision += 1
+        self.styles[new_name] = style
+        self.index.add(new_name)
+        # Вид линии определяется и по имени — дескриптор компилируется заново
+        self._descriptors.pop(old_name, None)
+        if old_name in self._tags:
+            self._tags[new_name] = self._tags.pop(old_name)
+        self.version += 1
+        if self.current_style_name == old_name:
+            self.current_style_name = new_name
+
     def delete_style(self, name):
-        """Удаляет пользовательский стиль."""
-        style = self.styles.get(name)
+        """Удаляет пользовательский стиль (ValueError для базовых стилей ЕСКД)."""
+        style = self.get_style(name)
         if not style:
             return
         if style.is_basic:
-            messagebox.showwarning("Запрет", "Нельзя удалять базовые стили ЕСКД.")
-            return
+            raise ValueError("Нельзя удалять базовые стили ЕСКД.")
         del self.styles[name]
+        self.index.remove(name)
+        self._descriptors.pop(name, None)
+        self._tags.pop(name, None)
+        self.version += 1
 
         # Сброс текущего стиля, если удалили выбранный
         if self.current_style_name == name:
-            self.current_style_name = list(self.styles.keys())[0]
+            self.current_style_name = self.index.names()[0]
 
     def set_current_style(self, name):
         """Устанавливает текущий стиль для новых объектов."""
@@ -1,4 +1,68 @@
-from math import degrees, radians, cos, sin, ceil, floor, log10
+from math import degrees, radians, cos, sin, ceil, floor, log10, log2
+
+
+def grid_step_for_scale(scale):
+    """Оптимальный шаг сетки (ряд 1-2-5) для масштаба scale."""
+    target = 100 / scale
+    p10 = 10 ** floor(log10(target) if target > 0 else 0)
+    m = target / p10
+    return (1 * p10) if m < 2 else (2 * p10) if m < 5 else (5 * p10)
+
+
+BUCKETS_PER_OCTAVE = 4
+
+
+def zoom_bucket(scale):
+    """Номер зонной корзины масштаба (четыре корзины на каждое удвоение масштаба)."""
+    return int(floor(log2(max(scale, 1e-9)) * BUCKETS_PER_OCTAVE))
+
+
+def bucket_scale(bucket):
+    """Представительный масштаб корзины (ее середина)."""
+    return 2 ** ((bucket + 0.5) / BUCKETS_PER_OCTAVE)
+
+
+class ViewState:
+    """
+    Неизменяемый снимок состояния вида (смещение, масштаб, поворот, размер холста).
+    Не обращается к Tk, поэтому пригоден для расчетов вне потока интерфейса.
+    """
+    __slots__ = ("offset_x", "offset_y", "scale", "rotation_angle", "width", "height", "_ca", "_sa")
+
+    def __init__(self, offset_x, offset_y, scale, rotation_angle, width, height):
+        self.offset_x, self.offset_y = offset_x, offset_y
+        self.scale = scale
+        self.rotation_angle = rotation_angle
+        self.width, self.height = width, height
+        self._ca, self._sa = cos(rotation_angle), sin(rotation_angle)
+
+    def __eq__(self, other):
+        return isinstance(other, ViewState) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def key(self):
+        return self.offset_x, self.offset_y, self.scale, self.rotation_angle, self.width, self.height
+
+    def world_to_canvas(self, wx, wy):
+        """То же преобразование, что и ViewTransform.world_to_canvas."""
+        tx, ty = wx - self.offset_x, wy - self.offset_y
+        rx = tx * self._ca + ty * self._sa
+        ry = -tx * self._sa + ty * self._ca
+        return self.width / 2.0 + rx * self.scale, self.height / 2.0 - ry * self.scale
+
+    def canvas_to_world(self, cx, cy):
+        rx, ry = (cx - self.width / 2.0) / self.scale, (self.height / 2.0 - cy) / self.scale
+        tx = rx * self._ca - ry * self._sa
+        ty = rx * self._sa + ry * self._ca
+        return tx + self.offset_x, ty + self.offset_y
+
+    def get_visible_bounds(self):
+        w, h = self.width, self.height
+        pts = [self.canvas_to_world(0, 0), self.canvas_to_world(w, 0),
+               self.canvas_to_world(w, h), self.canvas_to_world(0, h)]
+        return min(p[0] for p in pts), min(p[1] for p in pts), max(p[0] for p in pts), max(p[1] for p in pts)
 
 
 class ViewTransform:
@@ -51,10 +115,16 @@ class ViewTransform:
 
     def grid_step(self):
         """Вычисляет оптимальный шаг сетки."""
-        target = 100 / self.scale
-        p10 = 10 ** floor(log10(target) if target > 0 else 0)
-        m = target / p10
-        return (1 * p10) if m < 2 else (2 * p10) if m < 5 else (5 * p10)
+        return grid_step_for_scale(self.scale)
+
+    def zoom_bucket(self):
+        """Зонная корзина текущего масштаба (четверть октавы) для кэшей отрисовки."""
+        return zoom_bucket(self.scale)
+
+    def snapshot(self):
+        """Снимок текущего состояния вида (ViewState) для фоновых расчетов."""
+        return ViewState(self.offset_x, self.offset_y, self.scale, self.rotation_angle,
+                         self.canvas.winfo_width(), self.canvas.winfo_height())
 
     def pan(self, dx_c, dy_c):
         """Перемещает (панорамирует) вид на основе смещения холста."""
@@ -80,7 +150,8 @@ class ViewTransform:
 
     def zoom_extents(self):
         """Масштабирует вид так, чтобы все объекты сцены были видны."""
-        if not self.scene.segments:
+        extents = self.scene.get_extents()
+        if extents is None:
             self.offset_x, self.offset_y = 0.0, 0.0
             self.scale = self.BASE_SCALE
             return
@@ -88,13 +159,8 @@ class ViewTransform:
         w, h = self.canvas.winfo_width(), self.canvas.winfo_height()
         if w <= 1 or h <= 1: return
 
-        all_x = [s.x1 for s in self.scene.segments] + [s.x2 for s in self.scene.segments]
-        all_y = [s.y1 for s in self.scene.segments] + [s.y2 for s in self.scene.segments]
-
-        if not all_x: return
-
-        min_x, max_x = min(all_x), max(all_x)
-        min_y, max_y = min(all_y), max(all_y)
+        # Габариты поддерживаются сценой инкрементально — без обхода всех отрезков
+        min_x, min_y, max_x, max_y = extents
 
         buffer = 5.0
         min_x -= buffer
@@ -0,0 +1,87 @@
+# core/wave_geometry.py
+
+from array import array
+from collections import OrderedDict
+from math import sin, pi
+
+WAVE = "wave"
+ZIGZAG = "zigzag"
+STEPS_PER_PERIOD = 16
+
+
+def wave_profile(length, wavelength, amplitude, mode=WAVE):
+    """
+    Профиль волнистой линии или линии с изломами в локальной системе отрезка:
+    плоский массив [u0, v0, u1, v1, ...], где u — расстояние от начала вдоль
+    отрезка, v — смещение по нормали. Единицы совпадают с единицами аргументов.
+    """
+    if mode == WAVE:
+        periods = max(length / wavelength, 1)
+        steps = max(int(periods * STEPS_PER_PERIOD), 8)
+        du = length / steps
+        k = 2 * pi / wavelength
+        profile = array('d', bytes(16 * (steps + 1)))
+        for i in range(steps + 1):
+            u = i * du
+            profile[2 * i] = u
+            profile[2 * i + 1] = sin(k * u) * amplitude
+        return profile
+
+    spacing = wavelength
+    count = int(length // spacing)
+    if count * spacing >= length:
+        count -= 1
+    profile = array('d', (0.0, 0.0))
+    for i in range(1, count + 1):
+        u = i * spacing
+        offset = amplitude if i % 2 else -amplitude
+        profile.extend((u, 0.0, u, offset, u, 0.0))
+    profile.extend((length, 0.0))
+    return profile
+
+
+def place_profile(profile, x1, y1, x2, y2, k=1.0):
+    """
+    Аффинно переносит профиль на отрезок (x1, y1)-(x2, y2); k — множитель единиц
+    профиля (например, масштаб вида для профиля в мировых единицах).
+    Возвращает плоский список координат.
+    """
+    dx, dy = x2 - x1, y2 - y1
+    length = (dx * dx + dy * dy) ** 0.5
+    if length == 0.0:
+        return [x1, y1, x2, y2]
+    ux, uy = dx / length * k, dy / length * k
+    px, py = -uy, ux
+    points = [0.0] * len(profile)
+    for i in range(0, len(profile), 2):
+        u, v = profile[i], profile[i + 1]
+        points[i] = x1 + ux * u + px * v
+        points[i + 1] = y1 + uy * u + py * v
+    return points
+
+
+class WaveGeometryCache:
+    """
+    Кэш профилей волн/изломов по ключу (объект, режим, зонная корзина).
+    Профиль хранится в мировых единицах и при панорамировании, повороте и зуме
+    внутри корзины только аффинно переносится на экран.
+    """
+
+    def __init__(self, max_entries=20000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # ключ -> (длина, длина волны, амплитуда, профиль)
+
+    def profile(self, key, length, wavelength, amplitude, mode):
+        params = (length, wavelength, amplitude)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == params:
+            self._entries.move_to_end(key)
+            return entry[1]
+        profile = wave_profile(length, wavelength, amplitude, mode)
+        self._entries[key] = (params, profile)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return profile
+
+    def clear(self):
+        self._entries.clear()